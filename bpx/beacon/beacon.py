@@ -787,6 +787,9 @@ class Beacon:
         cancel_task_safe(task=self._sync_task, log=self.log)
 
     async def _await_closed(self) -> None:
+        if self._blockchain is not None:
+            await self._write_blockchain_snapshot()
+            self.blockchain.close()
         await self.db_wrapper.close()
         if self._init_weight_proof is not None:
             await asyncio.wait([self._init_weight_proof])
@@ -796,6 +799,19 @@ class Beacon:
             with contextlib.suppress(asyncio.CancelledError):
                 await self._sync_task
 
+    async def _write_blockchain_snapshot(self) -> None:
+        try:
+            await asyncio.wait_for(self.blockchain.lock.acquire(), timeout=10)
+        except asyncio.TimeoutError:
+            self.log.warning("Timed out waiting for the blockchain lock, not saving the block records snapshot")
+            return
+        try:
+            await self.blockchain.write_snapshot()
+        except Exception as e:
+            self.log.error(f"Failed to save the block records snapshot: {e}")
+        finally:
+            self.blockchain.lock.release()
+
     async def _sync(self) -> None:
         """
         Performs a full sync of the blockchain up to the peak.
@@ -1513,23 +1529,23 @@ class Beacon:
             self.log.warning("Too many blocks added, not adding block")
             return None
 
-        pre_validation_time = None
-
-        async with self._blockchain_lock_high_priority:
-            start_header_time = time.time()
-            _, header_error = await self.blockchain.validate_unfinished_block_header(block)
-            if header_error is not None:
-                raise ConsensusError(header_error)
-            validate_time = time.time() - start_header_time
-            self.log.log(
-                logging.WARNING if validate_time > 2 else logging.DEBUG,
-                f"Time for header validate: {validate_time:0.3f}s",
-            )
+        # The header (VDFs, proof of space and signatures) only depends on the ancestors of the block, so it is
+        # validated in the pool without holding the lock
+        pre_validation_start = time.time()
+        pre_validation_result = await self.blockchain.pre_validate_unfinished_block(block)
+        if pre_validation_result.error is not None:
+            raise ConsensusError(Err(pre_validation_result.error))
+        pre_validation_time = time.time() - pre_validation_start
+        self.log.log(
+            logging.WARNING if pre_validation_time > 2 else logging.DEBUG,
+            f"Time for header validate: {pre_validation_time:0.3f}s",
+        )
 
         async with self._blockchain_lock_high_priority:
-            # TODO: pre-validate VDFs outside of lock
             validation_start = time.time()
-            validate_result = await self.blockchain.validate_unfinished_block(block)
+            validate_result = await self.blockchain.validate_unfinished_block(
+                block, pre_validation_result=pre_validation_result
+            )
             if validate_result.error is not None:
                 raise ConsensusError(Err(validate_result.error))
             validation_time = time.time() - validation_start
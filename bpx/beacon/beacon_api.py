@@ -31,24 +31,42 @@ from bpx.types.end_of_slot_bundle import EndOfSubSlotBundle
 from bpx.types.full_block import FullBlock
 from bpx.types.peer_info import PeerInfo
 from bpx.types.unfinished_block import UnfinishedBlock
-from bpx.util.api_decorators import api_request
+from bpx.util.api_decorators import ApiPriority, api_request
 from bpx.util.hash import std_hash
 from bpx.util.ints import uint8, uint32, uint64, uint128
 from bpx.util.limited_semaphore import LimitedSemaphoreFullError
+from bpx.util.metrics import registry as metrics_registry
+from bpx.util.recent_hash_filter import RecentHashFilter
 
 if TYPE_CHECKING:
     from bpx.beacon.beacon import Beacon
 else:
     Beacon = object
 
+# How long an announcement from one peer suppresses the same announcement from the others (at least one bucket,
+# about two). The first peer is asked for the data, the others are only asked again once it expires.
+SIGNAGE_POINT_DEDUP_BUCKET_SECONDS = 1.0
+UNFINISHED_BLOCK_DEDUP_BUCKET_SECONDS = 2.5
+
+announcements_received = metrics_registry.counter(
+    "bpx_beacon_announcements_total", "Announcements received from peers", ["kind"]
+)
+announcements_dropped = metrics_registry.counter(
+    "bpx_beacon_announcements_dropped_total", "Announcements dropped as duplicates of recent ones", ["kind"]
+)
+
 
 class BeaconAPI:
     beacon: Beacon
     executor: ThreadPoolExecutor
+    recent_signage_points: RecentHashFilter[Tuple[bytes32, uint8, bytes32]]
+    recent_unfinished_blocks: RecentHashFilter[bytes32]
 
     def __init__(self, beacon: Beacon) -> None:
         self.beacon = beacon
         self.executor = ThreadPoolExecutor(max_workers=1)
+        self.recent_signage_points = RecentHashFilter(SIGNAGE_POINT_DEDUP_BUCKET_SECONDS)
+        self.recent_unfinished_blocks = RecentHashFilter(UNFINISHED_BLOCK_DEDUP_BUCKET_SECONDS)
 
     @property
     def server(self) -> BpxServer:
@@ -95,12 +113,24 @@ class BeaconAPI:
         await peer.close()
         return None
 
-    @api_request(peer_required=True, execute_task=True)
+    @api_request(peer_required=True, execute_task=True, priority=ApiPriority.CRITICAL)
     async def new_peak(self, request: beacon_protocol.NewPeak, peer: WSBpxConnection) -> None:
         """
         A peer notifies us that they have added a new peak to their blockchain. If we don't have it,
         we can ask for it.
         """
+        announcements_received.inc(labels=("new_peak",))
+        if self.beacon.sync_store.seen_header_hash(request.header_hash) and self.beacon.blockchain.contains_block(
+            request.header_hash
+        ):
+            # Another peer already announced this peak and we have it, the only thing left to do is to record that
+            # this peer has it too, which doesn't need the semaphore
+            announcements_dropped.inc(labels=("new_peak",))
+            self.beacon.sync_store.peer_has_block(
+                request.header_hash, peer.peer_node_id, request.weight, request.height, True
+            )
+            return None
+
         # this semaphore limits the number of tasks that can call new_peak() at
         # the same time, since it can be expensive
         try:
@@ -111,7 +141,7 @@ class BeaconAPI:
 
         return None
 
-    @api_request(reply_types=[ProtocolMessageTypes.respond_proof_of_weight])
+    @api_request(reply_types=[ProtocolMessageTypes.respond_proof_of_weight], priority=ApiPriority.BULK)
     async def request_proof_of_weight(self, request: beacon_protocol.RequestProofOfWeight) -> Optional[Message]:
         if self.beacon.weight_proof_handler is None:
             return None
@@ -156,7 +186,9 @@ class BeaconAPI:
         self.log.warning("Received proof of weight too late.")
         return None
 
-    @api_request(reply_types=[ProtocolMessageTypes.respond_block, ProtocolMessageTypes.reject_block])
+    @api_request(
+        reply_types=[ProtocolMessageTypes.respond_block, ProtocolMessageTypes.reject_block], priority=ApiPriority.BULK
+    )
     async def request_block(self, request: beacon_protocol.RequestBlock) -> Optional[Message]:
         if not self.beacon.blockchain.contains_height(request.height):
             reject = RejectBlock(request.height)
@@ -171,7 +203,10 @@ class BeaconAPI:
             return make_msg(ProtocolMessageTypes.respond_block, beacon_protocol.RespondBlock(block))
         return make_msg(ProtocolMessageTypes.reject_block, RejectBlock(request.height))
 
-    @api_request(reply_types=[ProtocolMessageTypes.respond_blocks, ProtocolMessageTypes.reject_blocks])
+    @api_request(
+        reply_types=[ProtocolMessageTypes.respond_blocks, ProtocolMessageTypes.reject_blocks],
+        priority=ApiPriority.BULK,
+    )
     async def request_blocks(self, request: beacon_protocol.RequestBlocks) -> Optional[Message]:
         if (
             request.end_height < request.start_height
@@ -237,7 +272,7 @@ class BeaconAPI:
         self.log.warning(f"Received unsolicited/late block from peer {peer.get_peer_logging()}")
         return None
 
-    @api_request()
+    @api_request(priority=ApiPriority.CRITICAL)
     async def new_unfinished_block(
         self, new_unfinished_block: beacon_protocol.NewUnfinishedBlock
     ) -> Optional[Message]:
@@ -245,6 +280,11 @@ class BeaconAPI:
         if self.beacon.sync_store.get_sync_mode():
             return None
         block_hash = new_unfinished_block.unfinished_reward_hash
+        announcements_received.inc(labels=("new_unfinished_block",))
+        # Only blocks we stored are in the filter, so a failed request doesn't hide the block from the other peers
+        if block_hash in self.recent_unfinished_blocks:
+            announcements_dropped.inc(labels=("new_unfinished_block",))
+            return None
         if self.beacon.beacon_store.get_unfinished_block(block_hash) is not None:
             return None
 
@@ -269,7 +309,7 @@ class BeaconAPI:
 
         return msg
 
-    @api_request(reply_types=[ProtocolMessageTypes.respond_unfinished_block])
+    @api_request(reply_types=[ProtocolMessageTypes.respond_unfinished_block], priority=ApiPriority.CRITICAL)
     async def request_unfinished_block(
         self, request_unfinished_block: beacon_protocol.RequestUnfinishedBlock
     ) -> Optional[Message]:
@@ -284,7 +324,7 @@ class BeaconAPI:
             return msg
         return None
 
-    @api_request(peer_required=True, bytes_required=True)
+    @api_request(peer_required=True, bytes_required=True, priority=ApiPriority.CRITICAL)
     async def respond_unfinished_block(
         self,
         respond_unfinished_block: beacon_protocol.RespondUnfinishedBlock,
@@ -293,18 +333,25 @@ class BeaconAPI:
     ) -> Optional[Message]:
         if self.beacon.sync_store.get_sync_mode():
             return None
-        await self.beacon.add_unfinished_block(
-            respond_unfinished_block.unfinished_block, peer, block_bytes=respond_unfinished_block_bytes
-        )
+        block = respond_unfinished_block.unfinished_block
+        await self.beacon.add_unfinished_block(block, peer, block_bytes=respond_unfinished_block_bytes)
+        if self.beacon.beacon_store.get_unfinished_block(block.partial_hash) is not None:
+            self.recent_unfinished_blocks.add(block.partial_hash)
         return None
 
-    @api_request(peer_required=True)
+    @api_request(peer_required=True, priority=ApiPriority.CRITICAL)
     async def new_signage_point_or_end_of_sub_slot(
         self, new_sp: beacon_protocol.NewSignagePointOrEndOfSubSlot, peer: WSBpxConnection
     ) -> Optional[Message]:
         # Ignore if syncing
         if self.beacon.sync_store.get_sync_mode():
             return None
+        announcements_received.inc(labels=("new_signage_point_or_end_of_sub_slot",))
+        # Only signage points and sub slots we stored are in the filter, see respond_signage_point and
+        # respond_end_of_sub_slot
+        if (new_sp.challenge_hash, new_sp.index_from_challenge, new_sp.last_rc_infusion) in self.recent_signage_points:
+            announcements_dropped.inc(labels=("new_signage_point_or_end_of_sub_slot",))
+            return None
         if (
             self.beacon.beacon_store.get_signage_point_by_index(
                 new_sp.challenge_hash,
@@ -382,7 +429,10 @@ class BeaconAPI:
 
         return make_msg(ProtocolMessageTypes.request_signage_point_or_end_of_sub_slot, beacon_request)
 
-    @api_request(reply_types=[ProtocolMessageTypes.respond_signage_point, ProtocolMessageTypes.respond_end_of_sub_slot])
+    @api_request(
+        reply_types=[ProtocolMessageTypes.respond_signage_point, ProtocolMessageTypes.respond_end_of_sub_slot],
+        priority=ApiPriority.CRITICAL,
+    )
     async def request_signage_point_or_end_of_sub_slot(
         self, request: beacon_protocol.RequestSignagePointOrEndOfSubSlot
     ) -> Optional[Message]:
@@ -424,7 +474,7 @@ class BeaconAPI:
                 self.log.info(f"Don't have signage point {request}")
         return None
 
-    @api_request(peer_required=True)
+    @api_request(peer_required=True, priority=ApiPriority.CRITICAL)
     async def respond_signage_point(
         self, request: beacon_protocol.RespondSignagePoint, peer: WSBpxConnection
     ) -> Optional[Message]:
@@ -469,6 +519,13 @@ class BeaconAPI:
             )
 
             if added:
+                self.recent_signage_points.add(
+                    (
+                        request.challenge_chain_vdf.challenge,
+                        request.index_from_challenge,
+                        request.reward_chain_vdf.challenge,
+                    )
+                )
                 await self.beacon.signage_point_post_processing(request, peer, ip_sub_slot)
             else:
                 self.log.debug(
@@ -478,17 +535,26 @@ class BeaconAPI:
 
             return None
 
-    @api_request(peer_required=True)
+    @api_request(peer_required=True, priority=ApiPriority.CRITICAL)
     async def respond_end_of_sub_slot(
         self, request: beacon_protocol.RespondEndOfSubSlot, peer: WSBpxConnection
     ) -> Optional[Message]:
         if self.beacon.sync_store.get_sync_mode():
             return None
-        msg, _ = await self.beacon.add_end_of_sub_slot(request.end_of_slot_bundle, peer)
+        end_of_slot_bundle = request.end_of_slot_bundle
+        msg, added = await self.beacon.add_end_of_sub_slot(end_of_slot_bundle, peer)
+        if added:
+            self.recent_signage_points.add(
+                (
+                    end_of_slot_bundle.challenge_chain.get_hash(),
+                    uint8(0),
+                    end_of_slot_bundle.reward_chain.end_of_slot_vdf.challenge,
+                )
+            )
         return msg
 
     # FARMER PROTOCOL
-    @api_request(peer_required=True)
+    @api_request(peer_required=True, priority=ApiPriority.CRITICAL)
     async def declare_proof_of_space(
         self, request: farmer_protocol.DeclareProofOfSpace, peer: WSBpxConnection
     ) -> Optional[Message]:
@@ -692,7 +758,7 @@ class BeaconAPI:
 
         return None
 
-    @api_request(peer_required=True)
+    @api_request(peer_required=True, priority=ApiPriority.CRITICAL)
     async def signed_values(
         self, farmer_request: farmer_protocol.SignedValues, peer: WSBpxConnection
     ) -> Optional[Message]:
@@ -738,7 +804,7 @@ class BeaconAPI:
         return None
 
     # TIMELORD PROTOCOL
-    @api_request(peer_required=True)
+    @api_request(peer_required=True, priority=ApiPriority.CRITICAL)
     async def new_infusion_point_vdf(
         self, request: timelord_protocol.NewInfusionPointVDF, peer: WSBpxConnection
     ) -> Optional[Message]:
@@ -748,7 +814,7 @@ class BeaconAPI:
         async with self.beacon.timelord_lock:
             return await self.beacon.new_infusion_point_vdf(request, peer)
 
-    @api_request(peer_required=True)
+    @api_request(peer_required=True, priority=ApiPriority.CRITICAL)
     async def new_signage_point_vdf(
         self, request: timelord_protocol.NewSignagePointVDF, peer: WSBpxConnection
     ) -> None:
@@ -764,7 +830,7 @@ class BeaconAPI:
         )
         await self.respond_signage_point(beacon_message, peer)
 
-    @api_request(peer_required=True)
+    @api_request(peer_required=True, priority=ApiPriority.CRITICAL)
     async def new_end_of_sub_slot_vdf(
         self, request: timelord_protocol.NewEndOfSubSlotVDF, peer: WSBpxConnection
     ) -> Optional[Message]:
@@ -822,7 +888,7 @@ class BeaconAPI:
 
         return None
 
-    @api_request(peer_required=True, reply_types=[ProtocolMessageTypes.respond_compact_vdf])
+    @api_request(peer_required=True, reply_types=[ProtocolMessageTypes.respond_compact_vdf], priority=ApiPriority.BULK)
     async def request_compact_vdf(self, request: beacon_protocol.RequestCompactVDF, peer: WSBpxConnection) -> None:
         if self.beacon.sync_store.get_sync_mode():
             return None
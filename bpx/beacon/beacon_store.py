@@ -57,6 +57,12 @@ class BeaconStore:
     # For the first sub-slot, EndOfSlotBundle is None
     finished_sub_slots: List[Tuple[Optional[EndOfSubSlotBundle], List[Optional[SignagePoint]], uint128]]
 
+    # Indexes into finished_sub_slots, kept up to date whenever slots or sps are added or replaced.
+    # Challenge chain hash of each sub slot (the genesis challenge for the first empty slot) to its position
+    sub_slot_indexes: Dict[bytes32, int]
+    # Hash of the challenge chain VDF output of each signage point to the signage point
+    signage_points_by_hash: Dict[bytes32, SignagePoint]
+
     # These caches maintain objects which depend on infused blocks in the reward chain, that we
     # might receive before the blocks themselves. The dict keys are the reward chain challenge hashes.
 
@@ -88,6 +94,8 @@ class BeaconStore:
         self.seen_unfinished_blocks = set()
         self.unfinished_blocks = {}
         self.finished_sub_slots = []
+        self.sub_slot_indexes = {}
+        self.signage_points_by_hash = {}
         self.future_eos_cache = {}
         self.future_sp_cache = {}
         self.future_ip_cache = {}
@@ -230,17 +238,39 @@ class BeaconStore:
 
     def clear_slots(self) -> None:
         self.finished_sub_slots.clear()
+        self.sub_slot_indexes.clear()
+        self.signage_points_by_hash.clear()
+
+    def _add_sub_slot(
+        self, sub_slot: Optional[EndOfSubSlotBundle], sps: List[Optional[SignagePoint]], total_iters: uint128
+    ) -> None:
+        if sub_slot is None:
+            cc_hash = self.constants.GENESIS_CHALLENGE
+        else:
+            cc_hash = sub_slot.challenge_chain.get_hash()
+        self.sub_slot_indexes[cc_hash] = len(self.finished_sub_slots)
+        self.finished_sub_slots.append((sub_slot, sps, total_iters))
+        for sp in sps:
+            if sp is not None:
+                assert sp.cc_vdf is not None
+                self.signage_points_by_hash[sp.cc_vdf.output.get_hash()] = sp
+
+    def _get_slot_index(self, challenge_hash: bytes32) -> Optional[int]:
+        return self.sub_slot_indexes.get(challenge_hash)
 
     def get_sub_slot(self, challenge_hash: bytes32) -> Optional[Tuple[EndOfSubSlotBundle, int, uint128]]:
         assert len(self.finished_sub_slots) >= 1
-        for index, (sub_slot, _, total_iters) in enumerate(self.finished_sub_slots):
-            if sub_slot is not None and sub_slot.challenge_chain.get_hash() == challenge_hash:
-                return sub_slot, index, total_iters
-        return None
+        index = self._get_slot_index(challenge_hash)
+        if index is None:
+            return None
+        sub_slot, _, total_iters = self.finished_sub_slots[index]
+        if sub_slot is None:
+            return None
+        return sub_slot, index, total_iters
 
     def initialize_genesis_sub_slot(self) -> None:
         self.clear_slots()
-        self.finished_sub_slots = [(None, [None] * self.constants.NUM_SPS_SUB_SLOT, uint128(0))]
+        self._add_sub_slot(None, [None] * self.constants.NUM_SPS_SUB_SLOT, uint128(0))
 
     def new_finished_sub_slot(
         self,
@@ -268,9 +298,10 @@ class BeaconStore:
         icc_iters: Optional[uint64] = None
 
         # Skip if already present
-        for slot, _, _ in self.finished_sub_slots:
-            if slot == eos:
-                return []
+        new_cc_hash = eos.challenge_chain.get_hash()
+        existing_index = self._get_slot_index(new_cc_hash)
+        if existing_index is not None and self.finished_sub_slots[existing_index][0] == eos:
+            return []
 
         if eos.challenge_chain.challenge_chain_end_of_slot_vdf.challenge != cc_challenge:
             # This slot does not append to our next slot
@@ -441,9 +472,8 @@ class BeaconStore:
             if eos.infused_challenge_chain is not None or eos.proofs.infused_challenge_chain_slot_proof is not None:
                 return None
 
-        self.finished_sub_slots.append((eos, [None] * self.constants.NUM_SPS_SUB_SLOT, total_iters))
+        self._add_sub_slot(eos, [None] * self.constants.NUM_SPS_SUB_SLOT, total_iters)
 
-        new_cc_hash = eos.challenge_chain.get_hash()
         self.recent_eos.put(new_cc_hash, (eos, time.time()))
 
         new_ips: List[timelord_protocol.NewInfusionPointVDF] = []
@@ -480,114 +510,117 @@ class BeaconStore:
             and signage_point.rc_vdf is not None
             and signage_point.rc_proof is not None
         )
-        for sub_slot, sp_arr, start_ss_total_iters in self.finished_sub_slots:
+        slot_index = self._get_slot_index(signage_point.cc_vdf.challenge)
+        if slot_index is not None:
+            sub_slot, sp_arr, start_ss_total_iters = self.finished_sub_slots[slot_index]
             if sub_slot is None:
                 assert start_ss_total_iters == 0
                 ss_challenge_hash = self.constants.GENESIS_CHALLENGE
                 ss_reward_hash = self.constants.GENESIS_CHALLENGE
             else:
-                ss_challenge_hash = sub_slot.challenge_chain.get_hash()
+                ss_challenge_hash = signage_point.cc_vdf.challenge
                 ss_reward_hash = sub_slot.reward_chain.get_hash()
-            if ss_challenge_hash == signage_point.cc_vdf.challenge:
-                # If we do have this slot, find the Prev block from SP and validate SP
-                if peak is not None and start_ss_total_iters > peak.total_iters:
-                    # We are in a future sub slot from the peak, so maybe there is a new SSI
-                    checkpoint_size: uint64 = uint64(next_sub_slot_iters // self.constants.NUM_SPS_SUB_SLOT)
-                    delta_iters: uint64 = uint64(checkpoint_size * index)
-                    future_sub_slot: bool = True
-                else:
-                    # We are not in a future sub slot from the peak, so there is no new SSI
-                    checkpoint_size = uint64(sub_slot_iters // self.constants.NUM_SPS_SUB_SLOT)
-                    delta_iters = uint64(checkpoint_size * index)
-                    future_sub_slot = False
-                sp_total_iters = start_ss_total_iters + delta_iters
+            # If we do have this slot, find the Prev block from SP and validate SP
+            if peak is not None and start_ss_total_iters > peak.total_iters:
+                # We are in a future sub slot from the peak, so maybe there is a new SSI
+                checkpoint_size: uint64 = uint64(next_sub_slot_iters // self.constants.NUM_SPS_SUB_SLOT)
+                delta_iters: uint64 = uint64(checkpoint_size * index)
+                future_sub_slot: bool = True
+            else:
+                # We are not in a future sub slot from the peak, so there is no new SSI
+                checkpoint_size = uint64(sub_slot_iters // self.constants.NUM_SPS_SUB_SLOT)
+                delta_iters = uint64(checkpoint_size * index)
+                future_sub_slot = False
+            sp_total_iters = start_ss_total_iters + delta_iters
+
+            curr = peak
+            if peak is None or future_sub_slot:
+                check_from_start_of_ss = True
+            else:
+                check_from_start_of_ss = False
+                while (
+                    curr is not None and curr.total_iters > start_ss_total_iters and curr.total_iters > sp_total_iters
+                ):
+                    if curr.first_in_sub_slot:
+                        # Did not find a block where it's iters are before our sp_total_iters, in this ss
+                        check_from_start_of_ss = True
+                        break
+                    curr = blocks.block_record(curr.prev_hash)
 
-                curr = peak
-                if peak is None or future_sub_slot:
-                    check_from_start_of_ss = True
-                else:
-                    check_from_start_of_ss = False
-                    while (
-                        curr is not None
-                        and curr.total_iters > start_ss_total_iters
-                        and curr.total_iters > sp_total_iters
-                    ):
-                        if curr.first_in_sub_slot:
-                            # Did not find a block where it's iters are before our sp_total_iters, in this ss
-                            check_from_start_of_ss = True
-                            break
-                        curr = blocks.block_record(curr.prev_hash)
-
-                if check_from_start_of_ss:
-                    # Check VDFs from start of sub slot
-                    cc_vdf_info_expected = VDFInfo(
-                        ss_challenge_hash,
-                        delta_iters,
-                        signage_point.cc_vdf.output,
-                    )
-
-                    rc_vdf_info_expected = VDFInfo(
-                        ss_reward_hash,
-                        delta_iters,
-                        signage_point.rc_vdf.output,
-                    )
-                else:
-                    # Check VDFs from curr
-                    assert curr is not None
-                    cc_vdf_info_expected = VDFInfo(
-                        ss_challenge_hash,
-                        uint64(sp_total_iters - curr.total_iters),
-                        signage_point.cc_vdf.output,
-                    )
-                    rc_vdf_info_expected = VDFInfo(
-                        curr.reward_infusion_new_challenge,
-                        uint64(sp_total_iters - curr.total_iters),
-                        signage_point.rc_vdf.output,
-                    )
-                if not signage_point.cc_vdf == dataclasses.replace(
-                    cc_vdf_info_expected, number_of_iterations=delta_iters
+            if check_from_start_of_ss:
+                # Check VDFs from start of sub slot
+                cc_vdf_info_expected = VDFInfo(
+                    ss_challenge_hash,
+                    delta_iters,
+                    signage_point.cc_vdf.output,
+                )
+
+                rc_vdf_info_expected = VDFInfo(
+                    ss_reward_hash,
+                    delta_iters,
+                    signage_point.rc_vdf.output,
+                )
+            else:
+                # Check VDFs from curr
+                assert curr is not None
+                cc_vdf_info_expected = VDFInfo(
+                    ss_challenge_hash,
+                    uint64(sp_total_iters - curr.total_iters),
+                    signage_point.cc_vdf.output,
+                )
+                rc_vdf_info_expected = VDFInfo(
+                    curr.reward_infusion_new_challenge,
+                    uint64(sp_total_iters - curr.total_iters),
+                    signage_point.rc_vdf.output,
+                )
+            if not signage_point.cc_vdf == dataclasses.replace(cc_vdf_info_expected, number_of_iterations=delta_iters):
+                self.add_to_future_sp(signage_point, index)
+                return False
+            if check_from_start_of_ss:
+                start_ele = ClassgroupElement.get_default_element()
+            else:
+                assert curr is not None
+                start_ele = curr.challenge_vdf_output
+            if not skip_vdf_validation:
+                if not signage_point.cc_proof.normalized_to_identity and not signage_point.cc_proof.is_valid(
+                    self.constants,
+                    start_ele,
+                    cc_vdf_info_expected,
                 ):
                     self.add_to_future_sp(signage_point, index)
                     return False
-                if check_from_start_of_ss:
-                    start_ele = ClassgroupElement.get_default_element()
-                else:
-                    assert curr is not None
-                    start_ele = curr.challenge_vdf_output
-                if not skip_vdf_validation:
-                    if not signage_point.cc_proof.normalized_to_identity and not signage_point.cc_proof.is_valid(
-                        self.constants,
-                        start_ele,
-                        cc_vdf_info_expected,
-                    ):
-                        self.add_to_future_sp(signage_point, index)
-                        return False
-                    if signage_point.cc_proof.normalized_to_identity and not signage_point.cc_proof.is_valid(
-                        self.constants,
-                        ClassgroupElement.get_default_element(),
-                        signage_point.cc_vdf,
-                    ):
-                        self.add_to_future_sp(signage_point, index)
-                        return False
-
-                if rc_vdf_info_expected.challenge != signage_point.rc_vdf.challenge:
-                    # This signage point is probably outdated
+                if signage_point.cc_proof.normalized_to_identity and not signage_point.cc_proof.is_valid(
+                    self.constants,
+                    ClassgroupElement.get_default_element(),
+                    signage_point.cc_vdf,
+                ):
                     self.add_to_future_sp(signage_point, index)
                     return False
 
-                if not skip_vdf_validation:
-                    if not signage_point.rc_proof.is_valid(
-                        self.constants,
-                        ClassgroupElement.get_default_element(),
-                        signage_point.rc_vdf,
-                        rc_vdf_info_expected,
-                    ):
-                        self.add_to_future_sp(signage_point, index)
-                        return False
-
-                sp_arr[index] = signage_point
-                self.recent_signage_points.put(signage_point.cc_vdf.output.get_hash(), (signage_point, time.time()))
-                return True
+            if rc_vdf_info_expected.challenge != signage_point.rc_vdf.challenge:
+                # This signage point is probably outdated
+                self.add_to_future_sp(signage_point, index)
+                return False
+
+            if not skip_vdf_validation:
+                if not signage_point.rc_proof.is_valid(
+                    self.constants,
+                    ClassgroupElement.get_default_element(),
+                    signage_point.rc_vdf,
+                    rc_vdf_info_expected,
+                ):
+                    self.add_to_future_sp(signage_point, index)
+                    return False
+
+            replaced_sp = sp_arr[index]
+            if replaced_sp is not None:
+                assert replaced_sp.cc_vdf is not None
+                self.signage_points_by_hash.pop(replaced_sp.cc_vdf.output.get_hash(), None)
+            sp_arr[index] = signage_point
+            sp_hash = signage_point.cc_vdf.output.get_hash()
+            self.signage_points_by_hash[sp_hash] = signage_point
+            self.recent_signage_points.put(sp_hash, (signage_point, time.time()))
+            return True
         self.add_to_future_sp(signage_point, index)
         return False
 
@@ -596,35 +629,25 @@ class BeaconStore:
         if cc_signage_point == self.constants.GENESIS_CHALLENGE:
             return SignagePoint(None, None, None, None)
 
-        for sub_slot, sps, _ in self.finished_sub_slots:
-            if sub_slot is not None and sub_slot.challenge_chain.get_hash() == cc_signage_point:
-                return SignagePoint(None, None, None, None)
-            for sp in sps:
-                if sp is not None:
-                    assert sp.cc_vdf is not None
-                    if sp.cc_vdf.output.get_hash() == cc_signage_point:
-                        return sp
-        return None
+        index = self._get_slot_index(cc_signage_point)
+        if index is not None and self.finished_sub_slots[index][0] is not None:
+            return SignagePoint(None, None, None, None)
+        return self.signage_points_by_hash.get(cc_signage_point)
 
     def get_signage_point_by_index(
         self, challenge_hash: bytes32, index: uint8, last_rc_infusion: bytes32
     ) -> Optional[SignagePoint]:
         assert len(self.finished_sub_slots) >= 1
-        for sub_slot, sps, _ in self.finished_sub_slots:
-            if sub_slot is not None:
-                cc_hash = sub_slot.challenge_chain.get_hash()
-            else:
-                cc_hash = self.constants.GENESIS_CHALLENGE
-
-            if cc_hash == challenge_hash:
-                if index == 0:
-                    return SignagePoint(None, None, None, None)
-                sp: Optional[SignagePoint] = sps[index]
-                if sp is not None:
-                    assert sp.rc_vdf is not None
-                    if sp.rc_vdf.challenge == last_rc_infusion:
-                        return sp
-                return None
+        slot_index = self._get_slot_index(challenge_hash)
+        if slot_index is None:
+            return None
+        if index == 0:
+            return SignagePoint(None, None, None, None)
+        sp: Optional[SignagePoint] = self.finished_sub_slots[slot_index][1][index]
+        if sp is not None:
+            assert sp.rc_vdf is not None
+            if sp.rc_vdf.challenge == last_rc_infusion:
+                return sp
         return None
 
     def have_newer_signage_point(self, challenge_hash: bytes32, index: uint8, last_rc_infusion: bytes32) -> bool:
@@ -632,26 +655,18 @@ class BeaconStore:
         Returns true if we have a signage point at this index which is based on a newer infusion.
         """
         assert len(self.finished_sub_slots) >= 1
-        for sub_slot, sps, _ in self.finished_sub_slots:
-            if sub_slot is not None:
-                cc_hash = sub_slot.challenge_chain.get_hash()
-            else:
-                cc_hash = self.constants.GENESIS_CHALLENGE
-
-            if cc_hash == challenge_hash:
-                found_rc_hash = False
-                for i in range(0, index):
-                    sp: Optional[SignagePoint] = sps[i]
-                    if sp is not None and sp.rc_vdf is not None and sp.rc_vdf.challenge == last_rc_infusion:
-                        found_rc_hash = True
-                sp = sps[index]
-                if (
-                    found_rc_hash
-                    and sp is not None
-                    and sp.rc_vdf is not None
-                    and sp.rc_vdf.challenge != last_rc_infusion
-                ):
-                    return True
+        slot_index = self._get_slot_index(challenge_hash)
+        if slot_index is None:
+            return False
+        sps = self.finished_sub_slots[slot_index][1]
+        found_rc_hash = False
+        for i in range(0, index):
+            sp: Optional[SignagePoint] = sps[i]
+            if sp is not None and sp.rc_vdf is not None and sp.rc_vdf.challenge == last_rc_infusion:
+                found_rc_hash = True
+        sp = sps[index]
+        if found_rc_hash and sp is not None and sp.rc_vdf is not None and sp.rc_vdf.challenge != last_rc_infusion:
+            return True
         return False
 
     def new_peak(
@@ -717,10 +732,10 @@ class BeaconStore:
             prev_sub_slot_total_iters = peak.sp_sub_slot_total_iters(self.constants)
             if sp_sub_slot is not None or prev_sub_slot_total_iters == 0:
                 assert peak.overflow or prev_sub_slot_total_iters
-                self.finished_sub_slots.append((sp_sub_slot, sp_sub_slot_sps, prev_sub_slot_total_iters))
+                self._add_sub_slot(sp_sub_slot, sp_sub_slot_sps, prev_sub_slot_total_iters)
 
             ip_sub_slot_total_iters = peak.ip_sub_slot_total_iters(self.constants)
-            self.finished_sub_slots.append((ip_sub_slot, ip_sub_slot_sps, ip_sub_slot_total_iters))
+            self._add_sub_slot(ip_sub_slot, ip_sub_slot_sps, ip_sub_slot_total_iters)
 
         new_eos: Optional[EndOfSubSlotBundle] = None
         new_sps: List[Tuple[uint8, SignagePoint]] = []
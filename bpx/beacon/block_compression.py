@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+from contextlib import closing
+from typing import Dict, List, Optional
+
+import zstd
+
+log = logging.getLogger(__name__)
+
+try:
+    import zstandard
+
+    ZSTANDARD_INSTALLED = True
+except ImportError:
+    log.debug(
+        "importing zstandard failed."
+        " This is only required to train and use compression dictionaries for the blocks in the database."
+    )
+    ZSTANDARD_INSTALLED = False
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+COMPRESSION_LEVEL = 3
+DEFAULT_DICTIONARY_SIZE = 112 * 1024
+# Dictionary ids below 32768 are reserved by zstd, a dictionary is given the id DICTIONARY_ID_OFFSET + version
+DICTIONARY_ID_OFFSET = 32768
+
+# Compression dictionaries of the full_blocks table. The dictionary id derived from the version is written into every
+# frame compressed with it, so a blob names the dictionary it needs, and 0 means no dictionary.
+CREATE_DICTIONARIES_TABLE = (
+    "CREATE TABLE IF NOT EXISTS block_compression_dictionaries(version INTEGER PRIMARY KEY, dictionary blob)"
+)
+SELECT_DICTIONARIES = "SELECT version, dictionary FROM block_compression_dictionaries ORDER BY version"
+
+
+def frame_dictionary_id(blob: bytes) -> int:
+    """
+    Returns the dictionary id from the header of a zstd frame, 0 if the frame was compressed without a dictionary.
+    """
+    if blob[:4] != ZSTD_MAGIC or len(blob) < 6:
+        raise ValueError("Block blob is not a zstd frame")
+    descriptor = blob[4]
+    dictionary_id_size = (0, 1, 2, 4)[descriptor & 3]
+    if dictionary_id_size == 0:
+        return 0
+    # The window descriptor is omitted for single segment frames
+    start = 5 if descriptor & 0x20 else 6
+    return int.from_bytes(blob[start : start + dictionary_id_size], "little")
+
+
+def train_dictionary(samples: List[bytes], version: int, dictionary_size: int = DEFAULT_DICTIONARY_SIZE) -> bytes:
+    if not ZSTANDARD_INSTALLED:
+        raise RuntimeError("Training a compression dictionary requires the zstandard package")
+    dictionary = zstandard.train_dictionary(
+        dictionary_size, samples, dict_id=DICTIONARY_ID_OFFSET + version, level=COMPRESSION_LEVEL
+    )
+    data: bytes = dictionary.as_bytes()
+    return data
+
+
+class BlockCompressor:
+    """
+    Compresses blocks with the newest dictionary, if there is one and zstandard is installed, and with plain zstd
+    otherwise. Blocks compressed either way can be read, as long as their dictionary is loaded.
+    """
+
+    version: int
+    _compressor: Optional[zstandard.ZstdCompressor]
+    _decompressors: Dict[int, zstandard.ZstdDecompressor]
+
+    def __init__(self) -> None:
+        self.version = 0
+        self._compressor = None
+        self._decompressors = {}
+
+    def add_dictionary(self, version: int, dictionary: bytes) -> None:
+        if not ZSTANDARD_INSTALLED:
+            raise RuntimeError(
+                f"The database has block compression dictionary {version}, install the zstandard package to read the"
+                " blocks compressed with it"
+            )
+        data = zstandard.ZstdCompressionDict(dictionary)
+        if data.dict_id() != DICTIONARY_ID_OFFSET + version:
+            raise ValueError(f"Block compression dictionary {version} has the unexpected id {data.dict_id()}")
+        self._decompressors[version] = zstandard.ZstdDecompressor(dict_data=data)
+        if version > self.version:
+            self.version = version
+            self._compressor = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL, dict_data=data)
+
+    def compress(self, data: bytes) -> bytes:
+        if self._compressor is None:
+            ret: bytes = zstd.compress(data)
+            return ret
+        compressed: bytes = self._compressor.compress(data)
+        return compressed
+
+    def decompress(self, blob: bytes) -> bytes:
+        dictionary_id = frame_dictionary_id(blob)
+        if dictionary_id == 0:
+            ret: bytes = zstd.decompress(blob)
+            return ret
+        version = dictionary_id - DICTIONARY_ID_OFFSET
+        decompressor = self._decompressors.get(version)
+        if decompressor is None:
+            raise RuntimeError(f"Block is compressed with dictionary id {dictionary_id}, which is not loaded")
+        decompressed: bytes = decompressor.decompress(blob)
+        return decompressed
+
+
+def load_compressor(conn: sqlite3.Connection) -> BlockCompressor:
+    """
+    Returns a compressor with all the dictionaries of a database opened with sqlite3, for the offline db commands.
+    """
+    compressor = BlockCompressor()
+    try:
+        with closing(conn.execute(SELECT_DICTIONARIES)) as cursor:
+            for version, dictionary in cursor:
+                compressor.add_dictionary(version, dictionary)
+    except sqlite3.OperationalError:
+        # the database was created before compression dictionaries were added
+        pass
+    return compressor
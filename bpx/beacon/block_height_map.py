@@ -1,22 +1,29 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import mmap
+import os
+import struct
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
-
-import aiofiles
+from typing import BinaryIO, Dict, List, Optional, Tuple
 
 from bpx.types.blockchain_format.sized_bytes import bytes32
 from bpx.types.blockchain_format.sub_epoch_summary import SubEpochSummary
 from bpx.util.db_wrapper import DbWrapper
-from bpx.util.files import write_file_async
 from bpx.util.ints import uint32
 from bpx.util.streamable import Streamable, streamable
 
 log = logging.getLogger(__name__)
 
+# The height-to-hash file grows by this many bytes at a time (32768 heights)
+HEIGHT_TO_HASH_GROWTH = 32 * 32768
+# Each sub epoch summary record starts with its height and the size of the serialized summary
+SES_RECORD_HEADER = struct.Struct(">II")
+
 
+# The previous format of the sub epoch summary cache, only read to migrate it
 @streamable
 @dataclass(frozen=True)
 class SesCache(Streamable):
@@ -26,20 +33,33 @@ class SesCache(Streamable):
 class BlockHeightMap:
     db: DbWrapper
 
-    # the below dictionaries are loaded from the database, from the peak
+    # the below are loaded from the database, from the peak
     # and back in time on startup.
 
     # Defines the path from genesis to the peak, no orphan blocks
-    # this buffer contains all block hashes that are part of the current peak
+    # this memory mapped file contains all block hashes that are part of the current peak
     # ordered by height. i.e. __height_to_hash[0..32] is the genesis hash
-    # __height_to_hash[32..64] is the hash for height 1 and so on
-    __height_to_hash: bytearray
+    # __height_to_hash[32..64] is the hash for height 1 and so on. The file grows in
+    # steps of HEIGHT_TO_HASH_GROWTH, only the first __height_to_hash_size bytes are valid
+    __height_to_hash: Optional[mmap.mmap]
+    __height_to_hash_size: int
+    __height_to_hash_file: BinaryIO
 
     # All sub-epoch summaries that have been included in the blockchain from the beginning until and including the peak
     # (height_included, SubEpochSummary). Note: ONLY for the blocks in the path to the peak
     # The value is a serialized SubEpochSummary object
     __sub_epoch_summaries: Dict[uint32, bytes]
 
+    # The sub epoch summaries are stored as records appended in height order. This maps the height of each record
+    # on disk to its offset, so a rollback only truncates the file at the first record above the fork
+    __ses_offsets: Dict[uint32, int]
+    __ses_file_size: int
+    # the lowest height with sub epoch summary changes which are not on disk yet
+    __ses_dirty_from: Optional[int]
+
+    # the files are written in a thread, this keeps the writes of overlapping flushes in order
+    __flush_lock: asyncio.Lock
+
     # count how many blocks have been added since the cache was last written to
     # disk
     __dirty: int
@@ -56,10 +76,20 @@ class BlockHeightMap:
         self.db = db
 
         self.__dirty = 0
-        self.__height_to_hash = bytearray()
+        self.__height_to_hash = None
+        self.__height_to_hash_size = 0
         self.__sub_epoch_summaries = {}
+        self.__ses_offsets = {}
+        self.__ses_file_size = 0
+        self.__ses_dirty_from = None
+        self.__flush_lock = asyncio.Lock()
         self.__height_to_hash_filename = blockchain_dir / "height-to-hash"
-        self.__ses_filename = blockchain_dir / "sub-epoch-summaries"
+        self.__ses_filename = blockchain_dir / "sub-epoch-summaries-v2"
+
+        blockchain_dir.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.__height_to_hash_filename, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o600)
+        self.__height_to_hash_file = os.fdopen(fd, "r+b")
+        self.__map_height_to_hash(os.fstat(self.__height_to_hash_file.fileno()).st_size)
 
         async with self.db.reader_no_transaction() as conn:
             async with conn.execute("SELECT hash FROM current_peak WHERE key = 0") as cursor:
@@ -76,18 +106,15 @@ class BlockHeightMap:
                     return self
 
         try:
-            async with aiofiles.open(self.__height_to_hash_filename, "rb") as f:
-                self.__height_to_hash = bytearray(await f.read())
-        except Exception:
-            # it's OK if this file doesn't exist, we can rebuild it
-            pass
-
-        try:
-            async with aiofiles.open(self.__ses_filename, "rb") as f:
-                self.__sub_epoch_summaries = {k: v for (k, v) in SesCache.from_bytes(await f.read()).content}
-        except Exception:
-            # it's OK if this file doesn't exist, we can rebuild it
-            pass
+            self.__load_ses_file()
+        except Exception as e:
+            # it's OK if this file doesn't exist or is damaged, we can rebuild it
+            log.info(f"Rebuilding the sub epoch summaries cache: {e}")
+            self.__sub_epoch_summaries = {}
+            self.__ses_offsets = {}
+            self.__ses_file_size = 0
+            self.__ses_dirty_from = 0
+            self.__load_legacy_ses_file(blockchain_dir / "sub-epoch-summaries")
 
         peak: bytes32
         prev_hash: bytes32
@@ -95,14 +122,10 @@ class BlockHeightMap:
         prev_hash = row[1]
         height = row[2]
 
-        # allocate memory for height to hash map
-        # this may also truncate it, if thie file on disk had an invalid size
-        new_size = (height + 1) * 32
-        size = len(self.__height_to_hash)
-        if size > new_size:
-            del self.__height_to_hash[new_size:]
-        else:
-            self.__height_to_hash += bytearray([0] * (new_size - size))
+        # the hashes up to the peak are valid, whatever is stored beyond it belongs to an orphaned chain.
+        # Heights which were never written read as zeros.
+        self.__height_to_hash_size = (height + 1) * 32
+        self.__ensure_capacity(self.__height_to_hash_size)
 
         # if the peak hash is already in the height-to-hash map, we don't need
         # to load anything more from the DB
@@ -110,7 +133,7 @@ class BlockHeightMap:
             self.__set_hash(height, peak)
 
             if row[3] is not None:
-                self.__sub_epoch_summaries[height] = row[3]
+                self.__set_ses(height, row[3])
 
             # prepopulate the height -> hash mapping
             await self._load_blocks_from(height, prev_hash)
@@ -119,27 +142,123 @@ class BlockHeightMap:
 
         return self
 
+    def __map_height_to_hash(self, capacity: int) -> None:
+        if self.__height_to_hash is not None:
+            self.__height_to_hash.close()
+            self.__height_to_hash = None
+        capacity -= capacity % 32
+        if capacity == 0:
+            return
+        self.__height_to_hash_file.truncate(capacity)
+        self.__height_to_hash = mmap.mmap(self.__height_to_hash_file.fileno(), capacity)
+
+    def __ensure_capacity(self, size: int) -> None:
+        capacity = 0 if self.__height_to_hash is None else len(self.__height_to_hash)
+        if size <= capacity:
+            return
+        # round up to the next multiple of the growth step
+        self.__map_height_to_hash(-(-size // HEIGHT_TO_HASH_GROWTH) * HEIGHT_TO_HASH_GROWTH)
+
+    def __load_ses_file(self) -> None:
+        with open(self.__ses_filename, "rb") as f:
+            data = f.read()
+        offset = 0
+        while offset + SES_RECORD_HEADER.size <= len(data):
+            height, size = SES_RECORD_HEADER.unpack_from(data, offset)
+            end = offset + SES_RECORD_HEADER.size + size
+            if end > len(data):
+                # a partially written record, it's dropped at the next flush
+                break
+            self.__sub_epoch_summaries[uint32(height)] = data[offset + SES_RECORD_HEADER.size : end]
+            self.__ses_offsets[uint32(height)] = offset
+            offset = end
+        self.__ses_file_size = offset
+
+    def __load_legacy_ses_file(self, filename: Path) -> None:
+        try:
+            with open(filename, "rb") as f:
+                self.__sub_epoch_summaries = {k: v for (k, v) in SesCache.from_bytes(f.read()).content}
+        except Exception:
+            # it's OK if this file doesn't exist, we can rebuild it
+            pass
+
     def update_height(self, height: uint32, header_hash: bytes32, ses: Optional[SubEpochSummary]) -> None:
         # we're only updating the last hash. If we've reorged, we already rolled
         # back, making this the new peak
-        assert height * 32 <= len(self.__height_to_hash)
+        assert height * 32 <= self.__height_to_hash_size
         self.__set_hash(height, header_hash)
         if ses is not None:
-            self.__sub_epoch_summaries[height] = bytes(ses)
+            self.__set_ses(height, bytes(ses))
 
     async def maybe_flush(self) -> None:
         if self.__dirty < 1000:
             return
+        await self.flush()
 
-        assert (len(self.__height_to_hash) % 32) == 0
-        map_buf = self.__height_to_hash.copy()
+    async def flush(self) -> None:
+        async with self.__flush_lock:
+            if self.__dirty == 0 and self.__ses_dirty_from is None:
+                return
 
-        ses_buf = bytes(SesCache([(k, v) for (k, v) in self.__sub_epoch_summaries.items()]))
-
-        self.__dirty = 0
+            self.__dirty = 0
+            ses_records = self.__prepare_ses_records()
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.__write_files, ses_records, self.__height_to_hash
+            )
 
-        await write_file_async(self.__height_to_hash_filename, map_buf)
-        await write_file_async(self.__ses_filename, ses_buf)
+    def close(self) -> None:
+        """
+        Closes the height-to-hash map and its file, changes not flushed yet are left to the OS to write back.
+        """
+        if self.__height_to_hash is not None:
+            self.__height_to_hash.close()
+            self.__height_to_hash = None
+        self.__height_to_hash_file.close()
+
+    def __prepare_ses_records(self) -> Optional[Tuple[int, bytes]]:
+        """
+        Returns the offset to truncate the sub epoch summary file at and the records to append there, if any
+        changed.
+        """
+        if self.__ses_dirty_from is None:
+            return None
+        dirty_from = self.__ses_dirty_from
+        self.__ses_dirty_from = None
+
+        # drop the records from the first changed height on, then append the current ones
+        stale_heights = [height for height in self.__ses_offsets if height >= dirty_from]
+        if len(stale_heights) > 0:
+            self.__ses_file_size = min(self.__ses_offsets[height] for height in stale_heights)
+            for height in stale_heights:
+                del self.__ses_offsets[height]
+
+        records = bytearray()
+        for height in sorted(height for height in self.__sub_epoch_summaries if height >= dirty_from):
+            ses = self.__sub_epoch_summaries[height]
+            self.__ses_offsets[height] = self.__ses_file_size + len(records)
+            records += SES_RECORD_HEADER.pack(height, len(ses))
+            records += ses
+
+        offset = self.__ses_file_size
+        self.__ses_file_size += len(records)
+        return offset, bytes(records)
+
+    def __write_files(self, ses_records: Optional[Tuple[int, bytes]], height_to_hash: Optional[mmap.mmap]) -> None:
+        # runs in a thread
+        if ses_records is not None:
+            offset, records = ses_records
+            mode = "r+b" if self.__ses_filename.exists() else "w+b"
+            with open(self.__ses_filename, mode) as f:
+                f.truncate(offset)
+                f.seek(offset)
+                f.write(records)
+        if height_to_hash is not None:
+            try:
+                # only the pages changed since the last flush are written
+                height_to_hash.flush()
+            except ValueError:
+                # the map grew and was remapped meanwhile, its pages are written by the next flush
+                pass
 
     # load height-to-hash map entries from the DB starting at height back in
     # time until we hit a match in the existing map, at which point we can
@@ -177,27 +296,44 @@ class BlockHeightMap:
                         and self.__sub_epoch_summaries[height] == entry[2]
                     ):
                         return
-                    self.__sub_epoch_summaries[height] = entry[2]
+                    self.__set_ses(height, entry[2])
                 elif height in self.__sub_epoch_summaries:
                     # if the database file was swapped out and the existing
                     # cache doesn't represent any of it at all, a missing sub
                     # epoch summary needs to be removed from the cache too
-                    del self.__sub_epoch_summaries[height]
+                    self.__delete_ses(height)
                 self.__set_hash(height, prev_hash)
                 prev_hash = entry[1]
 
     def __set_hash(self, height: int, block_hash: bytes32) -> None:
         idx = height * 32
+        assert idx <= self.__height_to_hash_size
+        self.__ensure_capacity(idx + 32)
+        assert self.__height_to_hash is not None
         self.__height_to_hash[idx : idx + 32] = block_hash
+        self.__height_to_hash_size = max(self.__height_to_hash_size, idx + 32)
         self.__dirty += 1
 
+    def __set_ses(self, height: uint32, ses: bytes) -> None:
+        self.__sub_epoch_summaries[height] = ses
+        self.__mark_ses_dirty(height)
+
+    def __delete_ses(self, height: uint32) -> None:
+        del self.__sub_epoch_summaries[height]
+        self.__mark_ses_dirty(height)
+
+    def __mark_ses_dirty(self, height: int) -> None:
+        if self.__ses_dirty_from is None or height < self.__ses_dirty_from:
+            self.__ses_dirty_from = height
+
     def get_hash(self, height: uint32) -> bytes32:
         idx = height * 32
-        assert idx + 32 <= len(self.__height_to_hash)
+        assert idx + 32 <= self.__height_to_hash_size
+        assert self.__height_to_hash is not None
         return bytes32(self.__height_to_hash[idx : idx + 32])
 
     def contains_height(self, height: uint32) -> bool:
-        return height * 32 < len(self.__height_to_hash)
+        return height * 32 < self.__height_to_hash_size
 
     def rollback(self, fork_height: int) -> None:
         # fork height may be -1, in which case all blocks are different and we
@@ -207,8 +343,9 @@ class BlockHeightMap:
             if ses_included_height > fork_height:
                 heights_to_delete.append(ses_included_height)
         for height in heights_to_delete:
-            del self.__sub_epoch_summaries[height]
-        del self.__height_to_hash[(fork_height + 1) * 32 :]
+            self.__delete_ses(height)
+        # the hashes above the fork are overwritten in place as the new chain is added
+        self.__height_to_hash_size = min(self.__height_to_hash_size, (fork_height + 1) * 32)
 
     def get_ses(self, height: uint32) -> SubEpochSummary:
         return SubEpochSummary.from_bytes(self.__sub_epoch_summaries[height])
@@ -3,11 +3,11 @@ from __future__ import annotations
 import dataclasses
 import logging
 import sqlite3
-from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple, Union
 
 import typing_extensions
-import zstd
 
+from bpx.beacon.block_compression import CREATE_DICTIONARIES_TABLE, SELECT_DICTIONARIES, BlockCompressor
 from bpx.consensus.block_record import BlockRecord
 from bpx.types.blockchain_format.sized_bytes import bytes32
 from bpx.types.full_block import FullBlock
@@ -26,6 +26,7 @@ class BlockStore:
     block_cache: LRUCache[bytes32, FullBlock]
     db_wrapper: DbWrapper
     ses_challenge_cache: LRUCache[bytes32, List[SubEpochChallengeSegment]]
+    compressor: BlockCompressor = dataclasses.field(default_factory=BlockCompressor)
 
     @classmethod
     async def create(cls, db_wrapper: DbWrapper) -> BlockStore:
@@ -78,6 +79,14 @@ class BlockStore:
                 "CREATE INDEX IF NOT EXISTS main_chain ON full_blocks(height, in_main_chain) WHERE in_main_chain=1"
             )
 
+            # Dictionaries are only added by `bpx db train-dictionary`, blocks are compressed with the newest one
+            await conn.execute(CREATE_DICTIONARIES_TABLE)
+            async with conn.execute(SELECT_DICTIONARIES) as cursor:
+                for version, dictionary in await cursor.fetchall():
+                    self.compressor.add_dictionary(version, dictionary)
+            if self.compressor.version > 0:
+                log.info(f"DB: Compressing blocks with dictionary {self.compressor.version}")
+
         return self
 
     def maybe_from_hex(self, field: Union[bytes, str]) -> bytes32:
@@ -88,16 +97,14 @@ class BlockStore:
         return field
 
     def compress(self, block: FullBlock) -> bytes:
-        ret: bytes = zstd.compress(bytes(block))
-        return ret
+        return self.compressor.compress(bytes(block))
 
     def maybe_decompress(self, block_bytes: bytes) -> FullBlock:
-        ret: FullBlock = FullBlock.from_bytes(zstd.decompress(block_bytes))
+        ret: FullBlock = FullBlock.from_bytes(self.compressor.decompress(block_bytes))
         return ret
 
     def maybe_decompress_blob(self, block_bytes: bytes) -> bytes:
-        ret: bytes = zstd.decompress(block_bytes)
-        return ret
+        return self.compressor.decompress(block_bytes)
 
     async def rollback(self, height: int) -> None:
         async with self.db_wrapper.writer_maybe_transaction() as conn:
@@ -164,6 +171,14 @@ class BlockStore:
                 (self.maybe_to_hex(ses_block_hash), bytes(SubEpochSegments(segments))),
             )
 
+    async def get_sub_epoch_segments_hashes(self) -> Set[bytes32]:
+        """
+        Returns the hashes of all sub epoch summary blocks with persisted challenge segments.
+        """
+        async with self.db_wrapper.reader_no_transaction() as conn:
+            async with conn.execute("SELECT ses_block_hash FROM sub_epoch_segments_v3") as cursor:
+                return {bytes32(row[0]) for row in await cursor.fetchall()}
+
     async def get_sub_epoch_challenge_segments(
         self,
         ses_block_hash: bytes32,
@@ -218,8 +233,7 @@ class BlockStore:
             ) as cursor:
                 row = await cursor.fetchone()
         if row is not None:
-            ret: bytes = zstd.decompress(row[0])
-            return ret
+            return self.maybe_decompress_blob(row[0])
 
         return None
 
@@ -377,6 +391,17 @@ class BlockStore:
                     raise ValueError(f"Some blocks in range {start}-{stop} were not found.")
                 return [maybe_decompress_blob(row[0]) for row in rows]
 
+    async def get_last_block_rowid(self) -> int:
+        """
+        Returns the rowid of the most recently written block. Any block written after this changes it, which makes
+        it cheap to detect whether the blocks table changed.
+        """
+        async with self.db_wrapper.reader_no_transaction() as conn:
+            row = await execute_fetchone(conn, "SELECT MAX(rowid) FROM full_blocks")
+        if row is None or row[0] is None:
+            return 0
+        return int(row[0])
+
     async def get_peak(self) -> Optional[Tuple[bytes32, uint32]]:
             async with self.db_wrapper.reader_no_transaction() as conn:
                 async with conn.execute("SELECT hash FROM current_peak WHERE key = 0") as cursor:
@@ -5,6 +5,9 @@ import asyncio
 import time
 
 from typing import (
+    Any,
+    Dict,
+    List,
     Optional,
     Union,
 )
@@ -13,6 +16,7 @@ from web3 import Web3, HTTPProvider
 from web3.method import Method
 from web3.module import Module
 from web3.providers.rpc import URI
+from web3.types import RPCEndpoint, RPCResponse
 import jwt
 from hexbytes import HexBytes
 
@@ -23,12 +27,20 @@ from bpx.util.ints import uint64, uint256
 from bpx.types.blockchain_format.execution_payload import ExecutionPayloadV2, WithdrawalV1
 from bpx.util.byte_types import hexstr_to_bytes
 from bpx.consensus.block_rewards import create_withdrawals
+from bpx.util.metrics import registry as metrics_registry
 
 COINBASE_NULL = bytes20.fromhex("0000000000000000000000000000000000000000")
 BLOCK_HASH_NULL = bytes32.fromhex("0000000000000000000000000000000000000000000000000000000000000000")
 
 log = logging.getLogger(__name__)
 
+engine_api_seconds = metrics_registry.histogram(
+    "bpx_engine_api_request_seconds", "Time taken by Engine API requests to the execution client", ["method"]
+)
+engine_api_errors = metrics_registry.counter(
+    "bpx_engine_api_request_errors_total", "Engine API requests which failed to get a response", ["method"]
+)
+
 class HTTPAuthProvider(HTTPProvider):
     secret: bytes
 
@@ -58,6 +70,14 @@ class HTTPAuthProvider(HTTPProvider):
         )
         return headers
 
+    def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        with engine_api_seconds.time((method,)):
+            try:
+                return super().make_request(method, params)
+            except Exception:
+                engine_api_errors.inc(labels=(method,))
+                raise
+
 class EngineModule(Module):
     exchange_transition_configuration_v1 = Method("engine_exchangeTransitionConfigurationV1")
     forkchoice_updated_v2 = Method("engine_forkchoiceUpdatedV2")
@@ -262,16 +262,26 @@ class WeightProofHandler:
         if ses_blocks is None:
             return None
 
+        # Only the missing segments are created, newest first since those are the most likely to be sampled.
+        # Weight proofs create any segment they need which isn't there yet, so this only runs in the background.
+        persisted = await self.blockchain.get_sub_epoch_segments_hashes()
+        missing: List[int] = []
         for sub_epoch_n, ses_height in enumerate(summary_heights):
-            log.debug(f"check db for sub epoch {sub_epoch_n}")
             if ses_height > peak_height:
                 break
             ses_block = ses_blocks[sub_epoch_n]
             if ses_block is None or ses_block.sub_epoch_summary_included is None:
                 log.error("error while building proof")
                 return None
-            await self.__create_persist_segment(prev_ses_block, ses_block, ses_height, sub_epoch_n)
-            prev_ses_block = ses_block
+            if ses_block.header_hash not in persisted:
+                missing.append(sub_epoch_n)
+        log.debug(f"{len(missing)} sub epochs without segments")
+
+        for sub_epoch_n in reversed(missing):
+            prev_block = prev_ses_block if sub_epoch_n == 0 else ses_blocks[sub_epoch_n - 1]
+            await self.__create_persist_segment(
+                prev_block, ses_blocks[sub_epoch_n], summary_heights[sub_epoch_n], sub_epoch_n
+            )
             await asyncio.sleep(2)
         log.debug("done checking segments")
         return None
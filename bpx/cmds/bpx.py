@@ -1,35 +1,78 @@
 from __future__ import annotations
 
+import importlib
 from io import TextIOWrapper
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 import click
 
 from bpx import __version__
-from bpx.cmds.beta import beta_cmd
-from bpx.cmds.configure import configure_cmd
-from bpx.cmds.db import db_cmd
-from bpx.cmds.farm import farm_cmd
-from bpx.cmds.init import init_cmd
-from bpx.cmds.keys import keys_cmd
-from bpx.cmds.netspace import netspace_cmd
-from bpx.cmds.passphrase import passphrase_cmd
-from bpx.cmds.peer import peer_cmd
-from bpx.cmds.plots import plots_cmd
-from bpx.cmds.plotters import plotters_cmd
-from bpx.cmds.rpc import rpc_cmd
-from bpx.cmds.show import show_cmd
-from bpx.cmds.start import start_cmd
-from bpx.cmds.stop import stop_cmd
+from bpx.cmds.short_help import SHORT_HELP
 from bpx.util.default_root import DEFAULT_KEYS_ROOT_PATH, DEFAULT_ROOT_PATH
-from bpx.util.errors import KeychainCurrentPassphraseIsInvalid
-from bpx.util.keychain import Keychain, set_keys_root_path
-from bpx.util.ssl_check import check_ssl
 
 CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"])
 
+# Subcommand name to (module, attribute). The modules pull in blspy, chiapos, aiohttp and web3, so they are only
+# imported once the subcommand is actually run, `bpx --help` lists them with their SHORT_HELP.
+LAZY_SUBCOMMANDS: Dict[str, Tuple[str, str]] = {
+    "keys": ("bpx.cmds.keys", "keys_cmd"),
+    "plots": ("bpx.cmds.plots", "plots_cmd"),
+    "configure": ("bpx.cmds.configure", "configure_cmd"),
+    "init": ("bpx.cmds.init", "init_cmd"),
+    "rpc": ("bpx.cmds.rpc", "rpc_cmd"),
+    "show": ("bpx.cmds.show", "show_cmd"),
+    "start": ("bpx.cmds.start", "start_cmd"),
+    "stop": ("bpx.cmds.stop", "stop_cmd"),
+    "netspace": ("bpx.cmds.netspace", "netspace_cmd"),
+    "farm": ("bpx.cmds.farm", "farm_cmd"),
+    "plotters": ("bpx.cmds.plotters", "plotters_cmd"),
+    "db": ("bpx.cmds.db", "db_cmd"),
+    "peer": ("bpx.cmds.peer", "peer_cmd"),
+    "passphrase": ("bpx.cmds.passphrase", "passphrase_cmd"),
+}
+# Loaded lazily like the above, but not listed in the help
+HIDDEN_LAZY_SUBCOMMANDS: Dict[str, Tuple[str, str]] = {
+    "beta": ("bpx.cmds.beta", "beta_cmd"),
+}
+
+
+class LazyGroup(click.Group):
+    """
+    A click group which imports the module of a subcommand only when that subcommand is invoked.
+    """
+
+    def list_commands(self, ctx: click.Context) -> List[str]:
+        return sorted([*super().list_commands(ctx), *LAZY_SUBCOMMANDS.keys(), *HIDDEN_LAZY_SUBCOMMANDS.keys()])
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> Optional[click.Command]:
+        if cmd_name in LAZY_SUBCOMMANDS:
+            module_name, attribute = LAZY_SUBCOMMANDS[cmd_name]
+        elif cmd_name in HIDDEN_LAZY_SUBCOMMANDS:
+            module_name, attribute = HIDDEN_LAZY_SUBCOMMANDS[cmd_name]
+        else:
+            return super().get_command(ctx, cmd_name)
+        command: click.Command = getattr(importlib.import_module(module_name), attribute)
+        return command
+
+    def format_commands(self, ctx: click.Context, formatter: click.HelpFormatter) -> None:
+        rows: List[Tuple[str, str]] = []
+        for cmd_name in self.list_commands(ctx):
+            if cmd_name in HIDDEN_LAZY_SUBCOMMANDS:
+                continue
+            if cmd_name in LAZY_SUBCOMMANDS:
+                rows.append((cmd_name, SHORT_HELP[cmd_name]))
+                continue
+            command = super().get_command(ctx, cmd_name)
+            if command is None or command.hidden:
+                continue
+            rows.append((cmd_name, command.get_short_help_str(formatter.width - 6 - len(cmd_name))))
+        if len(rows) > 0:
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
+
 
 @click.group(
+    cls=LazyGroup,
     help=f"\n  Manage bpx beacon chain infrastructure ({__version__})\n",
     epilog="Try 'bpx start beacon', 'bpx netspace -d 192', or 'bpx show -s'",
     context_settings=CONTEXT_SETTINGS,
@@ -54,12 +97,16 @@ def cli(
     # keys_root_path and passphrase_file will be None if the passphrase options have been
     # scrubbed from the CLI options
     if keys_root_path is not None:
-        set_keys_root_path(Path(keys_root_path))
+        from bpx.util.keyring_wrapper import KeyringWrapper
+
+        KeyringWrapper.set_keys_root_path(Path(keys_root_path))
 
     if passphrase_file is not None:
         from sys import exit
 
         from bpx.cmds.passphrase_funcs import cache_passphrase, read_passphrase_from_file
+        from bpx.util.errors import KeychainCurrentPassphraseIsInvalid
+        from bpx.util.keychain import Keychain
 
         try:
             passphrase = read_passphrase_from_file(passphrase_file)
@@ -76,6 +123,8 @@ def cli(
         except Exception as e:
             print(f"Failed to read passphrase: {e}")
 
+    from bpx.util.ssl_check import check_ssl
+
     check_ssl(Path(root_path))
 
 
@@ -104,23 +153,6 @@ def run_daemon_cmd(ctx: click.Context, wait_for_unlock: bool) -> None:
     asyncio.run(async_run_daemon(ctx.obj["root_path"], wait_for_unlock=wait_for_unlock))
 
 
-cli.add_command(keys_cmd)
-cli.add_command(plots_cmd)
-cli.add_command(configure_cmd)
-cli.add_command(init_cmd)
-cli.add_command(rpc_cmd)
-cli.add_command(show_cmd)
-cli.add_command(start_cmd)
-cli.add_command(stop_cmd)
-cli.add_command(netspace_cmd)
-cli.add_command(farm_cmd)
-cli.add_command(plotters_cmd)
-cli.add_command(db_cmd)
-cli.add_command(peer_cmd)
-cli.add_command(passphrase_cmd)
-cli.add_command(beta_cmd)
-
-
 def main() -> None:
     cli()  # pylint: disable=no-value-for-parameter
 
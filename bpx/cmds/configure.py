@@ -5,6 +5,7 @@ from typing import Optional
 
 import click
 
+from bpx.cmds.short_help import SHORT_HELP
 from bpx.util.config import lock_and_load_config, save_config, str2bool
 
 
@@ -168,7 +169,7 @@ def configure(
             save_config(root_path, "config.yaml", config)
 
 
-@click.command("configure", short_help="Modify configuration", no_args_is_help=True)
+@click.command("configure", short_help=SHORT_HELP["configure"], no_args_is_help=True)
 @click.option(
     "--testnet",
     "-t",
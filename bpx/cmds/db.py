@@ -6,10 +6,12 @@ from typing import Optional
 import click
 
 from bpx.cmds.db_backup_func import db_backup_func
+from bpx.cmds.db_train_dictionary_func import db_train_dictionary_func
 from bpx.cmds.db_validate_func import db_validate_func
+from bpx.cmds.short_help import SHORT_HELP
 
 
-@click.group("db", short_help="Manage the blockchain database")
+@click.group("db", short_help=SHORT_HELP["db"])
 def db_cmd() -> None:
     pass
 
@@ -47,3 +49,32 @@ def db_backup_cmd(ctx: click.Context, db_backup_file: Optional[str], no_indexes:
         )
     except RuntimeError as e:
         print(f"FAILED: {e}")
+
+
+@db_cmd.command(
+    "train-dictionary",
+    short_help="train a compression dictionary from the stored blocks. Stop the beacon before running this",
+)
+@click.option("--db", "in_db_path", default=None, type=click.Path(), help="Specifies which database file to use")
+@click.option("--samples", "num_samples", default=5000, type=int, help="Number of recent blocks to train from")
+@click.option("--size", "dictionary_size", default=112 * 1024, type=int, help="Size of the dictionary in bytes")
+@click.option(
+    "--recompress",
+    default=False,
+    is_flag=True,
+    help="recompress all the stored blocks with the new dictionary",
+)
+@click.pass_context
+def db_train_dictionary_cmd(
+    ctx: click.Context, in_db_path: Optional[str], num_samples: int, dictionary_size: int, recompress: bool
+) -> None:
+    try:
+        db_train_dictionary_func(
+            Path(ctx.obj["root_path"]),
+            None if in_db_path is None else Path(in_db_path),
+            num_samples=num_samples,
+            dictionary_size=dictionary_size,
+            recompress=recompress,
+        )
+    except RuntimeError as e:
+        print(f"FAILED: {e}")
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import zstd
+
+from bpx.beacon.block_compression import (
+    CREATE_DICTIONARIES_TABLE,
+    BlockCompressor,
+    load_compressor,
+    train_dictionary,
+)
+from bpx.util.config import load_config
+from bpx.util.path import path_from_root
+
+# zstd needs a reasonable number of samples to find the content blocks have in common
+MIN_SAMPLES = 100
+RECOMPRESS_BATCH_SIZE = 1000
+
+
+def db_train_dictionary_func(
+    root_path: Path,
+    in_db_path: Optional[Path] = None,
+    *,
+    num_samples: int,
+    dictionary_size: int,
+    recompress: bool,
+) -> None:
+    if in_db_path is None:
+        config: Dict[str, Any] = load_config(root_path, "config.yaml")["beacon"]
+        selected_network: str = config["selected_network"]
+        db_pattern: str = config["database_path"]
+        db_path_replaced: str = db_pattern.replace("CHALLENGE", selected_network)
+        in_db_path = path_from_root(root_path, db_path_replaced)
+
+    train_dictionary_v1(in_db_path, num_samples=num_samples, dictionary_size=dictionary_size, recompress=recompress)
+
+
+def compare_compression(samples: List[bytes], compressor: BlockCompressor) -> None:
+    """
+    Prints the size and decompression throughput of the samples with plain zstd and with the dictionary.
+    """
+    raw_size = sum(len(sample) for sample in samples)
+    for name, compress in (("zstd", zstd.compress), (f"dictionary {compressor.version}", compressor.compress)):
+        compressed = [compress(sample) for sample in samples]
+        compressed_size = sum(len(blob) for blob in compressed)
+        start = time.perf_counter()
+        for blob in compressed:
+            compressor.decompress(blob)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name}: {compressed_size} bytes, ratio {raw_size / compressed_size:.2f}, "
+            f"decompression {raw_size / elapsed / 1024 / 1024:.1f} MiB/s"
+        )
+
+
+def train_dictionary_v1(in_path: Path, *, num_samples: int, dictionary_size: int, recompress: bool) -> None:
+    if not in_path.exists():
+        print(f"input file doesn't exist. {in_path}")
+        raise RuntimeError(f"can't find {in_path}")
+
+    print(f"opening file: {in_path}")
+    with closing(sqlite3.connect(in_path)) as db:
+        db.execute(CREATE_DICTIONARIES_TABLE)
+        compressor = load_compressor(db)
+
+        print(f"reading up to {num_samples} of the most recent blocks")
+        with closing(
+            db.execute(
+                "SELECT block FROM full_blocks WHERE in_main_chain=1 ORDER BY height DESC LIMIT ?", (num_samples,)
+            )
+        ) as cursor:
+            samples = [compressor.decompress(row[0]) for row in cursor]
+        if len(samples) < MIN_SAMPLES:
+            raise RuntimeError(f"At least {MIN_SAMPLES} blocks are needed to train a dictionary, found {len(samples)}")
+
+        with closing(db.execute("SELECT MAX(version) FROM block_compression_dictionaries")) as cursor:
+            row = cursor.fetchone()
+        version = 1 if row is None or row[0] is None else row[0] + 1
+
+        print(f"training dictionary {version} from {len(samples)} blocks")
+        dictionary = train_dictionary(samples, version, dictionary_size)
+        compressor.add_dictionary(version, dictionary)
+        compare_compression(samples, compressor)
+
+        db.execute("INSERT INTO block_compression_dictionaries VALUES(?, ?)", (version, dictionary))
+        db.commit()
+        print(f"added dictionary {version}, new blocks are compressed with it once the beacon is restarted")
+
+        if not recompress:
+            return None
+
+        print("recompressing all blocks")
+        last_rowid = 0
+        recompressed = 0
+        while True:
+            with closing(
+                db.execute(
+                    "SELECT rowid, block FROM full_blocks WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last_rowid, RECOMPRESS_BATCH_SIZE),
+                )
+            ) as cursor:
+                rows = cursor.fetchall()
+            if len(rows) == 0:
+                break
+            db.executemany(
+                "UPDATE full_blocks SET block=? WHERE rowid=?",
+                [(compressor.compress(compressor.decompress(block)), rowid) for rowid, block in rows],
+            )
+            db.commit()
+            last_rowid = rows[-1][0]
+            recompressed += len(rows)
+            print(f"recompressed {recompressed} blocks", end="\r")
+        print(f"\nrecompressed {recompressed} blocks, run VACUUM (or `bpx db backup`) to reclaim the space")
@@ -3,6 +3,7 @@ from __future__ import annotations
 from pathlib import Path
 from typing import Any, Dict, Optional
 
+from bpx.beacon.block_compression import load_compressor
 from bpx.consensus.block_record import BlockRecord
 from bpx.types.blockchain_format.sized_bytes import bytes32
 from bpx.types.full_block import FullBlock
@@ -32,8 +33,6 @@ def validate_v1(in_path: Path, *, validate_blocks: bool) -> None:
     import sqlite3
     from contextlib import closing
 
-    import zstd
-
     if not in_path.exists():
         print(f"input file doesn't exist. {in_path}")
         raise RuntimeError(f"can't find {in_path}")
@@ -60,6 +59,8 @@ def validate_v1(in_path: Path, *, validate_blocks: bool) -> None:
         except sqlite3.OperationalError:
             raise RuntimeError("Database is missing current_peak table")
 
+        compressor = load_compressor(in_db)
+
         print(f"peak hash: {peak}")
 
         with closing(in_db.execute("SELECT height FROM full_blocks WHERE header_hash = ?", (peak,))) as cursor:
@@ -101,7 +102,7 @@ def validate_v1(in_path: Path, *, validate_blocks: bool) -> None:
                     continue
 
                 if validate_blocks:
-                    block = FullBlock.from_bytes(zstd.decompress(row[4]))
+                    block = FullBlock.from_bytes(compressor.decompress(row[4]))
                     block_record = BlockRecord.from_bytes(row[5])
                     actual_header_hash = block.header_hash
                     actual_prev_hash = block.prev_header_hash
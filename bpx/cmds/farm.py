@@ -4,8 +4,10 @@ from typing import Optional
 
 import click
 
+from bpx.cmds.short_help import SHORT_HELP
 
-@click.group("farm", short_help="Manage your farm")
+
+@click.group("farm", short_help=SHORT_HELP["farm"])
 def farm_cmd() -> None:
     pass
 
@@ -2,8 +2,10 @@ from __future__ import annotations
 
 import click
 
+from bpx.cmds.short_help import SHORT_HELP
 
-@click.command("init", short_help="Create or migrate the configuration")
+
+@click.command("init", short_help=SHORT_HELP["init"])
 @click.option(
     "--create-certs",
     "-c",
@@ -4,8 +4,10 @@ from typing import Optional, Tuple
 
 import click
 
+from bpx.cmds.short_help import SHORT_HELP
 
-@click.group("keys", short_help="Manage your keys")
+
+@click.group("keys", short_help=SHORT_HELP["keys"])
 @click.pass_context
 def keys_cmd(ctx: click.Context) -> None:
     """Create, delete, view and use your key pairs"""
@@ -4,8 +4,10 @@ from typing import Optional
 
 import click
 
+from bpx.cmds.short_help import SHORT_HELP
 
-@click.command("netspace", short_help="Estimate total farmed space on the network")
+
+@click.command("netspace", short_help=SHORT_HELP["netspace"])
 @click.option(
     "-p",
     "--rpc-port",
@@ -7,10 +7,11 @@ from typing import Optional
 
 import click
 
+from bpx.cmds.short_help import SHORT_HELP
 from bpx.util.config import load_config
 
 
-@click.group("passphrase", short_help="Manage your keyring passphrase")
+@click.group("passphrase", short_help=SHORT_HELP["passphrase"])
 def passphrase_cmd():
     pass
 
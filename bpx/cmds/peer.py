@@ -6,9 +6,10 @@ import click
 
 from bpx.cmds.cmds_util import NODE_TYPES
 from bpx.cmds.peer_funcs import peer_async
+from bpx.cmds.short_help import SHORT_HELP
 
 
-@click.command("peer", short_help="Show, or modify peering connections", no_args_is_help=True)
+@click.command("peer", short_help=SHORT_HELP["peer"], no_args_is_help=True)
 @click.option(
     "-p",
     "--rpc-port",
@@ -7,6 +7,7 @@ from pathlib import Path
 
 import click
 
+from bpx.cmds.short_help import SHORT_HELP
 from bpx.plotting.util import add_plot_directory, validate_plot_size
 
 log = logging.getLogger(__name__)
@@ -27,7 +28,7 @@ def show_plots(root_path: Path):
         print(f"{str_path}")
 
 
-@click.group("plots", short_help="Manage your plots")
+@click.group("plots", short_help=SHORT_HELP["plots"])
 @click.pass_context
 def plots_cmd(ctx: click.Context):
     """Create, add, remove and check your plots"""
@@ -2,12 +2,13 @@ from __future__ import annotations
 
 import click
 
+from bpx.cmds.short_help import SHORT_HELP
 from bpx.plotters.plotters import call_plotters
 
 
 @click.command(
     "plotters",
-    short_help="Advanced plotting options",
+    short_help=SHORT_HELP["plotters"],
     context_settings={"ignore_unknown_options": True},
     add_help_option=False,
 )
@@ -8,6 +8,7 @@ from typing import Any, Dict, List, Optional, TextIO
 import click
 from aiohttp import ClientResponseError
 
+from bpx.cmds.short_help import SHORT_HELP
 from bpx.util.config import load_config
 from bpx.util.default_root import DEFAULT_ROOT_PATH
 from bpx.util.ints import uint16
@@ -52,7 +53,7 @@ def get_routes(service: str, config: Dict[str, Any]) -> Dict[str, Any]:
     return asyncio.run(call_endpoint(service, "get_routes", {}, config))
 
 
-@click.group("rpc", short_help="RPC Client")
+@click.group("rpc", short_help=SHORT_HELP["rpc"])
 def rpc_cmd() -> None:
     pass
 
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from typing import Dict
+
+# The short help of the bpx subcommands. Kept apart from the command modules, so `bpx --help` can list the
+# subcommands without importing them.
+SHORT_HELP: Dict[str, str] = {
+    "keys": "Manage your keys",
+    "plots": "Manage your plots",
+    "configure": "Modify configuration",
+    "init": "Create or migrate the configuration",
+    "rpc": "RPC Client",
+    "show": "Show node information",
+    "start": "Start service groups",
+    "stop": "Stop services",
+    "netspace": "Estimate total farmed space on the network",
+    "farm": "Manage your farm",
+    "plotters": "Advanced plotting options",
+    "db": "Manage the blockchain database",
+    "peer": "Show, or modify peering connections",
+    "passphrase": "Manage your keyring passphrase",
+}
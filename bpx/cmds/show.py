@@ -4,10 +4,11 @@ from typing import Optional
 
 import click
 
+from bpx.cmds.short_help import SHORT_HELP
 from bpx.cmds.show_funcs import show_async
 
 
-@click.command("show", short_help="Show node information", no_args_is_help=True)
+@click.command("show", short_help=SHORT_HELP["show"], no_args_is_help=True)
 @click.option(
     "-p",
     "--rpc-port",
@@ -2,11 +2,12 @@ from __future__ import annotations
 
 import click
 
+from bpx.cmds.short_help import SHORT_HELP
 from bpx.util.config import load_config
 from bpx.util.service_groups import all_groups
 
 
-@click.command("start", short_help="Start service groups")
+@click.command("start", short_help=SHORT_HELP["start"])
 @click.option("-r", "--restart", is_flag=True, type=bool, help="Restart running services")
 @click.argument("group", type=click.Choice(list(all_groups())), nargs=-1, required=True)
 @click.pass_context
@@ -7,6 +7,7 @@ from typing import Any, Dict
 
 import click
 
+from bpx.cmds.short_help import SHORT_HELP
 from bpx.util.config import load_config
 from bpx.util.service_groups import all_groups, services_for_groups
 
@@ -47,7 +48,7 @@ async def async_stop(root_path: Path, config: Dict[str, Any], group: str, stop_d
     return return_val
 
 
-@click.command("stop", short_help="Stop services")
+@click.command("stop", short_help=SHORT_HELP["stop"])
 @click.option("-d", "--daemon", is_flag=True, type=bool, help="Stop daemon")
 @click.argument("group", type=click.Choice(list(all_groups())), nargs=-1, required=True)
 @click.pass_context
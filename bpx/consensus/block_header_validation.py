@@ -5,8 +5,6 @@ import logging
 import time
 from typing import Optional, Tuple
 
-from blspy import AugSchemeMPL
-
 from bpx.consensus.block_record import BlockRecord
 from bpx.consensus.blockchain_interface import BlockchainInterface
 from bpx.consensus.constants import ConsensusConstants
@@ -30,6 +28,7 @@ from bpx.types.blockchain_format.vdf import VDFInfo, VDFProof
 from bpx.types.end_of_slot_bundle import EndOfSubSlotBundle
 from bpx.types.header_block import HeaderBlock
 from bpx.types.unfinished_header_block import UnfinishedHeaderBlock
+from bpx.util import cached_bls
 from bpx.util.errors import Err, ValidationError
 from bpx.util.hash import std_hash
 from bpx.util.ints import uint8, uint32, uint64, uint128
@@ -639,7 +638,7 @@ def validate_unfinished_header_block(
                 rc_sp_hash = curr.finished_reward_slot_hashes[-1]
 
     # 12. Check reward chain sp signature
-    if not AugSchemeMPL.verify(
+    if not cached_bls.verify(
         header_block.reward_chain_block.proof_of_space.plot_public_key,
         rc_sp_hash,
         header_block.reward_chain_block.reward_chain_sp_signature,
@@ -682,7 +681,7 @@ def validate_unfinished_header_block(
             return None, ValidationError(Err.INVALID_CC_SP_VDF)
 
     # 14. Check cc sp sig
-    if not AugSchemeMPL.verify(
+    if not cached_bls.verify(
         header_block.reward_chain_block.proof_of_space.plot_public_key,
         cc_sp_hash,
         header_block.reward_chain_block.challenge_chain_sp_signature,
@@ -713,7 +712,7 @@ def validate_unfinished_header_block(
             return None, ValidationError(Err.INVALID_IS_TRANSACTION_BLOCK)
 
     # 16. Check foliage block signature by plot key
-    if not AugSchemeMPL.verify(
+    if not cached_bls.verify(
         header_block.reward_chain_block.proof_of_space.plot_public_key,
         header_block.foliage.foliage_block_data.get_hash(),
         header_block.foliage.foliage_block_data_signature,
@@ -722,7 +721,7 @@ def validate_unfinished_header_block(
     
     # 17. Check foliage block signature by plot key
     if header_block.foliage.foliage_transaction_block_hash is not None:
-        if not AugSchemeMPL.verify(
+        if not cached_bls.verify(
             header_block.reward_chain_block.proof_of_space.plot_public_key,
             header_block.foliage.foliage_transaction_block_hash,
             header_block.foliage.foliage_transaction_block_signature,
@@ -1,9 +1,13 @@
 from __future__ import annotations
 
-from typing import List
+from bisect import bisect_right
+from functools import lru_cache
+from typing import List, Tuple
 
 from bpx.util.ints import uint64
+from bpx.util.lru_cache import LRUCache
 from bpx.types.blockchain_format.execution_payload import WithdrawalV1
+from bpx.types.blockchain_format.sized_bytes import bytes32
 from bpx.consensus.block_record import BlockRecord
 from bpx.consensus.blockchain_interface import BlockchainInterface
 from bpx.consensus.constants import ConsensusConstants
@@ -11,11 +15,33 @@ from bpx.consensus.constants import ConsensusConstants
 _bpx_to_gwei = 1000000000
 _blocks_per_year = 1681920  # 32 * 6 * 24 * 365
 
+# The v2 reward schedule as (first height, reward) pairs, each reward applies until the next first height
+_v2_reward_schedule: List[Tuple[int, int]] = [
+    (0, 20000000 * _bpx_to_gwei),
+    (1, 200 * _bpx_to_gwei),
+    (1000000, 20 * _bpx_to_gwei),
+    (1000000 + (3 * _blocks_per_year), 10 * _bpx_to_gwei),
+    (1000000 + (6 * _blocks_per_year), 5 * _bpx_to_gwei),
+    (1000000 + (9 * _blocks_per_year), int(2.5 * _bpx_to_gwei)),
+    (1000000 + (12 * _blocks_per_year), int(1.25 * _bpx_to_gwei)),
+    (1000000 + (15 * _blocks_per_year), 0),
+]
+_v2_reward_schedule_heights: List[int] = [height for height, _ in _v2_reward_schedule]
+
+# Withdrawals of the transaction block after a given transaction block, by the header hash of the latter. They only
+# depend on that block and its ancestors, so they never have to be recomputed for block creation and validation.
+_withdrawals_cache: LRUCache[bytes32, List[WithdrawalV1]] = LRUCache(1000)
+
+
 def create_withdrawals(
     constants: ConsensusConstants,
     prev_tx_block: BlockRecord,
     blocks: BlockchainInterface,
 ) -> List[WithdrawalV1]:
+    cached = _withdrawals_cache.get(prev_tx_block.header_hash)
+    if cached is not None:
+        return list(cached)
+
     withdrawals: List[WithdrawalV1] = []
     
     next_wd_index: uint64
@@ -55,17 +81,14 @@ def create_withdrawals(
         if curr.is_transaction_block:
             break
     
-    return withdrawals
+    _withdrawals_cache.put(prev_tx_block.header_hash, withdrawals)
+    return list(withdrawals)
 
+@lru_cache(maxsize=8)
 def _calculate_v3_bridge(
     v2_eol_height: uint64,
 ) -> uint64:
-    bridge: uint64 = 0
-    
-    for i in range(0, v2_eol_height+1):
-        bridge += _calculate_v2_reward(i)
-    
-    return bridge
+    return _calculate_v2_reward_sum(v2_eol_height)
 
 def _calculate_v3_reward(
     v3_height: uint64,
@@ -77,19 +100,20 @@ def _calculate_v3_reward(
 def _calculate_v2_reward(
     v2_height: uint64
 ) -> uint64:
-    if v2_height == 0:
-        return uint64(20000000 * _bpx_to_gwei)
-    elif v2_height < 1000000:
-        return uint64(200 * _bpx_to_gwei)
-    elif v2_height < 1000000 + (3 * _blocks_per_year):
-        return uint64(20 * _bpx_to_gwei)
-    elif v2_height < 1000000 + (6 * _blocks_per_year):
-        return uint64(10 * _bpx_to_gwei)
-    elif v2_height < 1000000 + (9 * _blocks_per_year):
-        return uint64(5 * _bpx_to_gwei)
-    elif v2_height < 1000000 + (12 * _blocks_per_year):
-        return uint64(2.5 * _bpx_to_gwei)
-    elif v2_height < 1000000 + (15 * _blocks_per_year):
-        return uint64(1.25 * _bpx_to_gwei)
-    else:
-        return uint64(0)
+    index = bisect_right(_v2_reward_schedule_heights, v2_height) - 1
+    return uint64(_v2_reward_schedule[index][1])
+
+def _calculate_v2_reward_sum(
+    v2_end_height: uint64,
+) -> uint64:
+    # Sum of the rewards of heights 0 to v2_end_height (inclusive), a product per schedule segment
+    total = 0
+    for i, (first_height, reward) in enumerate(_v2_reward_schedule):
+        if first_height > v2_end_height:
+            break
+        if i + 1 < len(_v2_reward_schedule):
+            last_height = min(_v2_reward_schedule[i + 1][0] - 1, v2_end_height)
+        else:
+            last_height = v2_end_height
+        total += (last_height - first_height + 1) * reward
+    return uint64(total)
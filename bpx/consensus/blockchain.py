@@ -18,11 +18,13 @@ from bpx.consensus.block_record import BlockRecord
 from bpx.consensus.blockchain_interface import BlockchainInterface
 from bpx.consensus.constants import ConsensusConstants
 from bpx.consensus.difficulty_adjustment import get_next_sub_slot_iters_and_difficulty
-from bpx.consensus.find_fork_point import find_fork_point_in_chain
+from bpx.consensus.find_fork_point import find_fork_point_in_chain, get_skip_height
 from bpx.consensus.full_block_to_block_record import block_to_block_record
 from bpx.consensus.multiprocess_validation import (
     PreValidationResult,
+    initialize_validation_worker,
     pre_validate_blocks_multiprocessing,
+    pre_validate_unfinished_block_multiprocessing,
 )
 from bpx.beacon.block_height_map import BlockHeightMap
 from bpx.beacon.block_store import BlockStore
@@ -37,14 +39,31 @@ from bpx.types.unfinished_block import UnfinishedBlock
 from bpx.types.unfinished_header_block import UnfinishedHeaderBlock
 from bpx.types.weight_proof import SubEpochChallengeSegment
 from bpx.util.errors import ConsensusError, Err
+from bpx.util.files import write_file_async
 from bpx.util.generator_tools import get_block_header
 from bpx.util.hash import std_hash
 from bpx.util.inline_executor import InlineExecutor
 from bpx.util.ints import uint16, uint32, uint64, uint128
-from bpx.util.setproctitle import getproctitle, setproctitle
+from bpx.util.metrics import registry as metrics_registry
+from bpx.util.setproctitle import getproctitle
+from bpx.util.shared_verification_cache import SharedVerificationCache, set_shared_cache
+from bpx.util.streamable import Streamable, streamable
 
 log = logging.getLogger(__name__)
 
+receive_block_seconds = metrics_registry.histogram(
+    "bpx_blockchain_receive_block_seconds", "Time to validate and add a pre validated block to the blockchain"
+)
+receive_block_results = metrics_registry.counter(
+    "bpx_blockchain_receive_block_total", "Blocks received by the blockchain, by result", ["result"]
+)
+pre_validate_seconds = metrics_registry.histogram(
+    "bpx_blockchain_pre_validate_blocks_seconds", "Time to pre validate a batch of blocks in the validation pool"
+)
+pre_validated_blocks = metrics_registry.counter(
+    "bpx_blockchain_pre_validated_blocks_total", "Blocks pre validated in the validation pool"
+)
+
 
 class ReceiveBlockResult(Enum):
     """
@@ -60,6 +79,15 @@ class ReceiveBlockResult(Enum):
     DISCONNECTED_BLOCK = 5  # Block's parent (previous pointer) is not in this blockchain
 
 
+@streamable
+@dataclasses.dataclass(frozen=True)
+class BlockRecordsSnapshot(Streamable):
+    # The block record cache as of a clean shutdown, only valid for exactly this peak and blocks table
+    peak_hash: bytes32
+    last_block_rowid: uint64
+    block_records: List[BlockRecord]
+
+
 @dataclasses.dataclass
 class StateChangeSummary:
     peak: BlockRecord
@@ -76,6 +104,8 @@ class Blockchain(BlockchainInterface):
     __block_records: Dict[bytes32, BlockRecord]
     # all hashes of blocks in block_record by height, used for garbage collection
     __heights_in_cache: Dict[uint32, Set[bytes32]]
+    # header hash to the hash of its ancestor at get_skip_height(height), for blocks in block_record
+    __skip_hashes: Dict[bytes32, bytes32]
     # maps block height (of the current heaviest chain) to block hash and sub
     # epoch summaries
     __height_map: BlockHeightMap
@@ -83,11 +113,15 @@ class Blockchain(BlockchainInterface):
     block_store: BlockStore
     # Used to verify blocks in parallel
     pool: Executor
+    # Successful VDF and signature verifications, shared with the processes of the pool
+    _shared_verification_cache: Optional[SharedVerificationCache]
     # Set holding seen compact proofs, in order to avoid duplicates.
     _seen_compact_proofs: Set[Tuple[VDFInfo, uint32]]
 
     # Whether blockchain is shut down or not
     _shut_down: bool
+    # the file the block record cache is saved to on shutdown
+    _snapshot_filename: Path
 
     # Lock to prevent simultaneous reads and writes
     lock: asyncio.Lock
@@ -112,6 +146,15 @@ class Blockchain(BlockchainInterface):
         self = Blockchain()
         self.lock = asyncio.Lock()  # External lock handled by beacon client
         self.compact_proof_lock = asyncio.Lock()
+        self._shared_verification_cache = None
+        try:
+            self._shared_verification_cache = SharedVerificationCache.create()
+        except Exception as e:
+            log.warning(f"Failed to create the shared verification cache: {e}")
+        set_shared_cache(self._shared_verification_cache)
+        shared_cache_name = (
+            self._shared_verification_cache.name if self._shared_verification_cache is not None else None
+        )
         if single_threaded:
             self.pool = InlineExecutor()
         else:
@@ -122,8 +165,8 @@ class Blockchain(BlockchainInterface):
             self.pool = ProcessPoolExecutor(
                 max_workers=num_workers,
                 mp_context=multiprocessing_context,
-                initializer=setproctitle,
-                initargs=(f"{getproctitle()}_worker",),
+                initializer=initialize_validation_worker,
+                initargs=(f"{getproctitle()}_worker", shared_cache_name),
             )
             log.info(f"Started {num_workers} processes for block validation")
 
@@ -131,6 +174,7 @@ class Blockchain(BlockchainInterface):
         self.block_store = block_store
         self.execution_client = execution_client
         self._shut_down = False
+        self._snapshot_filename = blockchain_dir / "block-records-snapshot"
         await self._load_chain_from_store(blockchain_dir)
         self._seen_compact_proofs = set()
         return self
@@ -138,6 +182,16 @@ class Blockchain(BlockchainInterface):
     def shut_down(self) -> None:
         self._shut_down = True
         self.pool.shutdown(wait=True)
+        if self._shared_verification_cache is not None:
+            set_shared_cache(None)
+            self._shared_verification_cache.close()
+            self._shared_verification_cache = None
+
+    def close(self) -> None:
+        """
+        Closes the files of the height map, after the final write_snapshot.
+        """
+        self.__height_map.close()
 
     async def _load_chain_from_store(self, blockchain_dir: Path) -> None:
         """
@@ -146,8 +200,18 @@ class Blockchain(BlockchainInterface):
         self.__height_map = await BlockHeightMap.create(blockchain_dir, self.block_store.db_wrapper)
         self.__block_records = {}
         self.__heights_in_cache = {}
-        block_records, peak = await self.block_store.get_block_records_close_to_peak(self.constants.BLOCKS_CACHE_SIZE)
-        for block in block_records.values():
+        self.__skip_hashes = {}
+        block_records: Dict[bytes32, BlockRecord]
+        peak: Optional[bytes32]
+        snapshot = await self._load_snapshot()
+        if snapshot is not None:
+            block_records, peak = snapshot
+        else:
+            block_records, peak = await self.block_store.get_block_records_close_to_peak(
+                self.constants.BLOCKS_CACHE_SIZE
+            )
+        # Parents are added before their children, so the skip pointers can be set
+        for block in sorted(block_records.values(), key=lambda b: b.height):
             self.add_block_record(block)
 
         if len(block_records) == 0:
@@ -160,6 +224,55 @@ class Blockchain(BlockchainInterface):
         assert self.__height_map.contains_height(self._peak_height)
         assert not self.__height_map.contains_height(uint32(self._peak_height + 1))
 
+    async def _load_snapshot(self) -> Optional[Tuple[Dict[bytes32, BlockRecord], bytes32]]:
+        """
+        Loads the block record cache saved by `write_snapshot`, if the database is still exactly in the state it was
+        saved in. The snapshot is only ever used once, it's removed after reading it.
+        """
+        try:
+            data = await asyncio.get_running_loop().run_in_executor(None, self._snapshot_filename.read_bytes)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            log.warning(f"Failed to read the block records snapshot: {e}")
+            return None
+        finally:
+            self._snapshot_filename.unlink(missing_ok=True)
+
+        try:
+            snapshot = BlockRecordsSnapshot.from_bytes(data)
+        except Exception as e:
+            log.warning(f"Ignoring invalid block records snapshot: {e}")
+            return None
+
+        peak = await self.block_store.get_peak()
+        if peak is None or peak[0] != snapshot.peak_hash:
+            log.info("Ignoring block records snapshot, the peak changed")
+            return None
+        if await self.block_store.get_last_block_rowid() != snapshot.last_block_rowid:
+            log.info("Ignoring block records snapshot, the blocks changed")
+            return None
+
+        log.info(f"Loaded {len(snapshot.block_records)} block records from snapshot")
+        return {block_record.header_hash: block_record for block_record in snapshot.block_records}, peak[0]
+
+    async def write_snapshot(self) -> None:
+        """
+        Saves the block record cache and the height map for a fast restart. Must be called under the blockchain
+        lock, while the database is still open.
+        """
+        await self.__height_map.flush()
+        peak = self.get_peak()
+        if peak is None:
+            return
+        snapshot = BlockRecordsSnapshot(
+            peak.header_hash,
+            uint64(await self.block_store.get_last_block_rowid()),
+            list(self.__block_records.values()),
+        )
+        await write_file_async(self._snapshot_filename, bytes(snapshot))
+        log.info(f"Wrote {len(snapshot.block_records)} block records to snapshot")
+
     def get_peak(self) -> Optional[BlockRecord]:
         """
         Return the peak of the blockchain
@@ -186,6 +299,21 @@ class Blockchain(BlockchainInterface):
         block: FullBlock,
         pre_validation_result: PreValidationResult,
         fork_point_with_peak: Optional[uint32] = None,
+    ) -> Tuple[ReceiveBlockResult, Optional[Err], Optional[StateChangeSummary]]:
+        """
+        This method must be called under the blockchain lock
+        See `_receive_block`, this records the time taken and the result in the metrics.
+        """
+        with receive_block_seconds.time():
+            result = await self._receive_block(block, pre_validation_result, fork_point_with_peak)
+        receive_block_results.inc(labels=(result[0].name,))
+        return result
+
+    async def _receive_block(
+        self,
+        block: FullBlock,
+        pre_validation_result: PreValidationResult,
+        fork_point_with_peak: Optional[uint32] = None,
     ) -> Tuple[ReceiveBlockResult, Optional[Err], Optional[StateChangeSummary]]:
         """
         This method must be called under the blockchain lock
@@ -482,13 +610,36 @@ class Blockchain(BlockchainInterface):
             return required_iters, error.code
         return required_iters, None
 
+    async def pre_validate_unfinished_block(self, block: UnfinishedBlock) -> PreValidationResult:
+        """
+        Validates the header of an unfinished block in the pool, including the VDF proofs, proof of space and
+        signatures. Does not need to be called under the lock.
+        """
+        return await pre_validate_unfinished_block_multiprocessing(self.constants, self, block, self.pool)
+
     async def validate_unfinished_block(
-        self, block: UnfinishedBlock, skip_overflow_ss_validation: bool = True
+        self,
+        block: UnfinishedBlock,
+        skip_overflow_ss_validation: bool = True,
+        pre_validation_result: Optional[PreValidationResult] = None,
     ) -> PreValidationResult:
-        required_iters, error = await self.validate_unfinished_block_header(block, skip_overflow_ss_validation)
-
-        if error is not None:
-            return PreValidationResult(uint16(error.value), None)
+        """
+        If pre_validation_result is passed in (from pre_validate_unfinished_block), the header is not validated
+        again, only the body.
+        """
+        if pre_validation_result is None:
+            required_iters, error = await self.validate_unfinished_block_header(block, skip_overflow_ss_validation)
+            if error is not None:
+                return PreValidationResult(uint16(error.value), None)
+        else:
+            if pre_validation_result.error is not None:
+                return pre_validation_result
+            if (
+                not self.contains_block(block.prev_header_hash)
+                and block.prev_header_hash != self.constants.GENESIS_CHALLENGE
+            ):
+                return PreValidationResult(uint16(Err.INVALID_PREV_BLOCK_HASH.value), None)
+            required_iters = pre_validation_result.required_iters
 
         prev_height = (
             -1
@@ -519,14 +670,17 @@ class Blockchain(BlockchainInterface):
         batch_size: int = 4,
         wp_summaries: Optional[List[SubEpochSummary]] = None,
     ) -> List[PreValidationResult]:
-        return await pre_validate_blocks_multiprocessing(
-            self.constants,
-            self,
-            blocks,
-            self.pool,
-            batch_size,
-            wp_summaries,
-        )
+        with pre_validate_seconds.time():
+            results = await pre_validate_blocks_multiprocessing(
+                self.constants,
+                self,
+                blocks,
+                self.pool,
+                batch_size,
+                wp_summaries,
+            )
+        pre_validated_blocks.inc(len(blocks))
+        return results
 
     def contains_block(self, header_hash: bytes32) -> bool:
         """
@@ -576,7 +730,7 @@ class Blockchain(BlockchainInterface):
         block_records = await self.block_store.get_block_records_in_range(
             max(fork_point - self.constants.BLOCKS_CACHE_SIZE, uint32(0)), fork_point
         )
-        for block_record in block_records.values():
+        for block_record in sorted(block_records.values(), key=lambda b: b.height):
             self.add_block_record(block_record)
 
     def clean_block_record(self, height: int) -> None:
@@ -591,6 +745,7 @@ class Blockchain(BlockchainInterface):
         while blocks_to_remove is not None and height >= 0:
             for header_hash in blocks_to_remove:
                 del self.__block_records[header_hash]  # remove from blocks
+                self.__skip_hashes.pop(header_hash, None)
             del self.__heights_in_cache[uint32(height)]  # remove height from heights in cache
 
             if height == 0:
@@ -684,6 +839,7 @@ class Blockchain(BlockchainInterface):
         sbr = self.block_record(header_hash)
         del self.__block_records[header_hash]
         self.__heights_in_cache[sbr.height].remove(header_hash)
+        self.__skip_hashes.pop(header_hash, None)
 
     def add_block_record(self, block_record: BlockRecord) -> None:
         """
@@ -694,12 +850,52 @@ class Blockchain(BlockchainInterface):
         if block_record.height not in self.__heights_in_cache.keys():
             self.__heights_in_cache[block_record.height] = set()
         self.__heights_in_cache[block_record.height].add(block_record.header_hash)
+        if block_record.height >= 2 and block_record.prev_hash in self.__block_records:
+            try:
+                skip_ancestor = self.get_ancestor(
+                    self.__block_records[block_record.prev_hash], uint32(get_skip_height(block_record.height))
+                )
+                self.__skip_hashes[block_record.header_hash] = skip_ancestor.header_hash
+            except KeyError:
+                # Some ancestor is not in the cache anymore, lookups will follow prev_hash instead
+                pass
+
+    def get_skip_ancestor(self, block_record: BlockRecord) -> Optional[BlockRecord]:
+        skip_hash = self.__skip_hashes.get(block_record.header_hash)
+        if skip_hash is None:
+            return None
+        return self.__block_records.get(skip_hash)
+
+    def get_ancestor(self, block_record: BlockRecord, height: uint32) -> BlockRecord:
+        """
+        Returns the ancestor of block_record at height in a logarithmic number of steps, by following the skip
+        pointers where they don't jump past the height.
+        """
+        if height > block_record.height:
+            raise ValueError(f"Height {height} is above block {block_record.header_hash} at {block_record.height}")
+        curr = block_record
+        while curr.height > height:
+            skip_height = get_skip_height(curr.height)
+            skip_height_prev = get_skip_height(curr.height - 1)
+            skip_ancestor = self.get_skip_ancestor(curr)
+            # Only skip if the block after the skip pointer of prev isn't a better choice
+            if skip_ancestor is not None and (
+                skip_height == height
+                or (skip_height > height and not (skip_height_prev < skip_height - 2 and skip_height_prev >= height))
+            ):
+                curr = skip_ancestor
+            else:
+                curr = self.__block_records[curr.prev_hash]
+        return curr
 
     async def persist_sub_epoch_challenge_segments(
         self, ses_block_hash: bytes32, segments: List[SubEpochChallengeSegment]
     ) -> None:
         await self.block_store.persist_sub_epoch_challenge_segments(ses_block_hash, segments)
 
+    async def get_sub_epoch_segments_hashes(self) -> Set[bytes32]:
+        return await self.block_store.get_sub_epoch_segments_hashes()
+
     async def get_sub_epoch_challenge_segments(
         self,
         ses_block_hash: bytes32,
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
 
 from bpx.consensus.block_record import BlockRecord
 from bpx.types.blockchain_format.sized_bytes import bytes32
@@ -76,6 +76,23 @@ class BlockchainInterface:
         # ignoring hinting error until we handle our interfaces more formally
         return  # type: ignore[return-value]
 
+    def get_ancestor(self, block_record: BlockRecord, height: uint32) -> BlockRecord:
+        """
+        Returns the ancestor of block_record at height (or block_record itself), all blocks in between must be present.
+        """
+        if height > block_record.height:
+            raise ValueError(f"Height {height} is above block {block_record.header_hash} at {block_record.height}")
+        curr = block_record
+        while curr.height > height:
+            curr = self.block_record(curr.prev_hash)
+        return curr
+
+    def get_skip_ancestor(self, block_record: BlockRecord) -> Optional[BlockRecord]:
+        """
+        Returns the ancestor at get_skip_height(block_record.height), if an ancestor index is kept and it is present.
+        """
+        return None
+
     def try_block_record(self, header_hash: bytes32) -> Optional[BlockRecord]:
         if self.contains_block(header_hash):
             return self.block_record(header_hash)
@@ -92,6 +109,10 @@ class BlockchainInterface:
     ) -> Optional[List[SubEpochChallengeSegment]]:
         pass
 
+    async def get_sub_epoch_segments_hashes(self) -> Set[bytes32]:
+        # ignoring hinting error until we handle our interfaces more formally
+        return  # type: ignore[return-value]
+
     def seen_compact_proofs(self, vdf_info: VDFInfo, height: uint32) -> bool:
         # ignoring hinting error until we handle our interfaces more formally
         return  # type: ignore[return-value]
@@ -39,8 +39,11 @@ def _get_blocks_at_height(
                 block_list.append(blocks.height_to_block_record(uint32(h)))
             return block_list
 
-    # Slow fetching, goes back one by one, since we are in a fork
+    # Slow fetching, since we are in a fork. Jumps to the last block to fetch with the ancestor index, and then goes
+    # back one by one
     curr_b: BlockRecord = prev_b
+    if curr_b.height >= target_height + max_num_blocks:
+        curr_b = blocks.get_ancestor(curr_b, uint32(target_height + max_num_blocks - 1))
     target_blocks = []
     while curr_b.height >= target_height:
         if curr_b.height < target_height + max_num_blocks:
@@ -5,6 +5,32 @@ from typing import Union
 from bpx.consensus.block_record import BlockRecord
 from bpx.consensus.blockchain_interface import BlockchainInterface
 from bpx.types.header_block import HeaderBlock
+from bpx.util.ints import uint32
+
+
+def _invert_lowest_one(n: int) -> int:
+    return n & (n - 1)
+
+
+def get_skip_height(height: int) -> int:
+    """
+    The height of the ancestor a block at this height keeps a skip pointer to. Following these pointers reaches any
+    ancestor in a logarithmic number of steps (the same scheme as the skip list of bitcoin's block index).
+    """
+    if height < 2:
+        return 0
+    # Odd heights jump less far, so that the pointers of consecutive blocks don't all go to the same ancestors
+    if height & 1:
+        return _invert_lowest_one(_invert_lowest_one(height - 1)) + 1
+    return _invert_lowest_one(height)
+
+
+def _get_ancestor(
+    blocks: BlockchainInterface, block: Union[BlockRecord, HeaderBlock], height: int
+) -> Union[BlockRecord, HeaderBlock]:
+    if block.height == height:
+        return block
+    return blocks.get_ancestor(blocks.block_record(block.prev_hash), uint32(height))
 
 
 def find_fork_point_in_chain(
@@ -17,19 +43,22 @@ def find_fork_point_in_chain(
     Returns -1 if chains have no common ancestor
     * assumes the fork point is loaded in blocks
     """
-    while block_2.height > 0 or block_1.height > 0:
-        if block_2.height > block_1.height:
-            block_2 = blocks.block_record(block_2.prev_hash)
-        elif block_1.height > block_2.height:
-            block_1 = blocks.block_record(block_1.prev_hash)
+    if block_1.height > block_2.height:
+        block_1 = _get_ancestor(blocks, block_1, block_2.height)
+    elif block_2.height > block_1.height:
+        block_2 = _get_ancestor(blocks, block_2, block_1.height)
+
+    while block_1.header_hash != block_2.header_hash:
+        if block_1.height == 0:
+            # All blocks are different
+            return -1
+        # Both blocks are at the same height, so their skip pointers go to the same height. If the blocks there are
+        # still different, the fork is below it and all blocks in between can be skipped
+        skip_1 = blocks.get_skip_ancestor(block_1) if isinstance(block_1, BlockRecord) else None
+        skip_2 = blocks.get_skip_ancestor(block_2) if isinstance(block_2, BlockRecord) else None
+        if skip_1 is not None and skip_2 is not None and skip_1.header_hash != skip_2.header_hash:
+            block_1, block_2 = skip_1, skip_2
         else:
-            if block_2.header_hash == block_1.header_hash:
-                return block_2.height
-            block_2 = blocks.block_record(block_2.prev_hash)
             block_1 = blocks.block_record(block_1.prev_hash)
-    if block_2 != block_1:
-        # All blocks are different
-        return -1
-
-    # First block is the same
-    return 0
+            block_2 = blocks.block_record(block_2.prev_hash)
+    return block_1.height
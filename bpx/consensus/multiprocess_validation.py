@@ -9,7 +9,7 @@ from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
 
 from blspy import AugSchemeMPL, G1Element
 
-from bpx.consensus.block_header_validation import validate_finished_header_block
+from bpx.consensus.block_header_validation import validate_finished_header_block, validate_unfinished_header_block
 from bpx.consensus.block_record import BlockRecord
 from bpx.consensus.blockchain_interface import BlockchainInterface
 from bpx.consensus.constants import ConsensusConstants
@@ -24,10 +24,13 @@ from bpx.types.blockchain_format.sub_epoch_summary import SubEpochSummary
 from bpx.types.full_block import FullBlock
 from bpx.types.header_block import HeaderBlock
 from bpx.types.unfinished_block import UnfinishedBlock
+from bpx.types.unfinished_header_block import UnfinishedHeaderBlock
 from bpx.util.block_cache import BlockCache
 from bpx.util.generator_tools import get_block_header
 from bpx.util.errors import Err, ValidationError
 from bpx.util.ints import uint16, uint32, uint64
+from bpx.util.setproctitle import setproctitle
+from bpx.util.shared_verification_cache import attach_shared_cache
 from bpx.util.streamable import Streamable, streamable
 
 log = logging.getLogger(__name__)
@@ -40,6 +43,11 @@ class PreValidationResult(Streamable):
     required_iters: Optional[uint64]  # Iff error is None
 
 
+def initialize_validation_worker(process_title: str, shared_cache_name: Optional[str]) -> None:
+    setproctitle(process_title)
+    attach_shared_cache(shared_cache_name)
+
+
 def batch_pre_validate_blocks(
     constants: ConsensusConstants,
     blocks_pickled: Dict[bytes, bytes],
@@ -102,6 +110,76 @@ def batch_pre_validate_blocks(
     return [bytes(r) for r in results]
 
 
+def _get_recent_blocks(
+    constants: ConsensusConstants,
+    block_records: BlockchainInterface,
+    prev_header_hash: bytes32,
+) -> Tuple[Dict[bytes32, BlockRecord], Dict[bytes32, BlockRecord]]:
+    """
+    Collects the ancestors of prev_header_hash (inclusive) that header validation needs, up to the previous
+    sub-epoch. The compressed dict only has the blocks needed when no sub-slots were finished.
+    """
+    recent_blocks: Dict[bytes32, BlockRecord] = {}
+    recent_blocks_compressed: Dict[bytes32, BlockRecord] = {}
+    num_sub_slots_found = 0
+    num_blocks_seen = 0
+    curr = block_records.block_record(prev_header_hash)
+    num_sub_slots_to_look_for = 3 if curr.overflow else 2
+    while (
+        curr.sub_epoch_summary_included is None
+        or num_blocks_seen < constants.NUMBER_OF_TIMESTAMPS
+        or num_sub_slots_found < num_sub_slots_to_look_for
+    ) and curr.height > 0:
+        if num_blocks_seen < constants.NUMBER_OF_TIMESTAMPS or num_sub_slots_found < num_sub_slots_to_look_for:
+            recent_blocks_compressed[curr.header_hash] = curr
+
+        if curr.first_in_sub_slot:
+            assert curr.finished_challenge_slot_hashes is not None
+            num_sub_slots_found += len(curr.finished_challenge_slot_hashes)
+        recent_blocks[curr.header_hash] = curr
+        if curr.is_transaction_block:
+            num_blocks_seen += 1
+        curr = block_records.block_record(curr.prev_hash)
+    recent_blocks[curr.header_hash] = curr
+    recent_blocks_compressed[curr.header_hash] = curr
+    return recent_blocks, recent_blocks_compressed
+
+
+def pre_validate_unfinished_block(
+    constants: ConsensusConstants,
+    blocks_pickled: Dict[bytes, bytes],
+    unfinished_header_block_pickled: bytes,
+    expected_difficulty: uint64,
+    expected_sub_slot_iters: uint64,
+) -> bytes:
+    """
+    Runs the header validation of an unfinished block in a worker, including the VDF proofs, the proof of space and
+    the signatures. The result only depends on the ancestors of the block, which are all passed in.
+    """
+    blocks: Dict[bytes32, BlockRecord] = {}
+    for k, v in blocks_pickled.items():
+        blocks[bytes32(k)] = BlockRecord.from_bytes(v)
+    try:
+        header_block = UnfinishedHeaderBlock.from_bytes(unfinished_header_block_pickled)
+        required_iters, error = validate_unfinished_header_block(
+            constants,
+            BlockCache(blocks),
+            header_block,
+            expected_difficulty,
+            expected_sub_slot_iters,
+            True,
+        )
+        error_int: Optional[uint16] = None
+        if error is not None:
+            error_int = uint16(error.code.value)
+        result = PreValidationResult(error_int, required_iters)
+    except Exception:
+        error_stack = traceback.format_exc()
+        log.error(f"Exception: {error_stack}")
+        result = PreValidationResult(uint16(Err.UNKNOWN.value), None)
+    return bytes(result)
+
+
 async def pre_validate_blocks_multiprocessing(
     constants: ConsensusConstants,
     block_records: BlockchainInterface,
@@ -126,30 +204,12 @@ async def pre_validate_blocks_multiprocessing(
     # Collects all the recent blocks (up to the previous sub-epoch)
     recent_blocks: Dict[bytes32, BlockRecord] = {}
     recent_blocks_compressed: Dict[bytes32, BlockRecord] = {}
-    num_sub_slots_found = 0
-    num_blocks_seen = 0
     if blocks[0].height > 0:
         if not block_records.contains_block(blocks[0].prev_header_hash):
             return [PreValidationResult(uint16(Err.INVALID_PREV_BLOCK_HASH.value), None)]
-        curr = block_records.block_record(blocks[0].prev_header_hash)
-        num_sub_slots_to_look_for = 3 if curr.overflow else 2
-        while (
-            curr.sub_epoch_summary_included is None
-            or num_blocks_seen < constants.NUMBER_OF_TIMESTAMPS
-            or num_sub_slots_found < num_sub_slots_to_look_for
-        ) and curr.height > 0:
-            if num_blocks_seen < constants.NUMBER_OF_TIMESTAMPS or num_sub_slots_found < num_sub_slots_to_look_for:
-                recent_blocks_compressed[curr.header_hash] = curr
-
-            if curr.first_in_sub_slot:
-                assert curr.finished_challenge_slot_hashes is not None
-                num_sub_slots_found += len(curr.finished_challenge_slot_hashes)
-            recent_blocks[curr.header_hash] = curr
-            if curr.is_transaction_block:
-                num_blocks_seen += 1
-            curr = block_records.block_record(curr.prev_hash)
-        recent_blocks[curr.header_hash] = curr
-        recent_blocks_compressed[curr.header_hash] = curr
+        recent_blocks, recent_blocks_compressed = _get_recent_blocks(
+            constants, block_records, blocks[0].prev_header_hash
+        )
     block_record_was_present = []
     for block in blocks:
         block_record_was_present.append(block_records.contains_block(block.header_hash))
@@ -270,4 +330,48 @@ async def pre_validate_blocks_multiprocessing(
         PreValidationResult.from_bytes(result)
         for batch_result in (await asyncio.gather(*futures))
         for result in batch_result
-    ]
\ No newline at end of file
+    ]
+
+
+async def pre_validate_unfinished_block_multiprocessing(
+    constants: ConsensusConstants,
+    block_records: BlockchainInterface,
+    block: UnfinishedBlock,
+    pool: Executor,
+) -> PreValidationResult:
+    """
+    Validates the header of an unfinished block in the pool. This does not need the blockchain lock, since the
+    validation only looks at the ancestors of the block, which do not change.
+    """
+    recent_blocks: Dict[bytes32, BlockRecord] = {}
+    prev_b: Optional[BlockRecord] = None
+    if block.prev_header_hash != constants.GENESIS_CHALLENGE:
+        if not block_records.contains_block(block.prev_header_hash):
+            return PreValidationResult(uint16(Err.INVALID_PREV_BLOCK_HASH.value), None)
+        recent_blocks, recent_blocks_compressed = _get_recent_blocks(constants, block_records, block.prev_header_hash)
+        if len(block.finished_sub_slots) == 0:
+            recent_blocks = recent_blocks_compressed
+        prev_b = block_records.block_record(block.prev_header_hash)
+
+    sub_slot_iters, difficulty = get_next_sub_slot_iters_and_difficulty(
+        constants, len(block.finished_sub_slots) > 0, prev_b, block_records
+    )
+    unfinished_header_block = UnfinishedHeaderBlock(
+        block.finished_sub_slots,
+        block.reward_chain_block,
+        block.challenge_chain_sp_proof,
+        block.reward_chain_sp_proof,
+        block.foliage,
+        block.foliage_transaction_block,
+        block.execution_payload,
+    )
+    result = await asyncio.get_running_loop().run_in_executor(
+        pool,
+        pre_validate_unfinished_block,
+        constants,
+        {bytes(k): bytes(v) for k, v in recent_blocks.items()},
+        bytes(unfinished_header_block),
+        difficulty,
+        sub_slot_iters,
+    )
+    return PreValidationResult.from_bytes(result)
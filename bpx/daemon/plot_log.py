@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Deque, List, Optional
+
+# Lines of plotter output kept per plot, older lines are dropped
+PLOT_LOG_MAX_LINES = 10000
+
+
+class PlotLog:
+    """
+    The output of a plotter, kept as a bounded ring of lines. Data is fed in chunks as it is read, and only
+    complete lines are added, so a line split across two reads is added once it ends.
+    """
+
+    _lines: Deque[str]
+    _partial: str
+    _text: Optional[str]
+
+    def __init__(self, max_lines: int = PLOT_LOG_MAX_LINES) -> None:
+        self._lines = deque(maxlen=max_lines)
+        self._partial = ""
+        self._text = None
+
+    def feed(self, data: str) -> List[str]:
+        """
+        Returns the lines completed by `data`.
+        """
+        lines = (self._partial + data).splitlines(keepends=True)
+        self._partial = ""
+        if len(lines) > 0 and not lines[-1].endswith(("\n", "\r")):
+            self._partial = lines.pop()
+        if len(lines) > 0:
+            self._lines.extend(lines)
+            self._text = None
+        return lines
+
+    def text(self) -> str:
+        if self._text is None:
+            self._text = "".join(self._lines)
+        return self._text
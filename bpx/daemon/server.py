@@ -22,6 +22,8 @@ from bpx import __version__
 from bpx.cmds.init_funcs import check_keys, bpx_full_version_str, bpx_init
 from bpx.cmds.passphrase_funcs import default_passphrase, using_default_passphrase
 from bpx.daemon.keychain_server import KeychainServer, keychain_commands
+from bpx.daemon.plot_log import PlotLog
+from bpx.daemon.websocket_relay import WebSocketRelay
 from bpx.daemon.windows_signal import kill
 from bpx.plotters.plotters import get_available_plotters
 from bpx.plotting.util import add_plot_directory
@@ -53,6 +55,12 @@ log = logging.getLogger(__name__)
 
 service_plotter = "bpx_plotter"
 
+# Size of the reads from a plotter log, and how long to wait for more output once all of it was read
+PLOT_LOG_READ_SIZE = 64 * 1024
+PLOT_LOG_POLL_INTERVAL = 0.5
+# New plotter output is batched into at most one LOG_CHANGED event per interval
+LOG_CHANGED_INTERVAL = 1.0
+
 
 async def fetch(url: str):
     async with ClientSession() as session:
@@ -143,6 +151,7 @@ class WebSocketServer:
         self.keychain_server = KeychainServer()
         self.run_check_keys_on_unlock = run_check_keys_on_unlock
         self.shutdown_event = asyncio.Event()
+        self.relay = WebSocketRelay(self._send_failed)
 
     @asynccontextmanager
     async def run(self) -> AsyncIterator[None]:
@@ -275,26 +284,25 @@ class WebSocketServer:
         return ws
 
     async def send_all_responses(self, connections: Set[WebSocketResponse], response: str) -> None:
-        for connection in connections:
-            try:
-                await connection.send_str(response)
-            except Exception as e:
-                service_names = self.remove_connection(connection)
-                if len(service_names) == 0:
-                    service_names = ["Unknown"]
+        await self.relay.send_response(connections, response)
 
-                if isinstance(e, ConnectionResetError):
-                    self.log.info(f"Peer disconnected. Closing websocket with {service_names}")
-                else:
-                    tb = traceback.format_exc()
-                    self.log.error(f"Unexpected exception trying to send to {service_names} (websocket: {e} {tb})")
-                    self.log.info(f"Closing websocket with {service_names}")
+    async def _send_failed(self, connection: WebSocketResponse, e: Exception) -> None:
+        service_names = self.remove_connection(connection)
+        if len(service_names) == 0:
+            service_names = ["Unknown"]
+
+        if isinstance(e, ConnectionResetError):
+            self.log.info(f"Peer disconnected. Closing websocket with {service_names}")
+        else:
+            self.log.error(f"Unexpected exception trying to send to {service_names} (websocket: {e})")
+            self.log.info(f"Closing websocket with {service_names}")
 
-                await connection.close()
+        await connection.close()
 
     def remove_connection(self, websocket: WebSocketResponse) -> List[str]:
         """Returns a list of service names from which the connection was removed"""
         service_names = []
+        self.relay.remove(websocket)
         for service_name, connections in self.connections.items():
             try:
                 connections.remove(websocket)
@@ -570,15 +578,7 @@ class WebSocketServer:
             return None
 
         response = create_payload("keyring_status_changed", keyring_status, "daemon", destination)
-
-        for websocket in websockets.copy():
-            try:
-                await websocket.send_str(response)
-            except Exception as e:
-                tb = traceback.format_exc()
-                self.log.error(f"Unexpected exception trying to send to websocket: {e} {tb}")
-                websockets.remove(websocket)
-                await websocket.close()
+        self.relay.send(websockets, response, coalesce_key=f"keyring_status_changed.{destination}")
 
     def keyring_status_changed(self, keyring_status: Dict[str, Any], destination: str):
         asyncio.create_task(self._keyring_status_changed(keyring_status, destination))
@@ -600,7 +600,8 @@ class WebSocketServer:
         }
 
         if send_full_log:
-            item["log"] = plot_queue_item.get("log")
+            plot_log: Optional[PlotLog] = plot_queue_item.get("log")
+            item["log"] = plot_log.text() if plot_log is not None else None
         return item
 
     def prepare_plot_state_message(self, state: PlotEvent, id):
@@ -630,14 +631,13 @@ class WebSocketServer:
 
         response = create_payload("state_changed", message, service, "ui")
 
-        for websocket in websockets.copy():
-            try:
-                await websocket.send_str(response)
-            except Exception as e:
-                tb = traceback.format_exc()
-                self.log.error(f"Unexpected exception trying to send to websocket: {e} {tb}")
-                websockets.remove(websocket)
-                await websocket.close()
+        # A state change carries the whole state of the plots it is about, so only the latest one has to be sent.
+        # Log changes only carry the new lines and are all sent.
+        coalesce_key: Optional[str] = None
+        if message.get("state") == PlotEvent.STATE_CHANGED:
+            plot_ids = ",".join(item["id"] for item in message.get("queue", []))
+            coalesce_key = f"state_changed.{service}.{plot_ids}"
+        self.relay.send(websockets, response, coalesce_key=coalesce_key)
 
     def state_changed(self, service: str, message: Dict[str, Any]):
         asyncio.create_task(self._state_changed(service, message))
@@ -661,23 +661,33 @@ class WebSocketServer:
                 # "Copy to <path> finished, took..." if copying to another volume
                 final_words = ["Renamed final plot", "finished, took"]
 
+        plot_log = PlotLog()
+        config["log"] = plot_log
+        new_lines: List[str] = []
+        last_log_changed = 0.0
         while True:
-            new_data = await loop.run_in_executor(io_pool_exc, fp.readline)
+            new_data = await loop.run_in_executor(io_pool_exc, fp.read, PLOT_LOG_READ_SIZE)
 
             if config["state"] is not PlotState.RUNNING:
                 return None
 
-            if new_data not in (None, ""):
-                config["log"] = new_data if config["log"] is None else config["log"] + new_data
-                config["log_new"] = new_data
+            finished = False
+            for line in plot_log.feed(new_data):
+                new_lines.append(line)
+                if any(word in line for word in final_words):
+                    finished = True
+
+            now = time.monotonic()
+            if len(new_lines) > 0 and (finished or now - last_log_changed >= LOG_CHANGED_INTERVAL):
+                config["log_new"] = "".join(new_lines)
+                new_lines = []
+                last_log_changed = now
                 self.state_changed(service_plotter, self.prepare_plot_state_message(PlotEvent.LOG_CHANGED, id))
 
-            if new_data:
-                for word in final_words:
-                    if word in new_data:
-                        return None
-            else:
-                time.sleep(0.5)
+            if finished:
+                return None
+            if not new_data:
+                await asyncio.sleep(PLOT_LOG_POLL_INTERVAL)
 
     async def _track_plotting_progress(self, config, loop: asyncio.AbstractEventLoop):
         file_path = config["out_file"]
@@ -1137,6 +1147,7 @@ class WebSocketServer:
         return {"success": True, "service_name": service_name, "is_running": is_running}
 
     async def exit(self) -> None:
+        await self.relay.close()
         if self.webserver is not None:
             self.webserver.close()
             await self.webserver.await_closed()
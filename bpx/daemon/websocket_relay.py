@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Coroutine, Deque, Dict, Iterable, List, Optional
+
+from aiohttp.web_ws import WebSocketResponse
+
+log = logging.getLogger(__name__)
+
+# Messages waiting for a single connection. A connection which falls further behind on broadcasts is closed, while
+# responses wait for room in the queue.
+DEFAULT_MAX_QUEUE_SIZE = 256
+# On close, the time given to each connection to send what is still queued
+CLOSE_SEND_TIMEOUT = 1.0
+
+
+@dataclass(eq=False)
+class PendingMessage:
+    message: str
+    # Messages with the same key supersede each other while they are still queued
+    coalesce_key: Optional[str] = None
+
+
+@dataclass
+class ConnectionQueue:
+    messages: Deque[PendingMessage] = field(default_factory=deque)
+    coalescable: Dict[str, PendingMessage] = field(default_factory=dict)
+    ready: asyncio.Event = field(default_factory=asyncio.Event)
+    # Set whenever the sender task takes a message, or the queue is removed
+    space: asyncio.Event = field(default_factory=asyncio.Event)
+    # Set when everything queued was sent, or the queue is removed
+    idle: asyncio.Event = field(default_factory=asyncio.Event)
+    task: Optional[asyncio.Task[None]] = None
+    coalesced: int = 0
+
+
+class WebSocketRelay:
+    """
+    Sends messages to websockets without waiting for them. Each connection has its own bounded queue and sender
+    task, so a slow connection only delays its own messages. Callers encode a message once, no matter how many
+    connections it goes to. A queued message with a coalesce key is dropped when a newer message with the same key
+    is queued, so a slow consumer only gets the latest state instead of every intermediate one.
+    """
+
+    queues: Dict[WebSocketResponse, ConnectionQueue]
+
+    def __init__(
+        self,
+        on_send_error: Callable[[WebSocketResponse, Exception], Coroutine[Any, Any, None]],
+        max_queue_size: int = DEFAULT_MAX_QUEUE_SIZE,
+    ) -> None:
+        self.on_send_error = on_send_error
+        self.max_queue_size = max_queue_size
+        self.queues = {}
+
+    def _get_queue(self, connection: WebSocketResponse) -> ConnectionQueue:
+        queue = self.queues.get(connection)
+        if queue is None:
+            queue = ConnectionQueue()
+            queue.idle.set()
+            queue.task = asyncio.create_task(self._send_queued(connection, queue))
+            self.queues[connection] = queue
+        return queue
+
+    def _append(self, queue: ConnectionQueue, pending: PendingMessage) -> None:
+        if pending.coalesce_key is not None:
+            superseded = queue.coalescable.get(pending.coalesce_key)
+            if superseded is not None:
+                # The newer message goes to the end, behind the messages queued before it
+                queue.messages.remove(superseded)
+                queue.coalesced += 1
+            queue.coalescable[pending.coalesce_key] = pending
+        queue.messages.append(pending)
+        queue.idle.clear()
+        queue.ready.set()
+
+    def send(self, connections: Iterable[WebSocketResponse], message: str, coalesce_key: Optional[str] = None) -> None:
+        """
+        Queues a broadcast message, connections with a full queue are closed.
+        """
+        for connection in list(connections):
+            queue = self._get_queue(connection)
+            if len(queue.messages) >= self.max_queue_size and (
+                coalesce_key is None or coalesce_key not in queue.coalescable
+            ):
+                self.remove(connection)
+                asyncio.create_task(
+                    self.on_send_error(connection, Exception(f"Send queue full ({self.max_queue_size} messages)"))
+                )
+                continue
+            self._append(queue, PendingMessage(message, coalesce_key))
+
+    async def send_response(self, connections: Iterable[WebSocketResponse], message: str) -> None:
+        """
+        Queues a response, waiting for room in the queue of connections which are behind instead of closing them.
+        """
+        for connection in list(connections):
+            queue = self._get_queue(connection)
+            while len(queue.messages) >= self.max_queue_size and self.queues.get(connection) is queue:
+                queue.space.clear()
+                await queue.space.wait()
+            if self.queues.get(connection) is not queue:
+                # The connection was closed while waiting
+                continue
+            self._append(queue, PendingMessage(message))
+
+    async def _send_queued(self, connection: WebSocketResponse, queue: ConnectionQueue) -> None:
+        while True:
+            await queue.ready.wait()
+            while len(queue.messages) > 0:
+                pending = queue.messages.popleft()
+                queue.space.set()
+                if pending.coalesce_key is not None:
+                    queue.coalescable.pop(pending.coalesce_key, None)
+                try:
+                    await connection.send_str(pending.message)
+                except Exception as e:
+                    self.remove(connection)
+                    await self.on_send_error(connection, e)
+                    return
+            queue.idle.set()
+            queue.ready.clear()
+
+    def remove(self, connection: WebSocketResponse) -> None:
+        queue = self.queues.pop(connection, None)
+        if queue is None:
+            return
+        queue.space.set()
+        queue.idle.set()
+        if queue.task is None:
+            return
+        if queue.task is not asyncio.current_task():
+            queue.task.cancel()
+
+    def pending_messages(self) -> Dict[WebSocketResponse, int]:
+        return {connection: len(queue.messages) for connection, queue in self.queues.items()}
+
+    async def _wait_idle(self, queue: ConnectionQueue, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(queue.idle.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def close(self, timeout: float = CLOSE_SEND_TIMEOUT) -> None:
+        """
+        Sends what is still queued, waiting at most `timeout` seconds for each connection, then stops the senders.
+        """
+        await asyncio.gather(*(self._wait_idle(queue, timeout) for queue in list(self.queues.values())))
+        tasks: List[asyncio.Task[None]] = []
+        for connection in list(self.queues.keys()):
+            queue = self.queues[connection]
+            if queue.task is not None:
+                tasks.append(queue.task)
+            self.remove(connection)
+        if len(tasks) > 0:
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -13,16 +13,17 @@ from blspy import AugSchemeMPL, G1Element, G2Element, PrivateKey
 
 from bpx.consensus.constants import ConsensusConstants
 from bpx.daemon.keychain_proxy import KeychainProxy, connect_to_keychain_and_validate, wrap_local_keychain
+from bpx.farmer.signage_point_store import SignagePointStore
 from bpx.plot_sync.delta import Delta
 from bpx.plot_sync.receiver import Receiver
-from bpx.protocols import farmer_protocol, harvester_protocol
+from bpx.protocols import harvester_protocol
 from bpx.protocols.protocol_message_types import ProtocolMessageTypes
+from bpx.protocols.shared_protocol import Capability
 from bpx.rpc.rpc_server import StateChangedProtocol, default_get_connections
 from bpx.server.outbound_message import NodeType, make_msg
 from bpx.server.server import BpxServer, ssl_context_for_root
 from bpx.server.ws_connection import WSBpxConnection
 from bpx.ssl.create_ssl import get_mozilla_ca_crt
-from bpx.types.blockchain_format.proof_of_space import ProofOfSpace
 from bpx.types.blockchain_format.sized_bytes import bytes32
 from bpx.util.byte_types import hexstr_to_bytes
 from bpx.util.config import load_config
@@ -31,6 +32,7 @@ from bpx.util.hash import std_hash
 from bpx.util.ints import uint8, uint16, uint64
 from bpx.util.keychain import Keychain
 from bpx.util.logging import TimedDuplicateFilter
+from bpx.util.lru_cache import LRUCache
 from bpx.util.derive_keys import (
     master_sk_to_farmer_sk,
     master_sk_to_pool_sk,
@@ -38,6 +40,9 @@ from bpx.util.derive_keys import (
 
 log = logging.getLogger(__name__)
 
+# Seconds after which a signature batch without a response no longer holds back the next one
+SIGNATURE_BATCH_TIMEOUT = 5
+
 """
 HARVESTER PROTOCOL (FARMER <-> HARVESTER)
 """
@@ -55,23 +60,26 @@ class Farmer:
         self.local_keychain = local_keychain
         self._root_path = root_path
         self.config = farmer_config
-        # Keep track of all sps, keyed on challenge chain signage point hash
-        self.sps: Dict[bytes32, List[farmer_protocol.NewSignagePoint]] = {}
-
-        # Keep track of harvester plot identifier (str), target sp index, and PoSpace for each challenge
-        self.proofs_of_space: Dict[bytes32, List[Tuple[str, ProofOfSpace]]] = {}
-
-        # Quality string to plot identifier and challenge_hash, for use with harvester.RequestSignatures
-        self.quality_str_to_identifiers: Dict[bytes32, Tuple[str, bytes32, bytes32, bytes32]] = {}
-
-        # number of responses to each signage point
-        self.number_of_responses: Dict[bytes32, int] = {}
-
-        # A dictionary of keys to time added. These keys refer to keys in the above 4 dictionaries. This is used
-        # to periodically clear the memory
-        self.cache_add_time: Dict[bytes32, uint64] = {}
+        # Keep track of all sps, the proofs of space found for them and their quality strings, keyed on challenge
+        # chain signage point hash
+        self.sp_store = SignagePointStore(
+            consensus_constants,
+            consensus_constants.SUB_SLOT_TIME_TARGET * 3,
+            farmer_config.get("signage_point_cache_size", 1024),
+        )
 
         self.plot_sync_receivers: Dict[bytes32, Receiver] = {}
+        # Receivers of disconnected harvesters, a reconnecting harvester can resume its plot sync from them
+        self.disconnected_plot_sync_receivers: LRUCache[bytes32, Receiver] = LRUCache(
+            farmer_config.get("plot_sync_resume_cache_size", 100)
+        )
+
+        # Signature requests collected per harvester while a batch for that harvester is in flight, and the time the
+        # batch in flight was sent
+        self.pending_signature_requests: Dict[bytes32, List[harvester_protocol.RequestSignatures]] = {}
+        self.signature_batch_in_flight: Dict[bytes32, float] = {}
+        # Sends the queued requests of a harvester if its batch in flight gets no response in time
+        self.signature_batch_timeouts: Dict[bytes32, asyncio.TimerHandle] = {}
 
         self.cache_clear_task: Optional[asyncio.Task[None]] = None
         self.constants = consensus_constants
@@ -146,6 +154,8 @@ class Farmer:
 
     def _close(self) -> None:
         self._shut_down = True
+        for peer_node_id in list(self.signature_batch_timeouts.keys()):
+            self._cancel_signature_batch_timeout(peer_node_id)
 
     async def _await_closed(self, shutting_down: bool = True) -> None:
         if self.cache_clear_task is not None:
@@ -189,7 +199,10 @@ class Farmer:
             self.harvester_handshake_task = None
 
         if peer.connection_type is NodeType.HARVESTER:
-            self.plot_sync_receivers[peer.peer_node_id] = Receiver(peer, self.plot_sync_callback)
+            previous = self.disconnected_plot_sync_receivers.get(peer.peer_node_id)
+            if previous is not None:
+                self.disconnected_plot_sync_receivers.remove(peer.peer_node_id)
+            self.plot_sync_receivers[peer.peer_node_id] = Receiver(peer, self.plot_sync_callback, previous)
             self.harvester_handshake_task = asyncio.create_task(handshake_task())            
 
     def set_server(self, server: BpxServer) -> None:
@@ -203,7 +216,11 @@ class Farmer:
         self.log.info(f"peer disconnected {connection.get_peer_logging()}")
         self.state_changed("close_connection", {})
         if connection.connection_type is NodeType.HARVESTER:
-            del self.plot_sync_receivers[connection.peer_node_id]
+            receiver = self.plot_sync_receivers.pop(connection.peer_node_id)
+            self.disconnected_plot_sync_receivers.put(connection.peer_node_id, receiver)
+            self.pending_signature_requests.pop(connection.peer_node_id, None)
+            self.signature_batch_in_flight.pop(connection.peer_node_id, None)
+            self._cancel_signature_batch_timeout(connection.peer_node_id)
             self.state_changed("harvester_removed", {"node_id": connection.peer_node_id})
 
     async def plot_sync_callback(self, peer_id: bytes32, delta: Optional[Delta]) -> None:
@@ -211,6 +228,47 @@ class Farmer:
         receiver: Receiver = self.plot_sync_receivers[peer_id]
         self.state_changed("harvester_update", receiver.to_dict(True))
 
+    async def request_signatures(self, peer: WSBpxConnection, request: harvester_protocol.RequestSignatures) -> None:
+        """
+        Sends the request right away if no batch is in flight for this harvester, otherwise queues it so it goes out
+        together with all other requests collected until the harvester responds.
+        """
+        if not peer.has_capability(Capability.BATCH_SIGNATURES):
+            await peer.send_message(make_msg(ProtocolMessageTypes.request_signatures, request))
+            return
+
+        self.pending_signature_requests.setdefault(peer.peer_node_id, []).append(request)
+        sent_time = self.signature_batch_in_flight.get(peer.peer_node_id)
+        if sent_time is not None and time.time() - sent_time < SIGNATURE_BATCH_TIMEOUT:
+            return
+        await self.send_signature_requests_batch(peer)
+
+    async def send_signature_requests_batch(self, peer: WSBpxConnection) -> None:
+        self._cancel_signature_batch_timeout(peer.peer_node_id)
+        requests = self.pending_signature_requests.pop(peer.peer_node_id, [])
+        if len(requests) == 0:
+            self.signature_batch_in_flight.pop(peer.peer_node_id, None)
+            return
+
+        self.signature_batch_in_flight[peer.peer_node_id] = time.time()
+        self.signature_batch_timeouts[peer.peer_node_id] = asyncio.get_running_loop().call_later(
+            SIGNATURE_BATCH_TIMEOUT, self._signature_batch_timed_out, peer
+        )
+        batch = harvester_protocol.RequestSignaturesBatch(requests)
+        await peer.send_message(make_msg(ProtocolMessageTypes.request_signatures_batch, batch))
+
+    def _signature_batch_timed_out(self, peer: WSBpxConnection) -> None:
+        self.signature_batch_timeouts.pop(peer.peer_node_id, None)
+        if peer.closed:
+            return
+        self.log.warning(f"No response to a signature batch from {peer.get_peer_logging()}, sending the next one")
+        asyncio.create_task(self.send_signature_requests_batch(peer))
+
+    def _cancel_signature_batch_timeout(self, peer_node_id: bytes32) -> None:
+        timeout = self.signature_batch_timeouts.pop(peer_node_id, None)
+        if timeout is not None:
+            timeout.cancel()
+
     def get_public_keys(self) -> List[G1Element]:
         return [child_sk.get_g1() for child_sk in self._private_keys]
 
@@ -238,28 +296,12 @@ class Farmer:
         return receiver
 
     async def _periodically_clear_cache_and_refresh_task(self) -> None:
-        time_slept = 0
         refresh_slept = 0
         while not self._shut_down:
             try:
-                if time_slept > self.constants.SUB_SLOT_TIME_TARGET:
-                    now = time.time()
-                    removed_keys: List[bytes32] = []
-                    for key, add_time in self.cache_add_time.items():
-                        if now - float(add_time) > self.constants.SUB_SLOT_TIME_TARGET * 3:
-                            self.sps.pop(key, None)
-                            self.proofs_of_space.pop(key, None)
-                            self.quality_str_to_identifiers.pop(key, None)
-                            self.number_of_responses.pop(key, None)
-                            removed_keys.append(key)
-                    for key in removed_keys:
-                        self.cache_add_time.pop(key, None)
-                    time_slept = 0
-                    log.debug(
-                        f"Cleared farmer cache. Num sps: {len(self.sps)} {len(self.proofs_of_space)} "
-                        f"{len(self.quality_str_to_identifiers)} {len(self.number_of_responses)}"
-                    )
-                time_slept += 1
+                removed = self.sp_store.clear_expired()
+                if removed > 0:
+                    log.debug(f"Cleared farmer cache. Removed {removed} sps, num sps: {len(self.sp_store)}")
                 refresh_slept += 1
                 # Periodically refresh GUI to show the correct download/upload rate.
                 if refresh_slept >= 30:
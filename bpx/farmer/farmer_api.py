@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import json
-import time
 from typing import Any, Dict, List, Optional, Tuple
 
 import aiohttp
@@ -10,12 +9,15 @@ from blspy import AugSchemeMPL, G2Element, PrivateKey
 from bpx import __version__
 from bpx.consensus.pot_iterations import calculate_iterations_quality, calculate_sp_interval_iters
 from bpx.farmer.farmer import Farmer
+from bpx.farmer.signage_point_store import QualityIdentifiers
 from bpx.harvester.harvester_api import HarvesterAPI
 from bpx.protocols import farmer_protocol, harvester_protocol
 from bpx.protocols.harvester_protocol import (
+    PlotSyncCompressed,
     PlotSyncDone,
     PlotSyncPathList,
     PlotSyncPlotList,
+    PlotSyncResume,
     PlotSyncStart,
 )
 from bpx.protocols.protocol_message_types import ProtocolMessageTypes
@@ -23,12 +25,8 @@ from bpx.server.outbound_message import NodeType, make_msg
 from bpx.server.server import ssl_context_for_root
 from bpx.server.ws_connection import WSBpxConnection
 from bpx.ssl.create_ssl import get_mozilla_ca_crt
-from bpx.types.blockchain_format.proof_of_space import (
-    generate_plot_public_key,
-    generate_taproot_sk,
-    verify_and_get_quality_string,
-)
-from bpx.util.api_decorators import api_request
+from bpx.types.blockchain_format.proof_of_space import generate_plot_public_key, generate_taproot_sk
+from bpx.util.api_decorators import ApiPriority, api_request
 from bpx.util.ints import uint32, uint64
 
 
@@ -48,46 +46,42 @@ class FarmerAPI:
     def __init__(self, farmer) -> None:
         self.farmer = farmer
 
-    @api_request(peer_required=True)
+    @api_request(peer_required=True, priority=ApiPriority.CRITICAL)
     async def new_proof_of_space(self, new_proof_of_space: harvester_protocol.NewProofOfSpace, peer: WSBpxConnection):
         """
         This is a response from the harvester, for a NewChallenge. Here we check if the proof
         of space is sufficiently good, and if so, we ask for the whole proof.
         """
-        if new_proof_of_space.sp_hash not in self.farmer.number_of_responses:
-            self.farmer.number_of_responses[new_proof_of_space.sp_hash] = 0
-            self.farmer.cache_add_time[new_proof_of_space.sp_hash] = uint64(int(time.time()))
+        state = self.farmer.sp_store.get(new_proof_of_space.sp_hash)
+        if state is None or len(state.signage_points) == 0:
+            self.farmer.log.warning(
+                f"Received response for a signage point that we do not have {new_proof_of_space.sp_hash}"
+            )
+            return None
 
         max_pos_per_sp = 5
 
         if self.farmer.config.get("selected_network") != "mainnet":
             # This is meant to make testnets more stable, when difficulty is very low
-            if self.farmer.number_of_responses[new_proof_of_space.sp_hash] > max_pos_per_sp:
+            if state.number_of_responses > max_pos_per_sp:
                 self.farmer.log.info(
                     f"Surpassed {max_pos_per_sp} PoSpace for one SP, no longer submitting PoSpace for signage point "
                     f"{new_proof_of_space.sp_hash}"
                 )
                 return None
 
-        if new_proof_of_space.sp_hash not in self.farmer.sps:
-            self.farmer.log.warning(
-                f"Received response for a signage point that we do not have {new_proof_of_space.sp_hash}"
-            )
+        computed_quality_string = self.farmer.sp_store.get_quality_string(
+            state,
+            new_proof_of_space.proof,
+            new_proof_of_space.challenge_hash,
+            new_proof_of_space.sp_hash,
+        )
+        if computed_quality_string is None:
+            self.farmer.log.error(f"Invalid proof of space {new_proof_of_space.proof}")
             return None
 
-        sps = self.farmer.sps[new_proof_of_space.sp_hash]
-        for sp in sps:
-            computed_quality_string = verify_and_get_quality_string(
-                new_proof_of_space.proof,
-                self.farmer.constants,
-                new_proof_of_space.challenge_hash,
-                new_proof_of_space.sp_hash,
-            )
-            if computed_quality_string is None:
-                self.farmer.log.error(f"Invalid proof of space {new_proof_of_space.proof}")
-                return None
-
-            self.farmer.number_of_responses[new_proof_of_space.sp_hash] += 1
+        for sp in state.signage_points:
+            state.number_of_responses += 1
 
             required_iters: uint64 = calculate_iterations_quality(
                 self.farmer.constants.DIFFICULTY_CONSTANT_FACTOR,
@@ -107,36 +101,32 @@ class FarmerAPI:
                     [sp.challenge_chain_sp, sp.reward_chain_sp],
                 )
 
-                if new_proof_of_space.sp_hash not in self.farmer.proofs_of_space:
-                    self.farmer.proofs_of_space[new_proof_of_space.sp_hash] = []
-                self.farmer.proofs_of_space[new_proof_of_space.sp_hash].append(
-                    (
+                self.farmer.sp_store.add_proof(
+                    state,
+                    computed_quality_string,
+                    new_proof_of_space.proof,
+                    QualityIdentifiers(
                         new_proof_of_space.plot_identifier,
-                        new_proof_of_space.proof,
-                    )
+                        new_proof_of_space.challenge_hash,
+                        new_proof_of_space.sp_hash,
+                        peer.peer_node_id,
+                    ),
                 )
-                self.farmer.cache_add_time[new_proof_of_space.sp_hash] = uint64(int(time.time()))
-                self.farmer.quality_str_to_identifiers[computed_quality_string] = (
-                    new_proof_of_space.plot_identifier,
-                    new_proof_of_space.challenge_hash,
-                    new_proof_of_space.sp_hash,
-                    peer.peer_node_id,
-                )
-                self.farmer.cache_add_time[computed_quality_string] = uint64(int(time.time()))
 
-                await peer.send_message(make_msg(ProtocolMessageTypes.request_signatures, request))
+                await self.farmer.request_signatures(peer, request)
                 return
 
-    @api_request()
+    @api_request(priority=ApiPriority.CRITICAL)
     async def respond_signatures(self, response: harvester_protocol.RespondSignatures):
         """
         There are two cases: receiving signatures for sps, or receiving signatures for the block.
         """
-        if response.sp_hash not in self.farmer.sps:
+        state = self.farmer.sp_store.get(response.sp_hash)
+        if state is None or len(state.signage_points) == 0:
             self.farmer.log.warning(f"Do not have challenge hash {response.challenge_hash}")
             return None
         is_sp_signatures: bool = False
-        sps = self.farmer.sps[response.sp_hash]
+        sps = state.signage_points
         signage_point_index = sps[0].signage_point_index
         found_sp_hash_debug = False
         for sp_candidate in sps:
@@ -148,14 +138,14 @@ class FarmerAPI:
             assert is_sp_signatures
 
         pospace = None
-        for plot_identifier, candidate_pospace in self.farmer.proofs_of_space[response.sp_hash]:
+        for plot_identifier, candidate_pospace in state.proofs_of_space:
             if plot_identifier == response.plot_identifier:
                 pospace = candidate_pospace
         assert pospace is not None
         include_taproot: bool = pospace.pool_contract_puzzle_hash is not None
 
-        computed_quality_string = verify_and_get_quality_string(
-            pospace, self.farmer.constants, response.challenge_hash, response.sp_hash
+        computed_quality_string = self.farmer.sp_store.get_quality_string(
+            state, pospace, response.challenge_hash, response.sp_hash
         )
         if computed_quality_string is None:
             self.farmer.log.warning(f"Have invalid PoSpace {pospace}")
@@ -256,11 +246,26 @@ class FarmerAPI:
                     msg = make_msg(ProtocolMessageTypes.signed_values, request_to_nodes)
                     await self.farmer.server.send_to_all([msg], NodeType.BEACON)
 
+    @api_request(peer_required=True, priority=ApiPriority.CRITICAL)
+    async def respond_signatures_batch(
+        self, response: harvester_protocol.RespondSignaturesBatch, peer: WSBpxConnection
+    ) -> None:
+        """
+        Signatures for all requests of one RequestSignaturesBatch. The requests which were queued while this batch
+        was in flight are sent first, so the harvester signs them while we process these responses.
+        """
+        await self.farmer.send_signature_requests_batch(peer)
+        for single_response in response.responses:
+            try:
+                await self.respond_signatures(single_response)
+            except Exception as e:
+                self.farmer.log.error(f"Error processing signatures for {single_response.plot_identifier}: {e}")
+
     """
     FARMER PROTOCOL (FARMER <-> FULL NODE)
     """
 
-    @api_request()
+    @api_request(priority=ApiPriority.CRITICAL)
     async def new_signage_point(self, new_signage_point: farmer_protocol.NewSignagePoint):
         message = harvester_protocol.NewSignagePointHarvester(
             new_signage_point.challenge_hash,
@@ -272,35 +277,28 @@ class FarmerAPI:
 
         msg = make_msg(ProtocolMessageTypes.new_signage_point_harvester, message)
         await self.farmer.server.send_to_all([msg], NodeType.HARVESTER)
-        if new_signage_point.challenge_chain_sp not in self.farmer.sps:
-            self.farmer.sps[new_signage_point.challenge_chain_sp] = []
-
-        if new_signage_point in self.farmer.sps[new_signage_point.challenge_chain_sp]:
+        if not self.farmer.sp_store.add_signage_point(new_signage_point):
             self.farmer.log.debug(f"Duplicate signage point {new_signage_point.signage_point_index}")
             return
 
-        self.farmer.sps[new_signage_point.challenge_chain_sp].append(new_signage_point)
-        self.farmer.cache_add_time[new_signage_point.challenge_chain_sp] = uint64(int(time.time()))
         self.farmer.state_changed("new_signage_point", {"sp_hash": new_signage_point.challenge_chain_sp})
 
-    @api_request()
+    @api_request(priority=ApiPriority.CRITICAL)
     async def request_signed_values(self, beacon_request: farmer_protocol.RequestSignedValues):
-        if beacon_request.quality_string not in self.farmer.quality_str_to_identifiers:
+        identifiers = self.farmer.sp_store.get_quality_identifiers(beacon_request.quality_string)
+        if identifiers is None:
             self.farmer.log.error(f"Do not have quality string {beacon_request.quality_string}")
             return None
 
-        (plot_identifier, challenge_hash, sp_hash, node_id) = self.farmer.quality_str_to_identifiers[
-            beacon_request.quality_string
-        ]
         request = harvester_protocol.RequestSignatures(
-            plot_identifier,
-            challenge_hash,
-            sp_hash,
+            identifiers.plot_identifier,
+            identifiers.challenge_hash,
+            identifiers.sp_hash,
             [beacon_request.foliage_block_data_hash, beacon_request.foliage_transaction_block_hash],
         )
 
         msg = make_msg(ProtocolMessageTypes.request_signatures, request)
-        await self.farmer.server.send_to_specific([msg], node_id)
+        await self.farmer.server.send_to_specific([msg], identifiers.peer_node_id)
 
     @api_request()
     async def farming_info(self, request: farmer_protocol.FarmingInfo):
@@ -326,6 +324,14 @@ class FarmerAPI:
     async def plot_sync_start(self, message: PlotSyncStart, peer: WSBpxConnection):
         await self.farmer.plot_sync_receivers[peer.peer_node_id].sync_started(message)
 
+    @api_request(peer_required=True)
+    async def plot_sync_resume(self, message: PlotSyncResume, peer: WSBpxConnection):
+        await self.farmer.plot_sync_receivers[peer.peer_node_id].sync_resumed(message)
+
+    @api_request(peer_required=True)
+    async def plot_sync_compressed(self, message: PlotSyncCompressed, peer: WSBpxConnection):
+        await self.farmer.plot_sync_receivers[peer.peer_node_id].process_compressed(message)
+
     @api_request(peer_required=True)
     async def plot_sync_loaded(self, message: PlotSyncPlotList, peer: WSBpxConnection):
         await self.farmer.plot_sync_receivers[peer.peer_node_id].process_loaded(message)
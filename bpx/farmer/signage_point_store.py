@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from bpx.consensus.constants import ConsensusConstants
+from bpx.protocols.farmer_protocol import NewSignagePoint
+from bpx.types.blockchain_format.proof_of_space import ProofOfSpace, verify_and_get_quality_string
+from bpx.types.blockchain_format.sized_bytes import bytes32
+
+
+@dataclass(frozen=True)
+class QualityIdentifiers:
+    plot_identifier: str
+    challenge_hash: bytes32
+    sp_hash: bytes32
+    peer_node_id: bytes32
+
+
+@dataclass
+class SignagePointState:
+    add_time: float
+    # All variants of the signage point with this challenge chain hash
+    signage_points: List[NewSignagePoint] = field(default_factory=list)
+    # Harvester plot identifier and PoSpace of the proofs we requested signatures for
+    proofs_of_space: List[Tuple[str, ProofOfSpace]] = field(default_factory=list)
+    number_of_responses: int = 0
+    # Proof hash to the verified quality string (None if the proof is invalid)
+    quality_strings: Dict[bytes32, Optional[bytes32]] = field(default_factory=dict)
+    # Quality strings of this signage point which are indexed in `SignagePointStore`
+    indexed_qualities: List[bytes32] = field(default_factory=list)
+
+
+class SignagePointStore:
+    """
+    Keeps the farmer's per signage point state, keyed on the challenge chain signage point hash. Entries are kept
+    in insertion order, so expiring them only looks at the oldest entries, and the store never holds more than
+    `max_signage_points` of them. Everything derived from a signage point (proofs, quality strings, verification
+    results) is dropped together with it.
+    """
+
+    _states: OrderedDict[bytes32, SignagePointState]
+    _quality_index: Dict[bytes32, QualityIdentifiers]
+
+    def __init__(self, constants: ConsensusConstants, expiry_seconds: float, max_signage_points: int) -> None:
+        self.constants = constants
+        self.expiry_seconds = expiry_seconds
+        self.max_signage_points = max_signage_points
+        self._states = OrderedDict()
+        self._quality_index = {}
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def __contains__(self, sp_hash: bytes32) -> bool:
+        return sp_hash in self._states
+
+    def items(self) -> Iterator[Tuple[bytes32, SignagePointState]]:
+        return iter(self._states.items())
+
+    def get(self, sp_hash: bytes32) -> Optional[SignagePointState]:
+        return self._states.get(sp_hash)
+
+    def get_or_create(self, sp_hash: bytes32) -> SignagePointState:
+        state = self._states.get(sp_hash)
+        if state is None:
+            state = SignagePointState(time.time())
+            self._states[sp_hash] = state
+            while len(self._states) > self.max_signage_points:
+                self._remove_oldest()
+        return state
+
+    def add_signage_point(self, signage_point: NewSignagePoint) -> bool:
+        """
+        Returns False if this exact signage point was already added.
+        """
+        state = self.get_or_create(signage_point.challenge_chain_sp)
+        if signage_point in state.signage_points:
+            return False
+        state.signage_points.append(signage_point)
+        return True
+
+    def get_quality_string(
+        self, state: SignagePointState, proof: ProofOfSpace, challenge_hash: bytes32, sp_hash: bytes32
+    ) -> Optional[bytes32]:
+        """
+        Verifies the proof once per signage point, the result is shared by all its variants and later lookups.
+        """
+        proof_hash = proof.get_hash()
+        if proof_hash not in state.quality_strings:
+            state.quality_strings[proof_hash] = verify_and_get_quality_string(
+                proof, self.constants, challenge_hash, sp_hash
+            )
+        return state.quality_strings[proof_hash]
+
+    def add_proof(
+        self,
+        state: SignagePointState,
+        quality_string: bytes32,
+        proof: ProofOfSpace,
+        identifiers: QualityIdentifiers,
+    ) -> None:
+        state.proofs_of_space.append((identifiers.plot_identifier, proof))
+        state.indexed_qualities.append(quality_string)
+        self._quality_index[quality_string] = identifiers
+
+    def get_quality_identifiers(self, quality_string: bytes32) -> Optional[QualityIdentifiers]:
+        return self._quality_index.get(quality_string)
+
+    def clear_expired(self, now: Optional[float] = None) -> int:
+        if now is None:
+            now = time.time()
+        removed = 0
+        for state in self._states.values():
+            if now - state.add_time <= self.expiry_seconds:
+                break
+            removed += 1
+        for _ in range(removed):
+            self._remove_oldest()
+        return removed
+
+    def _remove_oldest(self) -> None:
+        _, state = self._states.popitem(last=False)
+        for quality_string in state.indexed_qualities:
+            self._quality_index.pop(quality_string, None)
@@ -8,6 +8,7 @@ from concurrent.futures.thread import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+from blspy import G1Element, PrivateKey
 from typing_extensions import Literal
 
 from bpx.consensus.constants import ConsensusConstants
@@ -26,6 +27,8 @@ from bpx.rpc.rpc_server import StateChangedProtocol, default_get_connections
 from bpx.server.outbound_message import NodeType
 from bpx.server.server import BpxServer
 from bpx.server.ws_connection import WSBpxConnection
+from bpx.types.blockchain_format.sized_bytes import bytes32
+from bpx.util.lru_cache import LRUCache
 
 log = logging.getLogger(__name__)
 
@@ -71,6 +74,10 @@ class Harvester:
         self.constants = constants
         self.state_changed_callback: Optional[StateChangedProtocol] = None
         self.parallel_read: bool = config.get("parallel_read", True)
+        # Keys derived from the plot memo, keyed on plot id: (local_sk, farmer_public_key, plot_public_key)
+        self.plot_keys_cache: LRUCache[bytes32, Tuple[PrivateKey, G1Element, G1Element]] = LRUCache(
+            config.get("plot_keys_cache_size", 1000)
+        )
 
     async def _start(self) -> None:
         self._refresh_lock = asyncio.Lock()
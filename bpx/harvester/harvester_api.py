@@ -23,9 +23,19 @@ from bpx.types.blockchain_format.proof_of_space import (
     passes_plot_filter,
 )
 from bpx.types.blockchain_format.sized_bytes import bytes32
-from bpx.util.api_decorators import api_request
+from bpx.util.api_decorators import ApiPriority, api_request
 from bpx.util.ints import uint8, uint32, uint64
 from bpx.util.derive_keys import master_sk_to_local_sk
+from bpx.util.metrics import registry as metrics_registry
+
+plot_lookup_seconds = metrics_registry.histogram(
+    "bpx_harvester_plot_lookup_seconds", "Time to look up the qualities and proofs of an eligible plot"
+)
+signage_point_lookup_seconds = metrics_registry.histogram(
+    "bpx_harvester_signage_point_lookup_seconds", "Time to look up all eligible plots for a signage point"
+)
+eligible_plots = metrics_registry.counter("bpx_harvester_eligible_plots_total", "Plots which passed the plot filter")
+proofs_found = metrics_registry.counter("bpx_harvester_proofs_found_total", "Proofs of space found")
 
 
 class HarvesterAPI:
@@ -50,7 +60,7 @@ class HarvesterAPI:
         await self.harvester.plot_sync_sender.start()
         self.harvester.plot_manager.start_refreshing()
 
-    @api_request(peer_required=True)
+    @api_request(peer_required=True, priority=ApiPriority.CRITICAL)
     async def new_signage_point_harvester(
         self, new_challenge: harvester_protocol.NewSignagePointHarvester, peer: WSBpxConnection
     ) -> None:
@@ -156,9 +166,10 @@ class HarvesterAPI:
             all_responses: List[harvester_protocol.NewProofOfSpace] = []
             if self.harvester._shut_down:
                 return filename, []
-            proofs_of_space_and_q: List[Tuple[bytes32, ProofOfSpace]] = await loop.run_in_executor(
-                self.harvester.executor, blocking_lookup, filename, plot_info
-            )
+            with plot_lookup_seconds.time():
+                proofs_of_space_and_q: List[Tuple[bytes32, ProofOfSpace]] = await loop.run_in_executor(
+                    self.harvester.executor, blocking_lookup, filename, plot_info
+                )
             for quality_str, proof_of_space in proofs_of_space_and_q:
                 all_responses.append(
                     harvester_protocol.NewProofOfSpace(
@@ -221,6 +232,9 @@ class HarvesterAPI:
         pass_msg = make_msg(ProtocolMessageTypes.farming_info, farming_info)
         await peer.send_message(pass_msg)
         found_time = time.time() - start
+        signage_point_lookup_seconds.observe(found_time)
+        eligible_plots.inc(len(awaitables))
+        proofs_found.inc(total_proofs_found)
         self.harvester.log.info(
             f"{len(awaitables)} plots were eligible for farming {new_challenge.challenge_hash.hex()[:10]}..."
             f" Found {total_proofs_found} proofs. Time: {found_time:.5f} s. "
@@ -237,12 +251,12 @@ class HarvesterAPI:
             },
         )
 
-    @api_request()
-    async def request_signatures(self, request: harvester_protocol.RequestSignatures) -> Optional[Message]:
+    def _sign_request(
+        self, request: harvester_protocol.RequestSignatures
+    ) -> Optional[harvester_protocol.RespondSignatures]:
         """
-        The farmer requests a signature on the header hash, for one of the proofs that we found.
-        A signature is created on the header hash using the harvester private key. This can also
-        be used for pooling.
+        Creates the harvester's partial signatures for one RequestSignatures. The keys derived from the plot memo
+        are cached per plot id, so repeated requests for the same plot skip the memo parsing and key derivation.
         """
         plot_filename = Path(request.plot_identifier[64:]).resolve()
         with self.harvester.plot_manager:
@@ -252,21 +266,29 @@ class HarvesterAPI:
                 self.harvester.log.warning(f"KeyError plot {plot_filename} does not exist.")
                 return None
 
-            # Look up local_sk from plot to save locked memory
-            (
-                pool_public_key_or_puzzle_hash,
-                farmer_public_key,
-                local_master_sk,
-            ) = parse_plot_info(plot_info.prover.get_memo())
+            plot_id = plot_info.prover.get_id()
+            plot_keys = self.harvester.plot_keys_cache.get(plot_id)
+            if plot_keys is None:
+                # Look up local_sk from plot to save locked memory
+                (
+                    pool_public_key_or_puzzle_hash,
+                    farmer_public_key,
+                    local_master_sk,
+                ) = parse_plot_info(plot_info.prover.get_memo())
+
+        if plot_keys is None:
             local_sk = master_sk_to_local_sk(local_master_sk)
+            if isinstance(pool_public_key_or_puzzle_hash, G1Element):
+                include_taproot = False
+            else:
+                assert isinstance(pool_public_key_or_puzzle_hash, bytes32)
+                include_taproot = True
 
-        if isinstance(pool_public_key_or_puzzle_hash, G1Element):
-            include_taproot = False
-        else:
-            assert isinstance(pool_public_key_or_puzzle_hash, bytes32)
-            include_taproot = True
+            agg_pk = generate_plot_public_key(local_sk.get_g1(), farmer_public_key, include_taproot)
+            plot_keys = (local_sk, farmer_public_key, agg_pk)
+            self.harvester.plot_keys_cache.put(plot_id, plot_keys)
 
-        agg_pk = generate_plot_public_key(local_sk.get_g1(), farmer_public_key, include_taproot)
+        local_sk, farmer_public_key, agg_pk = plot_keys
 
         # This is only a partial signature. When combined with the farmer's half, it will
         # form a complete PrependSignature.
@@ -275,7 +297,7 @@ class HarvesterAPI:
             signature: G2Element = AugSchemeMPL.sign(local_sk, message, agg_pk)
             message_signatures.append((message, signature))
 
-        response: harvester_protocol.RespondSignatures = harvester_protocol.RespondSignatures(
+        return harvester_protocol.RespondSignatures(
             request.plot_identifier,
             request.challenge_hash,
             request.sp_hash,
@@ -284,8 +306,39 @@ class HarvesterAPI:
             message_signatures,
         )
 
+    @api_request(priority=ApiPriority.CRITICAL)
+    async def request_signatures(self, request: harvester_protocol.RequestSignatures) -> Optional[Message]:
+        """
+        The farmer requests a signature on the header hash, for one of the proofs that we found.
+        A signature is created on the header hash using the harvester private key. This can also
+        be used for pooling.
+        """
+        response = self._sign_request(request)
+        if response is None:
+            return None
+
         return make_msg(ProtocolMessageTypes.respond_signatures, response)
 
+    @api_request(priority=ApiPriority.CRITICAL)
+    async def request_signatures_batch(self, request: harvester_protocol.RequestSignaturesBatch) -> Message:
+        """
+        Same as `request_signatures`, but for all the proofs the farmer collected while its previous batch was in
+        flight. Always responds, leaving out the requests which failed, so the farmer can send its next batch.
+        """
+        responses: List[harvester_protocol.RespondSignatures] = []
+        for single_request in request.requests:
+            try:
+                response = self._sign_request(single_request)
+            except Exception as e:
+                self.harvester.log.error(f"Error signing the request for {single_request.plot_identifier}: {e}")
+                continue
+            if response is not None:
+                responses.append(response)
+
+        return make_msg(
+            ProtocolMessageTypes.respond_signatures_batch, harvester_protocol.RespondSignaturesBatch(responses)
+        )
+
     @api_request()
     async def request_plots(self, _: harvester_protocol.RequestPlots) -> Message:
         plots_response = []
@@ -54,3 +54,8 @@ class PlotNotAvailableError(PlotSyncException):
 class SyncIdsMatchError(PlotSyncException):
     def __init__(self, state: State, sync_id: uint64) -> None:
         super().__init__(f"{state.name}: Sync ids are equal - {sync_id}", ErrorCodes.sync_ids_match)
+
+
+class ResumeNotPossibleError(PlotSyncException):
+    def __init__(self, last_sync_id: uint64) -> None:
+        super().__init__(f"Can't resume from last-sync-id {last_sync_id}", ErrorCodes.resume_not_possible)
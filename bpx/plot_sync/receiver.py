@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import operator
 import time
+from bisect import bisect_left
 from dataclasses import dataclass, field
-from typing import Any, Awaitable, Callable, Collection, Dict, List, Optional
+from typing import Any, Awaitable, Callable, Collection, Dict, List, Optional, Sequence, Tuple, Union, overload
 
+import zstd
 from typing_extensions import Protocol
 
 from bpx.plot_sync.delta import Delta, PathListDelta, PlotListDelta
@@ -14,17 +18,20 @@ from bpx.plot_sync.exceptions import (
     PlotAlreadyAvailableError,
     PlotNotAvailableError,
     PlotSyncException,
+    ResumeNotPossibleError,
     SyncIdsMatchError,
 )
-from bpx.plot_sync.util import ErrorCodes, State, T_PlotSyncMessage
+from bpx.plot_sync.util import ErrorCodes, State, T_PlotSyncMessage, plot_sync_digest
 from bpx.protocols.harvester_protocol import (
     Plot,
+    PlotSyncCompressed,
     PlotSyncDone,
     PlotSyncError,
     PlotSyncIdentifier,
     PlotSyncPathList,
     PlotSyncPlotList,
     PlotSyncResponse,
+    PlotSyncResume,
     PlotSyncStart,
 )
 from bpx.protocols.protocol_message_types import ProtocolMessageTypes
@@ -32,10 +39,20 @@ from bpx.server.outbound_message import make_msg
 from bpx.server.ws_connection import WSBpxConnection
 from bpx.types.blockchain_format.sized_bytes import bytes32
 from bpx.util.ints import int16, uint32, uint64
+from bpx.util.lru_cache import LRUCache
 from bpx.util.misc import get_list_or_len
 
 log = logging.getLogger(__name__)
 
+# Plot attributes the sorted views can be built for, the others are optional or not ordered
+PLOT_SORT_KEYS = ["filename", "size", "plot_id", "file_size", "time_modified"]
+# If a sync changes more than this share of the plots, the sorted views are rebuilt instead of updated in place
+PLOT_VIEW_REBUILD_RATIO = 0.1
+# Number of filtered views kept per receiver, they are all dropped on the next change
+FILTERED_VIEW_CACHE_SIZE = 16
+
+PlotFilter = Tuple[Tuple[str, Optional[str]], ...]
+
 
 @dataclass
 class Sync:
@@ -68,6 +85,86 @@ class Sync:
         )
 
 
+def plot_matches_filter(plot: Plot, plot_filter: PlotFilter) -> bool:
+    for key, value in plot_filter:
+        plot_attribute = getattr(plot, key)
+        if value is None:
+            if plot_attribute is not None:
+                return False
+        elif value not in str(plot_attribute):
+            return False
+    return True
+
+
+class ReversedView(Sequence[Any]):
+    """
+    A reversed view on a list, which only copies the items of the slices taken from it.
+    """
+
+    def __init__(self, source: Sequence[Any]) -> None:
+        self._source = source
+
+    def __len__(self) -> int:
+        return len(self._source)
+
+    @overload
+    def __getitem__(self, index: int) -> Any:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Any]:
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        length = len(self._source)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(length)
+            if step != 1:
+                return list(self)[index]
+            if start >= stop:
+                return []
+            return list(reversed(self._source[length - stop : length - start]))
+        if index < 0:
+            index += length
+        if index < 0 or index >= length:
+            raise IndexError("ReversedView index out of range")
+        return self._source[length - 1 - index]
+
+
+class SortedPlotView:
+    """
+    The plots of a receiver sorted by one attribute, with the plot id and filename as tie breakers. Kept up to date
+    with the deltas of each sync, so a page can be served without sorting all the plots again.
+    """
+
+    sort_key: str
+    keys: List[Tuple[Any, bytes32, str]]
+    plots: List[Plot]
+
+    def __init__(self, sort_key: str, plots: Collection[Plot]) -> None:
+        self.sort_key = sort_key
+        self._get_attribute = operator.attrgetter(sort_key)
+        sorted_plots = sorted(plots, key=self.key)
+        self.keys = [self.key(plot) for plot in sorted_plots]
+        self.plots = sorted_plots
+
+    def key(self, plot: Plot) -> Tuple[Any, bytes32, str]:
+        return self._get_attribute(plot), plot.plot_id, plot.filename
+
+    def add(self, plot: Plot) -> None:
+        key = self.key(plot)
+        index = bisect_left(self.keys, key)
+        self.keys.insert(index, key)
+        self.plots.insert(index, plot)
+
+    def remove(self, plot: Plot) -> None:
+        key = self.key(plot)
+        index = bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            del self.keys[index]
+            del self.plots[index]
+
+
 class ReceiverUpdateCallback(Protocol):
     def __call__(self, peer_id: bytes32, delta: Optional[Delta]) -> Awaitable[None]:
         pass
@@ -82,13 +179,23 @@ class Receiver:
     _keys_missing: List[str]
     _duplicates: List[str]
     _total_plot_size: int
+    _plot_views: Dict[str, SortedPlotView]
+    _sorted_paths: Dict[str, List[str]]
+    _filtered_views: LRUCache[Tuple[str, str, Tuple[Any, ...]], List[Any]]
     _update_callback: ReceiverUpdateCallback
+    _previous: Optional[Receiver]
+    _lock: asyncio.Lock
 
     def __init__(
         self,
         connection: WSBpxConnection,
         update_callback: ReceiverUpdateCallback,
+        previous: Optional[Receiver] = None,
     ) -> None:
+        """
+        `previous` is the receiver of an earlier connection to the same harvester, its state is taken over if the
+        harvester resumes from its last sync.
+        """
         self._connection = connection
         self._current_sync = Sync()
         self._last_sync = Sync()
@@ -97,7 +204,12 @@ class Receiver:
         self._keys_missing = []
         self._duplicates = []
         self._total_plot_size = 0
+        self._plot_views = {}
+        self._sorted_paths = {}
+        self._filtered_views = LRUCache(FILTERED_VIEW_CACHE_SIZE)
         self._update_callback = update_callback
+        self._previous = previous
+        self._lock = asyncio.Lock()
 
     async def trigger_callback(self, update: Optional[Delta] = None) -> None:
         try:
@@ -114,6 +226,7 @@ class Receiver:
         self._keys_missing.clear()
         self._duplicates.clear()
         self._total_plot_size = 0
+        self._clear_views()
 
     def connection(self) -> WSBpxConnection:
         return self._connection
@@ -142,6 +255,76 @@ class Receiver:
     def total_plot_size(self) -> int:
         return self._total_plot_size
 
+    def _clear_views(self) -> None:
+        self._plot_views = {}
+        self._sorted_paths = {}
+        self._filtered_views = LRUCache(FILTERED_VIEW_CACHE_SIZE)
+
+    def sorted_plots(self, sort_key: str, reverse: bool = False) -> Sequence[Plot]:
+        """
+        Returns the valid plots sorted by `sort_key`, the view is created once and then kept up to date by each sync.
+        """
+        if sort_key not in PLOT_SORT_KEYS:
+            raise KeyError(f"Can't sort by {sort_key}, available sort keys: {PLOT_SORT_KEYS}")
+        view = self._plot_views.get(sort_key)
+        if view is None:
+            view = SortedPlotView(sort_key, self._plots.values())
+            self._plot_views[sort_key] = view
+        return ReversedView(view.plots) if reverse else view.plots
+
+    def filtered_plots(self, sort_key: str, plot_filter: PlotFilter, reverse: bool = False) -> Sequence[Plot]:
+        """
+        Returns the sorted plots which match all (attribute, value) pairs of `plot_filter`. A None value matches
+        plots where the attribute is None, otherwise the value has to be contained in the attribute's string. The
+        result is cached until the plots change.
+        """
+        if len(plot_filter) == 0:
+            return self.sorted_plots(sort_key, reverse)
+        cache_key = ("plots", sort_key, plot_filter)
+        filtered = self._filtered_views.get(cache_key)
+        if filtered is None:
+            filtered = [plot for plot in self.sorted_plots(sort_key) if plot_matches_filter(plot, plot_filter)]
+            self._filtered_views.put(cache_key, filtered)
+        return ReversedView(filtered) if reverse else filtered
+
+    def sorted_paths(
+        self, source: Callable[[Receiver], List[str]], path_filter: Tuple[str, ...] = (), reverse: bool = False
+    ) -> Sequence[str]:
+        """
+        Returns the paths of `source` (one of `invalid`, `keys_missing` or `duplicates`) sorted, and only the ones
+        containing all `path_filter` items if given. Cached until the next sync is done.
+        """
+        name = source.__name__
+        paths = self._sorted_paths.get(name)
+        if paths is None:
+            paths = sorted(source(self))
+            self._sorted_paths[name] = paths
+        if len(path_filter) > 0:
+            cache_key = (name, "", path_filter)
+            filtered = self._filtered_views.get(cache_key)
+            if filtered is None:
+                filtered = [path for path in paths if all(item in path for item in path_filter)]
+                self._filtered_views.put(cache_key, filtered)
+            paths = filtered
+        return ReversedView(paths) if reverse else paths
+
+    def _update_views(self, additions: Dict[str, Plot], removals: List[str]) -> None:
+        # Must be called before the removals are applied to `_plots`
+        self._sorted_paths = {}
+        self._filtered_views = LRUCache(FILTERED_VIEW_CACHE_SIZE)
+        if len(additions) + len(removals) > max(len(self._plots), 1) * PLOT_VIEW_REBUILD_RATIO:
+            # Rebuilt lazily on the next request
+            self._plot_views = {}
+            return
+        for view in self._plot_views.values():
+            for removal in removals:
+                view.remove(self._plots[removal])
+            for plot in additions.values():
+                view.add(plot)
+
+    def plots_digest(self) -> bytes32:
+        return plot_sync_digest({filename: plot.get_hash() for filename, plot in self._plots.items()})
+
     async def _process(
         self, method: Callable[[T_PlotSyncMessage], Any], message_type: ProtocolMessageTypes, message: T_PlotSyncMessage
     ) -> None:
@@ -158,18 +341,21 @@ class Receiver:
                     )
                 )
 
-        try:
-            await method(message)
-            await send_response()
-        except InvalidIdentifierError as e:
-            log.warning(f"_process: node_id {self.connection().peer_node_id}, InvalidIdentifierError {e}")
-            await send_response(PlotSyncError(int16(e.error_code), f"{e}", e.expected_identifier))
-        except PlotSyncException as e:
-            log.warning(f"_process: node_id {self.connection().peer_node_id}, Error {e}")
-            await send_response(PlotSyncError(int16(e.error_code), f"{e}", None))
-        except Exception as e:
-            log.warning(f"_process: node_id {self.connection().peer_node_id}, Exception {e}")
-            await send_response(PlotSyncError(int16(ErrorCodes.unknown), f"{e}", None))
+        # Messages can be sent without waiting for the previous response, make sure they are processed and answered
+        # in order, the sender matches the responses against the oldest unanswered message
+        async with self._lock:
+            try:
+                await method(message)
+                await send_response()
+            except InvalidIdentifierError as e:
+                log.warning(f"_process: node_id {self.connection().peer_node_id}, InvalidIdentifierError {e}")
+                await send_response(PlotSyncError(int16(e.error_code), f"{e}", e.expected_identifier))
+            except PlotSyncException as e:
+                log.warning(f"_process: node_id {self.connection().peer_node_id}, Error {e}")
+                await send_response(PlotSyncError(int16(e.error_code), f"{e}", None))
+            except Exception as e:
+                log.warning(f"_process: node_id {self.connection().peer_node_id}, Exception {e}")
+                await send_response(PlotSyncError(int16(ErrorCodes.unknown), f"{e}", None))
 
     def _validate_identifier(self, identifier: PlotSyncIdentifier, start: bool = False) -> None:
         sync_id_match = identifier.sync_id == self._current_sync.sync_id
@@ -184,23 +370,51 @@ class Receiver:
                 expected,
             )
 
+    def _start_sync(self, identifier: PlotSyncIdentifier, last_sync_id: uint64, plot_file_count: uint32) -> None:
+        if last_sync_id != self._last_sync.sync_id:
+            raise InvalidLastSyncIdError(last_sync_id, self._last_sync.sync_id)
+        if last_sync_id == identifier.sync_id:
+            raise SyncIdsMatchError(State.idle, last_sync_id)
+        self._current_sync.sync_id = identifier.sync_id
+        self._current_sync.delta.clear()
+        self._current_sync.state = State.loaded
+        self._current_sync.plots_total = plot_file_count
+        self._current_sync.bump_next_message_id()
+
     async def _sync_started(self, data: PlotSyncStart) -> None:
+        # Not resuming, the state of the previous connection is of no use anymore
+        self._previous = None
         if data.initial:
             self.reset()
         self._validate_identifier(data.identifier, True)
-        if data.last_sync_id != self._last_sync.sync_id:
-            raise InvalidLastSyncIdError(data.last_sync_id, self._last_sync.sync_id)
-        if data.last_sync_id == data.identifier.sync_id:
-            raise SyncIdsMatchError(State.idle, data.last_sync_id)
-        self._current_sync.sync_id = data.identifier.sync_id
-        self._current_sync.delta.clear()
-        self._current_sync.state = State.loaded
-        self._current_sync.plots_total = data.plot_file_count
-        self._current_sync.bump_next_message_id()
+        self._start_sync(data.identifier, data.last_sync_id, data.plot_file_count)
 
     async def sync_started(self, data: PlotSyncStart) -> None:
         await self._process(self._sync_started, ProtocolMessageTypes.plot_sync_start, data)
 
+    async def _sync_resumed(self, data: PlotSyncResume) -> None:
+        self._validate_identifier(data.identifier, True)
+        # Only the state of the previous connection or our own state can be resumed
+        candidate = self._previous if self._previous is not None else self
+        self._previous = None
+        if candidate.last_sync().sync_id != data.last_sync_id or candidate.plots_digest() != data.digest:
+            self.reset()
+            raise ResumeNotPossibleError(data.last_sync_id)
+        if candidate is not self:
+            self._plots = candidate._plots
+            self._invalid = candidate._invalid
+            self._keys_missing = candidate._keys_missing
+            self._duplicates = candidate._duplicates
+            self._total_plot_size = candidate._total_plot_size
+            self._plot_views = candidate._plot_views
+            self._sorted_paths = candidate._sorted_paths
+            self._filtered_views = candidate._filtered_views
+            self._last_sync = candidate._last_sync
+        self._start_sync(data.identifier, data.last_sync_id, data.plot_file_count)
+
+    async def sync_resumed(self, data: PlotSyncResume) -> None:
+        await self._process(self._sync_resumed, ProtocolMessageTypes.plot_sync_resume, data)
+
     async def _process_loaded(self, plot_infos: PlotSyncPlotList) -> None:
         self._validate_identifier(plot_infos.identifier)
 
@@ -299,6 +513,36 @@ class Receiver:
     async def process_duplicates(self, paths: PlotSyncPathList) -> None:
         await self._process(self._process_duplicates, ProtocolMessageTypes.plot_sync_duplicates, paths)
 
+    async def _process_compressed(self, message: PlotSyncCompressed) -> None:
+        message_type = ProtocolMessageTypes(message.message_type)
+        data = zstd.decompress(message.data)
+        if message_type == ProtocolMessageTypes.plot_sync_loaded:
+            plot_list = PlotSyncPlotList.from_bytes(data)
+            if plot_list.identifier != message.identifier:
+                raise InvalidIdentifierError(plot_list.identifier, message.identifier)
+            await self._process_loaded(plot_list)
+            return
+        path_list_handlers = {
+            ProtocolMessageTypes.plot_sync_removed: self._process_removed,
+            ProtocolMessageTypes.plot_sync_invalid: self._process_invalid,
+            ProtocolMessageTypes.plot_sync_keys_missing: self._process_keys_missing,
+            ProtocolMessageTypes.plot_sync_duplicates: self._process_duplicates,
+        }
+        if message_type not in path_list_handlers:
+            raise ValueError(f"Unexpected compressed message type {message_type.name}")
+        path_list = PlotSyncPathList.from_bytes(data)
+        if path_list.identifier != message.identifier:
+            raise InvalidIdentifierError(path_list.identifier, message.identifier)
+        await path_list_handlers[message_type](path_list)
+
+    async def process_compressed(self, message: PlotSyncCompressed) -> None:
+        # The sender waits for a response to the type of the compressed message
+        try:
+            message_type = ProtocolMessageTypes(message.message_type)
+        except ValueError:
+            message_type = ProtocolMessageTypes.plot_sync_compressed
+        await self._process(self._process_compressed, message_type, message)
+
     async def _sync_done(self, data: PlotSyncDone) -> None:
         self._validate_identifier(data.identifier)
         self._current_sync.time_done = time.time()
@@ -322,13 +566,15 @@ class Receiver:
             delta_duplicates,
         )
         # Apply delta
-        self._plots.update(self._current_sync.delta.valid.additions)
+        self._update_views(self._current_sync.delta.valid.additions, self._current_sync.delta.valid.removals)
         for removal in self._current_sync.delta.valid.removals:
+            self._total_plot_size -= self._plots[removal].file_size
             del self._plots[removal]
+        self._plots.update(self._current_sync.delta.valid.additions)
+        self._total_plot_size += sum(plot.file_size for plot in self._current_sync.delta.valid.additions.values())
         self._invalid = self._current_sync.delta.invalid.additions.copy()
         self._keys_missing = self._current_sync.delta.keys_missing.additions.copy()
         self._duplicates = self._current_sync.delta.duplicates.additions.copy()
-        self._total_plot_size = sum(plot.file_size for plot in self._plots.values())
         # Save current sync as last sync and create a new current sync
         self._last_sync = self._current_sync
         self._current_sync = Sync()
@@ -4,33 +4,47 @@ import asyncio
 import logging
 import time
 import traceback
-from dataclasses import dataclass
+from collections import deque
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Generic, Iterable, List, Optional, Tuple, Type, TypeVar
+from typing import Any, Deque, Dict, Generic, Iterable, List, Optional, Tuple, Type, TypeVar
 
+import zstd
 from typing_extensions import Protocol
 
 from bpx.plot_sync.exceptions import AlreadyStartedError, InvalidConnectionTypeError
-from bpx.plot_sync.util import Constants
+from bpx.plot_sync.util import Constants, plot_sync_digest
 from bpx.plotting.manager import PlotManager
 from bpx.plotting.util import PlotInfo
 from bpx.protocols.harvester_protocol import (
     Plot,
+    PlotSyncCompressed,
     PlotSyncDone,
     PlotSyncIdentifier,
     PlotSyncPathList,
     PlotSyncPlotList,
     PlotSyncResponse,
+    PlotSyncResume,
     PlotSyncStart,
 )
 from bpx.protocols.protocol_message_types import ProtocolMessageTypes
-from bpx.server.outbound_message import NodeType, make_msg
+from bpx.protocols.shared_protocol import Capability
+from bpx.server.outbound_message import Message, NodeType, make_msg
 from bpx.server.ws_connection import WSBpxConnection
+from bpx.types.blockchain_format.sized_bytes import bytes32
 from bpx.util.generator_tools import list_to_batches
-from bpx.util.ints import int16, uint32, uint64
+from bpx.util.ints import int16, uint8, uint32, uint64
 
 log = logging.getLogger(__name__)
 
+_compressed_message_types = {
+    ProtocolMessageTypes.plot_sync_loaded,
+    ProtocolMessageTypes.plot_sync_removed,
+    ProtocolMessageTypes.plot_sync_invalid,
+    ProtocolMessageTypes.plot_sync_keys_missing,
+    ProtocolMessageTypes.plot_sync_duplicates,
+}
+
 
 def _convert_plot_info_list(plot_infos: List[PlotInfo]) -> List[Plot]:
     converted: List[Plot] = []
@@ -80,6 +94,7 @@ class ExpectedResponse:
     message_type: ProtocolMessageTypes
     identifier: PlotSyncIdentifier
     message: Optional[PlotSyncResponse] = None
+    received: asyncio.Event = field(default_factory=asyncio.Event)
 
     def __str__(self) -> str:
         return (
@@ -97,7 +112,14 @@ class Sender:
     _last_sync_id: uint64
     _stop_requested = False
     _task: Optional[asyncio.Task[None]]
-    _response: Optional[ExpectedResponse]
+    _responses: Deque[ExpectedResponse]
+    # Plot filename to plot hash of the plots the farmer got with the last finished sync `_synced_id`
+    _synced_plots: Dict[str, bytes32]
+    _synced_id: uint64
+    # Changes to `_synced_plots` which get applied once the current sync is finished
+    _sync_initial: bool
+    _sync_loaded: Dict[str, bytes32]
+    _sync_removed: List[str]
 
     def __init__(self, plot_manager: PlotManager) -> None:
         self._plot_manager = plot_manager
@@ -108,7 +130,12 @@ class Sender:
         self._last_sync_id = uint64(0)
         self._stop_requested = False
         self._task = None
-        self._response = None
+        self._responses = deque()
+        self._synced_plots = {}
+        self._synced_id = uint64(0)
+        self._sync_initial = False
+        self._sync_loaded = {}
+        self._sync_removed = []
 
     def __str__(self) -> str:
         return f"sync_id {self._sync_id}, next_message_id {self._next_message_id}, messages {len(self._messages)}"
@@ -119,7 +146,7 @@ class Sender:
         if self._task is None:
             self._task = asyncio.create_task(self._run())
             if not self._plot_manager.initial_refresh() or self._sync_id != 0:
-                self._reset()
+                self._reset(resume=True)
         else:
             raise AlreadyStartedError()
 
@@ -142,13 +169,43 @@ class Sender:
     def bump_next_message_id(self) -> None:
         self._next_message_id = uint64(self._next_message_id + 1)
 
-    def _reset(self) -> None:
-        log.debug(f"_reset {self}")
+    def _delta_sync_supported(self) -> bool:
+        return self._connection is not None and self._connection.has_capability(Capability.PLOT_SYNC_DELTA)
+
+    def _reset(self, resume: bool = False) -> None:
+        """
+        Drops all pending messages and, if running, queues a sync of all plots. With `resume` set and a finished
+        sync to resume from, only the difference to the plots the farmer got with that sync gets queued.
+        """
+        log.debug(f"_reset {self}, resume {resume}")
         self._last_sync_id = uint64(0)
         self._sync_id = uint64(0)
         self._next_message_id = uint64(0)
         self._messages.clear()
-        if self._task is not None:
+        self._responses.clear()
+        if self._task is None:
+            return
+        resume = resume and self._synced_id != 0 and self._delta_sync_supported()
+        current: Dict[str, PlotInfo] = {}
+        if resume:
+            current = {plot_info.prover.get_filename(): plot_info for plot_info in self._plot_manager.plots.values()}
+            # The farmer rejects an addition of a filename it already has, so a plot which was replaced under the same
+            # filename can only be sent with a full sync
+            for plot in _convert_plot_info_list(list(current.values())):
+                synced_hash = self._synced_plots.get(plot.filename)
+                if synced_hash is not None and synced_hash != plot.get_hash():
+                    log.debug(f"_reset {self}: {plot.filename} changed since the last sync, not resuming")
+                    resume = False
+                    break
+        if resume:
+            self._last_sync_id = self._synced_id
+            loaded = [plot_info for filename, plot_info in current.items() if filename not in self._synced_plots]
+            removed = [Path(filename) for filename in self._synced_plots if filename not in current]
+            self.sync_start(len(loaded), False, resume=True)
+            for remaining, batch in list_to_batches(loaded, self._plot_manager.refresh_parameter.batch_size):
+                self.process_batch(batch, remaining)
+            self.sync_done(removed, 0)
+        else:
             self.sync_start(self._plot_manager.plot_count(), True)
             for remaining, batch in list_to_batches(
                 list(self._plot_manager.plots.values()), self._plot_manager.refresh_parameter.batch_size
@@ -156,38 +213,37 @@ class Sender:
                 self.process_batch(batch, remaining)
             self.sync_done([], 0)
 
-    async def _wait_for_response(self) -> bool:
-        start = time.time()
-        assert self._response is not None
-        while time.time() - start < Constants.message_timeout and self._response.message is None:
-            await asyncio.sleep(0.1)
-        return self._response.message is not None
+    async def _wait_for_response(self, expected: ExpectedResponse) -> bool:
+        try:
+            await asyncio.wait_for(expected.received.wait(), timeout=Constants.message_timeout)
+        except asyncio.TimeoutError:
+            pass
+        return expected.message is not None
 
     def set_response(self, response: PlotSyncResponse) -> bool:
-        if self._response is None or self._response.message is not None:
+        # Responses come in the order the messages were sent, so only the oldest unanswered message can match
+        expected = next((expected for expected in self._responses if expected.message is None), None)
+        if expected is None:
             log.warning(f"set_response skip unexpected response: {response}")
             return False
         if time.time() - float(response.identifier.timestamp) > Constants.message_timeout:
             log.warning(f"set_response skip expired response: {response}")
             return False
-        if response.identifier.sync_id != self._response.identifier.sync_id:
-            log.warning(
-                "set_response unexpected sync-id: {response.identifier.sync_id}/{self._response.identifier.sync_id}"
-            )
+        if response.identifier.sync_id != expected.identifier.sync_id:
+            log.warning(f"set_response unexpected sync-id: {response.identifier.sync_id}/{expected.identifier.sync_id}")
             return False
-        if response.identifier.message_id != self._response.identifier.message_id:
+        if response.identifier.message_id != expected.identifier.message_id:
             log.warning(
                 "set_response unexpected message-id: "
-                f"{response.identifier.message_id}/{self._response.identifier.message_id}"
+                f"{response.identifier.message_id}/{expected.identifier.message_id}"
             )
             return False
-        if response.message_type != int16(self._response.message_type.value):
-            log.warning(
-                "set_response unexpected message-type: {response.message_type}/{self._response.message_type.value}"
-            )
+        if response.message_type != int16(expected.message_type.value):
+            log.warning(f"set_response unexpected message-type: {response.message_type}/{expected.message_type.value}")
             return False
         log.debug(f"set_response valid {response}")
-        self._response.message = response
+        expected.message = response
+        expected.received.set()
         return True
 
     def _add_message(self, message_type: ProtocolMessageTypes, payload_type: Any, *args: Any) -> None:
@@ -195,6 +251,19 @@ class Sender:
         message_id = uint64(len(self._messages))
         self._messages.append(MessageGenerator(self._sync_id, message_type, message_id, payload_type, args))
 
+    def _make_message(self, message_type: ProtocolMessageTypes, identifier: PlotSyncIdentifier, payload: T) -> Message:
+        if message_type in _compressed_message_types and self._delta_sync_supported():
+            compressed = PlotSyncCompressed(identifier, uint8(message_type.value), zstd.compress(bytes(payload)))
+            return make_msg(ProtocolMessageTypes.plot_sync_compressed, compressed)
+        return make_msg(message_type, payload)
+
+    async def _drain_responses(self) -> None:
+        # Wait for the responses of all messages in flight, so that they can't be mixed up with the responses
+        # of the messages we send next
+        for expected in self._responses:
+            await self._wait_for_response(expected)
+        self._responses.clear()
+
     async def _send_next_message(self) -> bool:
         def failed(message: str) -> bool:
             # By forcing a reset we try to get back into a normal state if some not recoverable failure came up.
@@ -202,48 +271,59 @@ class Sender:
             self._reset()
             return False
 
-        assert len(self._messages) >= self._next_message_id
-        message_generator = self._messages[self._next_message_id]
-        identifier, payload = message_generator.generate()
-        if self._sync_id == 0 or identifier.sync_id != self._sync_id or identifier.message_id != self._next_message_id:
-            return failed(f"Invalid message generator {message_generator} for {self}")
-
-        self._response = ExpectedResponse(message_generator.message_type, identifier)
-        log.debug(f"_send_next_message send {message_generator.message_type.name}: {payload}")
-        if self._connection is None or not await self._connection.send_message(
-            make_msg(message_generator.message_type, payload)
-        ):
-            return failed(f"Send failed {self._connection}")
-        if not await self._wait_for_response():
-            log.info(f"_send_next_message didn't receive response {self._response}")
+        window = Constants.message_window if self._delta_sync_supported() else 1
+        while len(self._responses) < window and self._next_message_id < len(self._messages):
+            message_generator = self._messages[self._next_message_id]
+            identifier, payload = message_generator.generate()
+            if (
+                self._sync_id == 0
+                or identifier.sync_id != self._sync_id
+                or identifier.message_id != self._next_message_id
+            ):
+                return failed(f"Invalid message generator {message_generator} for {self}")
+
+            self._responses.append(ExpectedResponse(message_generator.message_type, identifier))
+            log.debug(f"_send_next_message send {message_generator.message_type.name}: {payload}")
+            if self._connection is None or not await self._connection.send_message(
+                self._make_message(message_generator.message_type, identifier, payload)
+            ):
+                return failed(f"Send failed {self._connection}")
+            self.bump_next_message_id()
+
+        response = self._responses[0]
+        if not await self._wait_for_response(response):
+            log.info(f"_send_next_message didn't receive response {response}")
+            # Start over with the first message which didn't get a response
+            self._responses.clear()
+            self._next_message_id = response.identifier.message_id
             return False
 
-        assert self._response.message is not None
-        if self._response.message.error is not None:
+        self._responses.popleft()
+        assert response.message is not None
+        if response.message.error is not None:
             recovered = False
-            expected = self._response.message.error.expected_identifier
+            expected = response.message.error.expected_identifier
             # If we have a recoverable error there is a `expected_identifier` included
             if expected is not None:
                 # If the receiver has a zero sync/message id and we already sent all messages from the current event
                 # we most likely missed the response to the done message. We can finalize the sync and move on here.
                 all_sent = (
                     self._messages[-1].message_type == ProtocolMessageTypes.plot_sync_done
-                    and self._next_message_id == len(self._messages) - 1
+                    and response.identifier.message_id == len(self._messages) - 1
                 )
                 if expected.sync_id == expected.message_id == 0 and all_sent:
                     self._finalize_sync()
                     recovered = True
                 elif self._sync_id == expected.sync_id and expected.message_id < len(self._messages):
+                    await self._drain_responses()
                     self._next_message_id = expected.message_id
                     recovered = True
             if not recovered:
-                return failed(f"Not recoverable error {self._response.message}")
+                return failed(f"Not recoverable error {response.message}")
             return True
 
-        if self._response.message_type == ProtocolMessageTypes.plot_sync_done:
+        if response.message_type == ProtocolMessageTypes.plot_sync_done:
             self._finalize_sync()
-        else:
-            self.bump_next_message_id()
 
         return True
 
@@ -254,8 +334,8 @@ class Sender:
         for remaining, batch in list_to_batches(data, self._plot_manager.refresh_parameter.batch_size):
             self._add_message(message_type, payload_type, batch, remaining == 0)
 
-    def sync_start(self, count: float, initial: bool) -> None:
-        log.debug(f"sync_start {self}: count {count}, initial {initial}")
+    def sync_start(self, count: float, initial: bool, resume: bool = False) -> None:
+        log.debug(f"sync_start {self}: count {count}, initial {initial}, resume {resume}")
         while self.sync_active():
             if self._stop_requested:
                 log.debug("sync_start aborted")
@@ -267,19 +347,34 @@ class Sender:
             sync_id = sync_id + 1
         log.debug(f"sync_start {sync_id}")
         self._sync_id = uint64(sync_id)
-        self._add_message(
-            ProtocolMessageTypes.plot_sync_start, PlotSyncStart, initial, self._last_sync_id, uint32(int(count))
-        )
+        self._sync_initial = initial
+        self._sync_loaded = {}
+        self._sync_removed = []
+        if resume:
+            self._add_message(
+                ProtocolMessageTypes.plot_sync_resume,
+                PlotSyncResume,
+                self._last_sync_id,
+                uint32(int(count)),
+                plot_sync_digest(self._synced_plots),
+            )
+        else:
+            self._add_message(
+                ProtocolMessageTypes.plot_sync_start, PlotSyncStart, initial, self._last_sync_id, uint32(int(count))
+            )
 
     def process_batch(self, loaded: List[PlotInfo], remaining: int) -> None:
         log.debug(f"process_batch {self}: loaded {len(loaded)}, remaining {remaining}")
         if len(loaded) > 0 or remaining == 0:
             converted = _convert_plot_info_list(loaded)
+            for plot in converted:
+                self._sync_loaded[plot.filename] = plot.get_hash()
             self._add_message(ProtocolMessageTypes.plot_sync_loaded, PlotSyncPlotList, converted, remaining == 0)
 
     def sync_done(self, removed: List[Path], duration: float) -> None:
         log.debug(f"sync_done {self}: removed {len(removed)}, duration {duration}")
         removed_list = [str(x) for x in removed]
+        self._sync_removed = removed_list
         self._add_list_batched(
             ProtocolMessageTypes.plot_sync_removed,
             PlotSyncPathList,
@@ -296,9 +391,19 @@ class Sender:
     def _finalize_sync(self) -> None:
         log.debug(f"_finalize_sync {self}")
         assert self._sync_id != 0
+        if self._sync_initial:
+            self._synced_plots = self._sync_loaded
+        else:
+            self._synced_plots.update(self._sync_loaded)
+            for filename in self._sync_removed:
+                self._synced_plots.pop(filename, None)
+        self._sync_loaded = {}
+        self._sync_removed = []
+        self._synced_id = self._sync_id
         self._last_sync_id = self._sync_id
         self._next_message_id = uint64(0)
         self._messages.clear()
+        self._responses.clear()
         # Do this at the end since `_sync_id` is used as sync active indicator.
         self._sync_id = uint64(0)
 
@@ -320,7 +425,7 @@ class Sender:
                         return
                     await asyncio.sleep(0.1)
                 while not self._stop_requested and self.sync_active():
-                    if self._next_message_id >= len(self._messages):
+                    if self._next_message_id >= len(self._messages) and len(self._responses) == 0:
                         await asyncio.sleep(0.1)
                         continue
                     if not await self._send_next_message():
@@ -1,15 +1,19 @@
 from __future__ import annotations
 
 from enum import IntEnum
-from typing import TypeVar
+from typing import Dict, TypeVar
 
 from typing_extensions import Protocol
 
 from bpx.protocols.harvester_protocol import PlotSyncIdentifier
+from bpx.types.blockchain_format.sized_bytes import bytes32
+from bpx.util.hash import std_hash
 
 
 class Constants:
     message_timeout: int = 10
+    # Messages sent without waiting for their response, if the peer supports it
+    message_window: int = 8
 
 
 class State(IntEnum):
@@ -32,6 +36,7 @@ class ErrorCodes(IntEnum):
     plot_already_available = 5
     plot_not_available = 6
     sync_ids_match = 7
+    resume_not_possible = 8
 
 
 class PlotSyncMessage(Protocol):
@@ -41,3 +46,10 @@ class PlotSyncMessage(Protocol):
 
 
 T_PlotSyncMessage = TypeVar("T_PlotSyncMessage", bound=PlotSyncMessage)
+
+
+def plot_sync_digest(plot_hashes: Dict[str, bytes32]) -> bytes32:
+    """
+    Order independent digest of a plot set, `plot_hashes` maps the plot filename to the hash of its `Plot`.
+    """
+    return std_hash(b"".join(plot_hash for _, plot_hash in sorted(plot_hashes.items())))
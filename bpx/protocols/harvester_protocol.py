@@ -63,6 +63,18 @@ class RespondSignatures(Streamable):
     message_signatures: List[Tuple[bytes32, G2Element]]
 
 
+@streamable
+@dataclass(frozen=True)
+class RequestSignaturesBatch(Streamable):
+    requests: List[RequestSignatures]
+
+
+@streamable
+@dataclass(frozen=True)
+class RespondSignaturesBatch(Streamable):
+    responses: List[RespondSignatures]
+
+
 @streamable
 @dataclass(frozen=True)
 class Plot(Streamable):
@@ -113,6 +125,21 @@ class PlotSyncStart(Streamable):
         )
 
 
+@streamable
+@dataclass(frozen=True)
+class PlotSyncResume(Streamable):
+    identifier: PlotSyncIdentifier
+    last_sync_id: uint64
+    plot_file_count: uint32
+    digest: bytes32
+
+    def __str__(self) -> str:
+        return (
+            f"PlotSyncResume: identifier {self.identifier}, last_sync_id {self.last_sync_id}, "
+            f"plot_file_count {self.plot_file_count}, digest {self.digest}"
+        )
+
+
 @streamable
 @dataclass(frozen=True)
 class PlotSyncPathList(Streamable):
@@ -135,6 +162,20 @@ class PlotSyncPlotList(Streamable):
         return f"PlotSyncPlotList: identifier {self.identifier}, count {len(self.data)}, final {self.final}"
 
 
+@streamable
+@dataclass(frozen=True)
+class PlotSyncCompressed(Streamable):
+    identifier: PlotSyncIdentifier
+    message_type: uint8
+    data: bytes
+
+    def __str__(self) -> str:
+        return (
+            f"PlotSyncCompressed: identifier {self.identifier}, message_type {self.message_type}, "
+            f"size {len(self.data)}"
+        )
+
+
 @streamable
 @dataclass(frozen=True)
 class PlotSyncDone(Streamable):
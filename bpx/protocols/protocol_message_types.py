@@ -67,3 +67,11 @@ class ProtocolMessageTypes(Enum):
     # Introducer protocol (introducer <-> beacon)
     request_peers_introducer = 51
     respond_peers_introducer = 52
+
+    # Harvester protocol (harvester <-> farmer), batched signatures
+    request_signatures_batch = 53
+    respond_signatures_batch = 54
+
+    # Harvester protocol (harvester <-> farmer), resumable and compressed plot sync
+    plot_sync_resume = 55
+    plot_sync_compressed = 56
@@ -19,6 +19,10 @@ Note: When changing this file, also change protocol_message_types.py
 # These are passed in as uint16 into the Handshake
 class Capability(IntEnum):
     BASE = 1  # Base capability just means it supports the bpx protocol at mainnet
+    # Farmer and harvester exchange several signature requests in one RequestSignaturesBatch
+    BATCH_SIGNATURES = 2
+    # Plot sync can resume from the last sync on reconnect, with compressed batches and windowed responses
+    PLOT_SYNC_DELTA = 3
 
 
 @streamable
@@ -35,4 +39,6 @@ class Handshake(Streamable):
 # "1" means capability is enabled
 capabilities = [
     (uint16(Capability.BASE.value), "1"),
+    (uint16(Capability.BATCH_SIGNATURES.value), "1"),
+    (uint16(Capability.PLOT_SYNC_DELTA.value), "1"),
 ]
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from bpx.consensus.block_record import BlockRecord
 from bpx.consensus.pos_quality import UI_ACTUAL_SPACE_CONSTANT_FACTOR
@@ -14,6 +14,7 @@ from bpx.types.unfinished_header_block import UnfinishedHeaderBlock
 from bpx.util.byte_types import hexstr_to_bytes
 from bpx.util.ints import uint32, uint64, uint128
 from bpx.util.log_exceptions import log_exceptions
+from bpx.util.lru_cache import LRUCache
 from bpx.util.math import make_monotonically_decreasing
 from bpx.util.ws_message import WsRpcMessage, create_payload_dict
 
@@ -23,6 +24,11 @@ class BeaconRpcApi:
         self.service = service
         self.service_name = "bpx_beacon"
         self.cached_blockchain_state: Optional[Dict[str, Any]] = None
+        # The parts of the blockchain state which only depend on the peak: (peak hash, difficulty, sub slot iters,
+        # space). Keyed on the peak so it is never served for a stale peak, and also dropped on every new peak.
+        self.cached_peak_state: Optional[Tuple[bytes32, uint64, uint64, uint128]] = None
+        # Space estimates by (newer, older) header hash. Blocks don't change, so these never need to be invalidated
+        self.cached_network_space: LRUCache[Tuple[bytes32, bytes32], uint128] = LRUCache(100)
 
     def get_routes(self) -> Dict[str, Endpoint]:
         return {
@@ -47,6 +53,8 @@ class BeaconRpcApi:
             change_data = {}
 
         payloads = []
+        if change == "new_peak":
+            self.cached_peak_state = None
         if change == "new_peak" or change == "sync_mode":
             data = await self.get_blockchain_state({})
             assert data is not None
@@ -96,13 +104,7 @@ class BeaconRpcApi:
             }
             return res
         peak: Optional[BlockRecord] = self.service.blockchain.get_peak()
-
-        if peak is not None and peak.height > 0:
-            difficulty = uint64(peak.weight - self.service.blockchain.block_record(peak.prev_hash).weight)
-            sub_slot_iters = peak.sub_slot_iters
-        else:
-            difficulty = self.service.constants.DIFFICULTY_STARTING
-            sub_slot_iters = self.service.constants.SUB_SLOT_ITERS_STARTING
+        difficulty, sub_slot_iters, space = await self._get_peak_state(peak)
 
         sync_mode: bool = self.service.sync_store.get_sync_mode() or self.service.sync_store.get_long_sync()
 
@@ -122,25 +124,12 @@ class BeaconRpcApi:
         else:
             sync_progress_height = uint32(0)
 
-        if peak is not None and peak.height > 1:
-            newer_block_hex = peak.header_hash.hex()
-            # Average over the last day
-            header_hash = self.service.blockchain.height_to_hash(uint32(max(1, peak.height - 4608)))
-            assert header_hash is not None
-            older_block_hex = header_hash.hex()
-            space = await self.get_network_space(
-                {"newer_block_header_hash": newer_block_hex, "older_block_header_hash": older_block_hex}
-            )
-        else:
-            space = {"space": uint128(0)}
-
         if self.service.server is not None:
             is_connected = len(self.service.server.get_connections(NodeType.BEACON)) > 0
         else:
             is_connected = False
         synced = await self.service.synced() and is_connected
 
-        assert space is not None
         response = {
             "blockchain_state": {
                 "peak": peak,
@@ -153,13 +142,49 @@ class BeaconRpcApi:
                 },
                 "difficulty": difficulty,
                 "sub_slot_iters": sub_slot_iters,
-                "space": space["space"],
+                "space": space,
                 "node_id": node_id,
             },
         }
         self.cached_blockchain_state = dict(response["blockchain_state"])
         return response
 
+    async def _get_peak_state(self, peak: Optional[BlockRecord]) -> Tuple[uint64, uint64, uint128]:
+        """
+        Returns the difficulty, sub slot iters and the estimated space as of the peak, cached until the peak changes.
+        """
+        if peak is None:
+            return (
+                self.service.constants.DIFFICULTY_STARTING,
+                self.service.constants.SUB_SLOT_ITERS_STARTING,
+                uint128(0),
+            )
+        if self.cached_peak_state is not None and self.cached_peak_state[0] == peak.header_hash:
+            return self.cached_peak_state[1:]
+
+        if peak.height > 0:
+            difficulty = uint64(peak.weight - self.service.blockchain.block_record(peak.prev_hash).weight)
+            sub_slot_iters = peak.sub_slot_iters
+        else:
+            difficulty = self.service.constants.DIFFICULTY_STARTING
+            sub_slot_iters = self.service.constants.SUB_SLOT_ITERS_STARTING
+
+        if peak.height > 1:
+            newer_block_hex = peak.header_hash.hex()
+            # Average over the last day
+            header_hash = self.service.blockchain.height_to_hash(uint32(max(1, peak.height - 4608)))
+            assert header_hash is not None
+            older_block_hex = header_hash.hex()
+            space_response = await self.get_network_space(
+                {"newer_block_header_hash": newer_block_hex, "older_block_header_hash": older_block_hex}
+            )
+            space = space_response["space"]
+        else:
+            space = uint128(0)
+
+        self.cached_peak_state = (peak.header_hash, difficulty, sub_slot_iters, space)
+        return difficulty, sub_slot_iters, space
+
     async def get_network_info(self, _: Dict[str, Any]) -> EndpointResult:
         network_name = self.service.config["selected_network"]
         return {"network_name": network_name}
@@ -408,6 +433,9 @@ class BeaconRpcApi:
 
         newer_block_bytes = bytes32.from_hexstr(newer_block_hex)
         older_block_bytes = bytes32.from_hexstr(older_block_hex)
+        cached_space = self.cached_network_space.get((newer_block_bytes, older_block_bytes))
+        if cached_space is not None:
+            return {"space": cached_space}
 
         newer_block = await self.service.block_store.get_block_record(newer_block_bytes)
         if newer_block is None:
@@ -431,7 +459,9 @@ class BeaconRpcApi:
             * additional_difficulty_constant
             * eligible_plots_filter_multiplier
         )
-        return {"space": uint128(int(network_space_bytes_estimate))}
+        space = uint128(int(network_space_bytes_estimate))
+        self.cached_network_space.put((newer_block_bytes, older_block_bytes), space)
+        return {"space": space}
     
     async def get_coinbase(self, request: Dict[str, Any]) -> EndpointResult:
         result = await self.service.get_coinbase()
@@ -1,14 +1,12 @@
 from __future__ import annotations
 
 import dataclasses
-import operator
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Sequence
 
 from typing_extensions import Protocol
 
 from bpx.farmer.farmer import Farmer
 from bpx.plot_sync.receiver import Receiver
-from bpx.protocols.harvester_protocol import Plot
 from bpx.rpc.rpc_server import Endpoint, EndpointResult
 from bpx.types.blockchain_format.sized_bytes import bytes32
 from bpx.util.byte_types import hexstr_to_bytes
@@ -60,7 +58,7 @@ class PlotPathRequestData(Streamable):
     reverse: bool = False
 
 
-def paginated_plot_request(source: List[Any], request: PaginatedRequestData) -> Dict[str, object]:
+def paginated_plot_request(source: Sequence[Any], request: PaginatedRequestData) -> Dict[str, object]:
     paginator: Paginator = Paginator(source, request.page_size)
     return {
         "node_id": request.node_id.hex(),
@@ -71,14 +69,6 @@ def paginated_plot_request(source: List[Any], request: PaginatedRequestData) ->
     }
 
 
-def plot_matches_filter(plot: Plot, filter_item: FilterItem) -> bool:
-    plot_attribute = getattr(plot, filter_item.key)
-    if filter_item.value is None:
-        return plot_attribute is None
-    else:
-        return filter_item.value in str(plot_attribute)
-
-
 class FarmerRpcApi:
     def __init__(self, farmer: Farmer):
         self.service = farmer
@@ -203,29 +193,27 @@ class FarmerRpcApi:
         return payloads
 
     async def get_signage_point(self, request: Dict[str, Any]) -> EndpointResult:
-        sp_hash = hexstr_to_bytes(request["sp_hash"])
-        for _, sps in self.service.sps.items():
-            for sp in sps:
-                if sp.challenge_chain_sp == sp_hash:
-                    pospaces = self.service.proofs_of_space.get(sp.challenge_chain_sp, [])
-                    return {
-                        "signage_point": {
-                            "challenge_hash": sp.challenge_hash,
-                            "challenge_chain_sp": sp.challenge_chain_sp,
-                            "reward_chain_sp": sp.reward_chain_sp,
-                            "difficulty": sp.difficulty,
-                            "sub_slot_iters": sp.sub_slot_iters,
-                            "signage_point_index": sp.signage_point_index,
-                        },
-                        "proofs": pospaces,
-                    }
+        sp_hash = bytes32(hexstr_to_bytes(request["sp_hash"]))
+        state = self.service.sp_store.get(sp_hash)
+        if state is not None:
+            for sp in state.signage_points:
+                return {
+                    "signage_point": {
+                        "challenge_hash": sp.challenge_hash,
+                        "challenge_chain_sp": sp.challenge_chain_sp,
+                        "reward_chain_sp": sp.reward_chain_sp,
+                        "difficulty": sp.difficulty,
+                        "sub_slot_iters": sp.sub_slot_iters,
+                        "signage_point_index": sp.signage_point_index,
+                    },
+                    "proofs": state.proofs_of_space,
+                }
         raise ValueError(f"Signage point {sp_hash.hex()} not found")
 
     async def get_signage_points(self, _: Dict[str, Any]) -> EndpointResult:
         result: List[Dict[str, Any]] = []
-        for sps in self.service.sps.values():
-            for sp in sps:
-                pospaces = self.service.proofs_of_space.get(sp.challenge_chain_sp, [])
+        for _sp_hash, state in self.service.sp_store.items():
+            for sp in state.signage_points:
                 result.append(
                     {
                         "signage_point": {
@@ -236,7 +224,7 @@ class FarmerRpcApi:
                             "sub_slot_iters": sp.sub_slot_iters,
                             "signage_point_index": sp.signage_point_index,
                         },
-                        "proofs": pospaces,
+                        "proofs": state.proofs_of_space,
                     }
                 )
         return {"signage_points": result}
@@ -248,19 +236,16 @@ class FarmerRpcApi:
         return await self.service.get_harvesters(True)
 
     async def get_harvester_plots_valid(self, request_dict: Dict[str, object]) -> EndpointResult:
-        # TODO: Consider having a extra List[PlotInfo] in Receiver to avoid rebuilding the list for each call
         request = PlotInfoRequestData.from_json_dict(request_dict)
-        plot_list = list(self.service.get_receiver(request.node_id).plots().values())
-        # Apply filter
-        plot_list = [
-            plot for plot in plot_list if all(plot_matches_filter(plot, filter_item) for filter_item in request.filter)
-        ]
         restricted_sort_keys: List[str] = ["pool_contract_puzzle_hash", "pool_public_key", "plot_public_key"]
         # Apply sort_key and reverse if sort_key is not restricted
         if request.sort_key in restricted_sort_keys:
             raise KeyError(f"Can't sort by optional attributes: {restricted_sort_keys}")
-        # Sort by plot_id also by default since its unique
-        plot_list = sorted(plot_list, key=operator.attrgetter(request.sort_key, "plot_id"), reverse=request.reverse)
+        # The receiver keeps the plots sorted by sort_key and plot_id, and caches the filtered lists
+        plot_filter = tuple((filter_item.key, filter_item.value) for filter_item in request.filter)
+        plot_list = self.service.get_receiver(request.node_id).filtered_plots(
+            request.sort_key, plot_filter, request.reverse
+        )
         return paginated_plot_request(plot_list, request)
 
     def paginated_plot_path_request(
@@ -268,11 +253,7 @@ class FarmerRpcApi:
     ) -> Dict[str, object]:
         request: PlotPathRequestData = PlotPathRequestData.from_json_dict(request_dict)
         receiver = self.service.get_receiver(request.node_id)
-        source = source_func(receiver)
-        # Apply filter
-        source = [plot for plot in source if all(filter_item in plot for filter_item in request.filter)]
-        # Apply reverse
-        source = sorted(source, reverse=request.reverse)
+        source = receiver.sorted_paths(source_func, tuple(request.filter), request.reverse)
         return paginated_plot_request(source, request)
 
     async def get_harvester_plots_invalid(self, request_dict: Dict[str, object]) -> EndpointResult:
@@ -3,7 +3,7 @@ from __future__ import annotations
 import asyncio
 from pathlib import Path
 from ssl import SSLContext
-from typing import Any, Dict, List, Optional, Type, TypeVar
+from typing import Any, Dict, List, Optional, Tuple, Type, TypeVar
 
 import aiohttp
 
@@ -16,6 +16,10 @@ from bpx.util.ints import uint16
 
 _T_RpcClient = TypeVar("_T_RpcClient", bound="RpcClient")
 
+# Connections are kept alive between calls, so a client that polls the node only does the TLS handshake once
+RPC_CLIENT_MAX_CONNECTIONS = 8
+RPC_CLIENT_KEEPALIVE_TIMEOUT = 60
+
 
 class RpcClient:
     url: str
@@ -24,6 +28,8 @@ class RpcClient:
     ssl_context: Optional[SSLContext]
     hostname: str
     port: uint16
+    # Whether the node has the /batch endpoint, None until the first batch
+    batch_supported: Optional[bool]
 
     @classmethod
     async def create(
@@ -37,12 +43,18 @@ class RpcClient:
         self.hostname = self_hostname
         self.port = port
         self.url = f"https://{self_hostname}:{str(port)}/"
-        self.session = aiohttp.ClientSession()
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=RPC_CLIENT_MAX_CONNECTIONS,
+                keepalive_timeout=RPC_CLIENT_KEEPALIVE_TIMEOUT,
+            )
+        )
         ca_crt_path, ca_key_path = private_ssl_ca_paths(root_path, net_config)
         crt_path = root_path / net_config["daemon_ssl"]["private_crt"]
         key_path = root_path / net_config["daemon_ssl"]["private_key"]
         self.ssl_context = ssl_context_for_client(ca_crt_path, ca_key_path, crt_path, key_path)
         self.closing_task = None
+        self.batch_supported = None
         return self
 
     async def fetch(self, path, request_json) -> Dict[str, Any]:
@@ -53,6 +65,30 @@ class RpcClient:
                 raise ValueError(res_json)
             return res_json
 
+    async def fetch_many(self, requests: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Makes several calls in one round-trip, using the /batch endpoint of the node. If the node doesn't have it,
+        the calls are pipelined over the pooled connections instead. Raises like fetch if any of the calls failed.
+        """
+        if self.batch_supported is not False:
+            request_json = {"requests": [{"command": path, "data": data} for path, data in requests]}
+            async with self.session.post(
+                self.url + "batch", json=request_json, ssl_context=self.ssl_context
+            ) as response:
+                if response.status != 404:
+                    self.batch_supported = True
+                    response.raise_for_status()
+                    res_json = await response.json()
+                    if not res_json["success"]:
+                        raise ValueError(res_json)
+                    results: List[Dict[str, Any]] = res_json["results"]
+                    for result in results:
+                        if not result["success"]:
+                            raise ValueError(result)
+                    return results
+            self.batch_supported = False
+        return list(await asyncio.gather(*(self.fetch(path, data) for path, data in requests)))
+
     async def get_connections(self, node_type: Optional[NodeType] = None) -> List[Dict]:
         request = {}
         if node_type is not None:
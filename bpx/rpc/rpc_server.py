@@ -12,7 +12,7 @@ from typing import Any, Awaitable, Callable, Dict, List, Optional
 from aiohttp import ClientConnectorError, ClientSession, ClientWebSocketResponse, WSMsgType, web
 from typing_extensions import Protocol, final
 
-from bpx.rpc.util import wrap_http_handler
+from bpx.rpc.util import run_endpoint, wrap_http_handler
 from bpx.server.outbound_message import NodeType
 from bpx.server.server import BpxServer, ssl_context_for_client, ssl_context_for_server
 from bpx.server.ws_connection import WSBpxConnection
@@ -21,11 +21,14 @@ from bpx.util.byte_types import hexstr_to_bytes
 from bpx.util.config import str2bool
 from bpx.util.ints import uint16
 from bpx.util.json_util import dict_to_json_str
+from bpx.util.metrics import registry as metrics_registry
 from bpx.util.network import WebServer, get_host_addr
 from bpx.util.ws_message import WsRpcMessage, create_payload, create_payload_dict, format_response, pong
 
 log = logging.getLogger(__name__)
 max_message_size = 50 * 1024 * 1024  # 50MB
+# Maximum number of commands in a single /batch request
+max_batch_size = 100
 
 
 EndpointResult = Dict[str, Any]
@@ -188,7 +191,10 @@ class RpcServer:
             hostname=self_hostname,
             port=rpc_port,
             max_request_body_size=max_request_body_size,
-            routes=[web.post(route, wrap_http_handler(func)) for (route, func) in self.get_routes().items()],
+            routes=[
+                *(web.post(route, wrap_http_handler(func)) for (route, func) in self.get_routes().items()),
+                web.get("/metrics", self.metrics),
+            ],
             ssl_context=self.ssl_context,
             prefer_ipv6=self.prefer_ipv6,
         )
@@ -255,8 +261,18 @@ class RpcServer:
             "/stop_node": self.stop_node,
             "/get_routes": self._get_routes,
             "/healthz": self.healthz,
+            "/batch": self.batch,
         }
 
+    async def metrics(self, request: web.Request) -> web.Response:
+        """
+        Serves the metrics of this service in the Prometheus text format.
+        """
+        return web.Response(
+            text=metrics_registry.render(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
     async def _get_routes(self, request: Dict[str, Any]) -> EndpointResult:
         return {
             "success": True,
@@ -308,6 +324,28 @@ class RpcServer:
             "success": True,
         }
 
+    async def batch(self, request: Dict[str, Any]) -> EndpointResult:
+        """
+        Runs several commands in one round-trip. The request has a list of {"command": ..., "data": ...} objects, and
+        the response has a list with the result of each, in the same order. The commands run concurrently, so they
+        must not depend on each other.
+        """
+        requests: List[Dict[str, Any]] = request["requests"]
+        if len(requests) > max_batch_size:
+            raise ValueError(f"Too many commands in batch: {len(requests)}, maximum is {max_batch_size}")
+        routes = self.get_routes()
+        endpoints: List[Endpoint] = []
+        for sub_request in requests:
+            command = sub_request["command"]
+            endpoint = routes.get(f"/{command}")
+            if endpoint is None or command == "batch":
+                raise ValueError(f"unknown_command {command}")
+            endpoints.append(endpoint)
+        results = await asyncio.gather(
+            *(run_endpoint(endpoint, sub_request.get("data", {})) for endpoint, sub_request in zip(endpoints, requests))
+        )
+        return {"results": list(results)}
+
     async def ws_api(self, message: WsRpcMessage) -> Optional[Dict[str, object]]:
         """
         This function gets called when new message is received via websocket.
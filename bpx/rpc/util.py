@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import logging
 import traceback
-from typing import Callable
+from typing import Any, Callable, Dict
 
 import aiohttp
 
@@ -11,23 +11,29 @@ from bpx.util.json_util import obj_to_response
 log = logging.getLogger(__name__)
 
 
+async def run_endpoint(f, request_data) -> Dict[str, Any]:
+    """
+    Calls an RPC endpoint, and turns its result or exception into the response dict sent to the client.
+    """
+    try:
+        res_object = await f(request_data)
+        if res_object is None:
+            res_object = {}
+        if "success" not in res_object:
+            res_object["success"] = True
+    except Exception as e:
+        tb = traceback.format_exc()
+        log.warning(f"Error while handling message: {tb}")
+        if len(e.args) > 0:
+            res_object = {"success": False, "error": f"{e.args[0]}"}
+        else:
+            res_object = {"success": False, "error": f"{e}"}
+    return res_object
+
+
 def wrap_http_handler(f) -> Callable:
     async def inner(request) -> aiohttp.web.Response:
         request_data = await request.json()
-        try:
-            res_object = await f(request_data)
-            if res_object is None:
-                res_object = {}
-            if "success" not in res_object:
-                res_object["success"] = True
-        except Exception as e:
-            tb = traceback.format_exc()
-            log.warning(f"Error while handling message: {tb}")
-            if len(e.args) > 0:
-                res_object = {"success": False, "error": f"{e.args[0]}"}
-            else:
-                res_object = {"success": False, "error": f"{e}"}
-
-        return obj_to_response(res_object)
+        return obj_to_response(await run_endpoint(f, request_data))
 
     return inner
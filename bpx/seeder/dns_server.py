@@ -6,8 +6,9 @@ import logging
 import random
 import signal
 import traceback
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 import aiosqlite
 from dnslib import AAAA, CNAME, MX, NS, QTYPE, RR, SOA, A, DNSHeader, DNSRecord
@@ -15,6 +16,7 @@ from dnslib import AAAA, CNAME, MX, NS, QTYPE, RR, SOA, A, DNSHeader, DNSRecord
 from bpx.util.bpx_logging import initialize_logging
 from bpx.util.config import load_config
 from bpx.util.default_root import DEFAULT_ROOT_PATH
+from bpx.util.lru_cache import LRUCache
 from bpx.util.path import path_from_root
 
 SERVICE_NAME = "seeder"
@@ -35,6 +37,9 @@ TTL = None
 soa_record = None
 ns_records: List[Any] = []
 
+# Number of (name, type, class) questions we keep encoded answers for
+ANSWER_CACHE_SIZE = 1024
+
 
 class EchoServerProtocol(asyncio.DatagramProtocol):
     def __init__(self, callback):
@@ -66,19 +71,30 @@ class EchoServerProtocol(asyncio.DatagramProtocol):
             log.error(f"Exception: {e}. Traceback: {traceback.format_exc()}.")
 
 
+@dataclass
+class AnswerRing:
+    # Encoded replies with a zero id, one per window of reliable peers, built on first use
+    packets: List[Optional[bytes]]
+    ipv4_count: int
+    ipv6_count: int
+    pointer: int = 0
+
+
 class DNSServer:
     reliable_peers_v4: List[str]
     reliable_peers_v6: List[str]
+    reliable_peers_set: Set[str]
     lock: asyncio.Lock
-    pointer: int
-    crawl_db: aiosqlite.Connection
+    crawl_db: Optional[aiosqlite.Connection]
+    answer_cache: LRUCache[Tuple[str, int, int], AnswerRing]
 
     def __init__(self, config: Dict, root_path: Path):
         self.reliable_peers_v4 = []
         self.reliable_peers_v6 = []
+        self.reliable_peers_set = set()
         self.lock = asyncio.Lock()
-        self.pointer_v4 = 0
-        self.pointer_v6 = 0
+        self.crawl_db = None
+        self.answer_cache = LRUCache(ANSWER_CACHE_SIZE)
 
         crawler_db_path: str = config.get("crawler_db_path", "crawler.db")
         self.db_path = path_from_root(root_path, crawler_db_path)
@@ -101,38 +117,18 @@ class DNSServer:
         sleep_interval = 0
         while True:
             try:
-                # TODO: double check this. It shouldn't take this long to connect.
-                crawl_db = await aiosqlite.connect(self.db_path, timeout=600)
-                cursor = await crawl_db.execute(
+                if self.crawl_db is None:
+                    # TODO: double check this. It shouldn't take this long to connect.
+                    self.crawl_db = await aiosqlite.connect(self.db_path, timeout=600)
+                cursor = await self.crawl_db.execute(
                     "SELECT * from good_peers",
                 )
-                new_reliable_peers = []
                 rows = await cursor.fetchall()
                 await cursor.close()
-                await crawl_db.close()
-                for row in rows:
-                    new_reliable_peers.append(row[0])
-                if len(new_reliable_peers) > 0:
-                    random.shuffle(new_reliable_peers)
+                new_reliable_peers = [row[0] for row in rows]
                 async with self.lock:
-                    self.reliable_peers_v4 = []
-                    self.reliable_peers_v6 = []
-                    for peer in new_reliable_peers:
-                        ipv4 = True
-                        try:
-                            _ = ipaddress.IPv4Address(peer)
-                        except ValueError:
-                            ipv4 = False
-                        if ipv4:
-                            self.reliable_peers_v4.append(peer)
-                        else:
-                            try:
-                                _ = ipaddress.IPv6Address(peer)
-                            except ValueError:
-                                continue
-                            self.reliable_peers_v6.append(peer)
-                    self.pointer_v4 = 0
-                    self.pointer_v6 = 0
+                    if set(new_reliable_peers) != self.reliable_peers_set:
+                        self.set_reliable_peers(new_reliable_peers)
                 log.error(
                     f"Number of reliable peers discovered in dns server:"
                     f" IPv4 count - {len(self.reliable_peers_v4)}"
@@ -140,93 +136,141 @@ class DNSServer:
                 )
             except Exception as e:
                 log.error(f"Exception: {e}. Traceback: {traceback.format_exc()}.")
+                if self.crawl_db is not None:
+                    crawl_db, self.crawl_db = self.crawl_db, None
+                    try:
+                        await crawl_db.close()
+                    except Exception:
+                        pass
 
             sleep_interval = min(15, sleep_interval + 1)
             await asyncio.sleep(sleep_interval * 60)
 
-    async def get_peers_to_respond(self, ipv4_count, ipv6_count):
-        peers = []
-        async with self.lock:
-            # Append IPv4.
-            size = len(self.reliable_peers_v4)
-            if ipv4_count > 0 and size <= ipv4_count:
-                peers = self.reliable_peers_v4
-            elif ipv4_count > 0:
-                peers = [self.reliable_peers_v4[i % size] for i in range(self.pointer_v4, self.pointer_v4 + ipv4_count)]
-                self.pointer_v4 = (self.pointer_v4 + ipv4_count) % size
-            # Append IPv6.
-            size = len(self.reliable_peers_v6)
-            if ipv6_count > 0 and size <= ipv6_count:
-                peers = peers + self.reliable_peers_v6
-            elif ipv6_count > 0:
-                peers = peers + [
-                    self.reliable_peers_v6[i % size] for i in range(self.pointer_v6, self.pointer_v6 + ipv6_count)
-                ]
-                self.pointer_v6 = (self.pointer_v6 + ipv6_count) % size
-            return peers
+    def set_reliable_peers(self, new_reliable_peers: List[str]) -> None:
+        """
+        Replaces the reliable peers, and drops the encoded answers built from the previous ones.
+        """
+        random.shuffle(new_reliable_peers)
+        self.reliable_peers_v4 = []
+        self.reliable_peers_v6 = []
+        for peer in new_reliable_peers:
+            ipv4 = True
+            try:
+                _ = ipaddress.IPv4Address(peer)
+            except ValueError:
+                ipv4 = False
+            if ipv4:
+                self.reliable_peers_v4.append(peer)
+            else:
+                try:
+                    _ = ipaddress.IPv6Address(peer)
+                except ValueError:
+                    continue
+                self.reliable_peers_v6.append(peer)
+        self.reliable_peers_set = set(new_reliable_peers)
+        self.answer_cache = LRUCache(ANSWER_CACHE_SIZE)
+
+    def get_peers_to_respond(self, slot: int, ipv4_count: int, ipv6_count: int) -> Tuple[List[str], List[str]]:
+        """
+        Returns the window of reliable peers for the given slot of an answer ring. Consecutive slots rotate through
+        all the peers.
+        """
+        peers_v4: List[str] = []
+        peers_v6: List[str] = []
+        # Append IPv4.
+        size = len(self.reliable_peers_v4)
+        if ipv4_count > 0 and size <= ipv4_count:
+            peers_v4 = self.reliable_peers_v4
+        elif ipv4_count > 0:
+            start = slot * ipv4_count
+            peers_v4 = [self.reliable_peers_v4[i % size] for i in range(start, start + ipv4_count)]
+        # Append IPv6.
+        size = len(self.reliable_peers_v6)
+        if ipv6_count > 0 and size <= ipv6_count:
+            peers_v6 = self.reliable_peers_v6
+        elif ipv6_count > 0:
+            start = slot * ipv6_count
+            peers_v6 = [self.reliable_peers_v6[i % size] for i in range(start, start + ipv6_count)]
+        return peers_v4, peers_v6
+
+    def create_answer_ring(self, ipv4_count: int, ipv6_count: int) -> AnswerRing:
+        slots = 1
+        if ipv4_count > 0:
+            slots = max(slots, -(-len(self.reliable_peers_v4) // ipv4_count))
+        if ipv6_count > 0:
+            slots = max(slots, -(-len(self.reliable_peers_v6) // ipv6_count))
+        return AnswerRing([None] * slots, ipv4_count, ipv6_count)
+
+    def encode_answer(self, request: DNSRecord, peers_v4: List[str], peers_v6: List[str]) -> bytes:
+        IPs = [MX(D.mail), soa_record] + ns_records
+        IPs.extend(A(peer) for peer in peers_v4)
+        IPs.extend(AAAA(peer) for peer in peers_v6)
+        reply = DNSRecord(DNSHeader(id=0, qr=1, aa=len(IPs), ra=1), q=request.q)
+
+        records = {
+            D: IPs,
+            D.ns1: [A(IP)],  # MX and NS records must never point to a CNAME alias (RFC 2181 section 10.3)
+            D.ns2: [A(IP)],
+            D.mail: [A(IP)],
+            D.andrei: [CNAME(D)],
+        }
+
+        qname = request.q.qname
+        qn = str(qname)
+        qtype = request.q.qtype
+        qt = QTYPE[qtype]
+        if qn == D or qn.endswith("." + D):
+            for name, rrs in records.items():
+                if name == qn:
+                    for rdata in rrs:
+                        rqt = rdata.__class__.__name__
+                        if qt in ["*", rqt] or (qt == "ANY" and (rqt == "A" or rqt == "AAAA")):
+                            reply.add_answer(RR(rname=qname, rtype=getattr(QTYPE, rqt), rclass=1, ttl=TTL, rdata=rdata))
+
+            for rdata in ns_records:
+                reply.add_ar(RR(rname=D, rtype=QTYPE.NS, rclass=1, ttl=TTL, rdata=rdata))
+
+            reply.add_auth(RR(rname=D, rtype=QTYPE.SOA, rclass=1, ttl=TTL, rdata=soa_record))
+
+        packet: bytes = reply.pack()
+        return packet
 
     async def dns_response(self, data):
+        """
+        Answers from a ring of encoded replies per question, only the id of the request is patched in. The rings
+        are dropped when the reliable peers change.
+        """
         try:
             request = DNSRecord.parse(data)
-            IPs = [MX(D.mail), soa_record] + ns_records
-            ipv4_count = 0
-            ipv6_count = 0
-            if request.q.qtype == 1:
-                ipv4_count = 32
-            elif request.q.qtype == 28:
-                ipv6_count = 32
-            elif request.q.qtype == 255:
-                ipv4_count = 16
-                ipv6_count = 16
-            else:
-                ipv4_count = 32
-            peers = await self.get_peers_to_respond(ipv4_count, ipv6_count)
-            if len(peers) == 0:
+            if len(self.reliable_peers_set) == 0:
                 return None
-            for peer in peers:
-                ipv4 = True
-                try:
-                    _ = ipaddress.IPv4Address(peer)
-                except ValueError:
-                    ipv4 = False
-                if ipv4:
-                    IPs.append(A(peer))
+            key = (str(request.q.qname), request.q.qtype, request.q.qclass)
+            ring = self.answer_cache.get(key)
+            if ring is None:
+                ipv4_count = 0
+                ipv6_count = 0
+                if request.q.qtype == 1:
+                    ipv4_count = 32
+                elif request.q.qtype == 28:
+                    ipv6_count = 32
+                elif request.q.qtype == 255:
+                    ipv4_count = 16
+                    ipv6_count = 16
                 else:
-                    try:
-                        _ = ipaddress.IPv6Address(peer)
-                    except ValueError:
-                        continue
-                    IPs.append(AAAA(peer))
-            reply = DNSRecord(DNSHeader(id=request.header.id, qr=1, aa=len(IPs), ra=1), q=request.q)
-
-            records = {
-                D: IPs,
-                D.ns1: [A(IP)],  # MX and NS records must never point to a CNAME alias (RFC 2181 section 10.3)
-                D.ns2: [A(IP)],
-                D.mail: [A(IP)],
-                D.andrei: [CNAME(D)],
-            }
-
-            qname = request.q.qname
-            qn = str(qname)
-            qtype = request.q.qtype
-            qt = QTYPE[qtype]
-            if qn == D or qn.endswith("." + D):
-                for name, rrs in records.items():
-                    if name == qn:
-                        for rdata in rrs:
-                            rqt = rdata.__class__.__name__
-                            if qt in ["*", rqt] or (qt == "ANY" and (rqt == "A" or rqt == "AAAA")):
-                                reply.add_answer(
-                                    RR(rname=qname, rtype=getattr(QTYPE, rqt), rclass=1, ttl=TTL, rdata=rdata)
-                                )
-
-                for rdata in ns_records:
-                    reply.add_ar(RR(rname=D, rtype=QTYPE.NS, rclass=1, ttl=TTL, rdata=rdata))
-
-                reply.add_auth(RR(rname=D, rtype=QTYPE.SOA, rclass=1, ttl=TTL, rdata=soa_record))
-
-            return reply.pack()
+                    ipv4_count = 32
+                ring = self.create_answer_ring(ipv4_count, ipv6_count)
+                self.answer_cache.put(key, ring)
+
+            slot = ring.pointer
+            ring.pointer = (ring.pointer + 1) % len(ring.packets)
+            packet = ring.packets[slot]
+            if packet is None:
+                peers_v4, peers_v6 = self.get_peers_to_respond(slot, ring.ipv4_count, ring.ipv6_count)
+                if len(peers_v4) == 0 and len(peers_v6) == 0:
+                    return None
+                packet = self.encode_answer(request, peers_v4, peers_v6)
+                ring.packets[slot] = packet
+            return request.header.id.to_bytes(2, "big") + packet[2:]
         except Exception as e:
             log.error(f"Exception: {e}. Traceback: {traceback.format_exc()}.")
 
@@ -26,6 +26,9 @@ HORIZON_DAYS = 30
 MAX_RETRIES = 3
 MIN_FAIL_DAYS = 7
 MAX_FAILURES = 10
+# Failed connection attempts back off exponentially per network group, in seconds
+GROUP_BACKOFF_BASE = 15
+GROUP_BACKOFF_MAX = 1800
 
 log = logging.getLogger(__name__)
 
@@ -174,6 +177,11 @@ class AddressManager:
     used_new_matrix_positions: Set[Tuple[int, int]]
     used_tried_matrix_positions: Set[Tuple[int, int]]
     allow_private_subnets: bool
+    # Changes since the last `pop_dirty_`, used to persist the tables incrementally
+    dirty_hosts: Set[str]
+    dirty_new_positions: Set[Tuple[int, int]]
+    # Network group to (consecutive failed attempts, timestamp before which the group isn't dialed again)
+    group_backoff: Dict[bytes, Tuple[int, int]]
 
     def __init__(self) -> None:
         self.clear()
@@ -194,6 +202,9 @@ class AddressManager:
         self.used_new_matrix_positions = set()
         self.used_tried_matrix_positions = set()
         self.allow_private_subnets = False
+        self.dirty_hosts = set()
+        self.dirty_new_positions = set()
+        self.group_backoff = {}
 
     def make_private_subnets_valid(self) -> None:
         self.allow_private_subnets = True
@@ -201,6 +212,7 @@ class AddressManager:
     # Use only this method for modifying new matrix.
     def _set_new_matrix(self, row: int, col: int, value: int) -> None:
         self.new_matrix[row][col] = value
+        self.dirty_new_positions.add((row, col))
         if value == -1:
             if (row, col) in self.used_new_matrix_positions:
                 self.used_new_matrix_positions.remove((row, col))
@@ -218,6 +230,33 @@ class AddressManager:
             if (row, col) not in self.used_tried_matrix_positions:
                 self.used_tried_matrix_positions.add((row, col))
 
+    def mark_all_dirty_(self) -> None:
+        self.dirty_hosts.update(self.map_addr.keys())
+        self.dirty_new_positions.update(self.used_new_matrix_positions)
+
+    def pop_dirty_(self) -> Tuple[List[Tuple[str, Optional[str], bool]], List[Tuple[int, int, Optional[str]]]]:
+        """
+        Returns the entries changed since the last call and resets the change tracking. Nodes are returned as
+        (host, serialized info or None if removed, is tried), new table positions as (bucket, position, host or
+        None if empty).
+        """
+        nodes: List[Tuple[str, Optional[str], bool]] = []
+        for host in self.dirty_hosts:
+            node_id = self.map_addr.get(host)
+            info = self.map_info.get(node_id) if node_id is not None else None
+            if info is None:
+                nodes.append((host, None, False))
+            else:
+                nodes.append((host, info.to_string(), info.is_tried))
+        new_positions: List[Tuple[int, int, Optional[str]]] = []
+        for bucket, pos in self.dirty_new_positions:
+            node_id = self.new_matrix[bucket][pos]
+            position_host = self.map_info[node_id].peer_info.host if node_id != -1 else None
+            new_positions.append((bucket, pos, position_host))
+        self.dirty_hosts = set()
+        self.dirty_new_positions = set()
+        return nodes, new_positions
+
     def load_used_table_positions(self) -> None:
         self.used_new_matrix_positions = set()
         self.used_tried_matrix_positions = set()
@@ -235,6 +274,7 @@ class AddressManager:
         node_id = self.id_count
         self.map_info[node_id] = ExtendedPeerInfo(addr, addr_src)
         self.map_addr[addr.host] = node_id
+        self.dirty_hosts.add(addr.host)
         self.map_info[node_id].random_pos = len(self.random_pos)
         self.random_pos.append(node_id)
         return (self.map_info[node_id], node_id)
@@ -274,6 +314,7 @@ class AddressManager:
             assert node_id_evict in self.map_info
             old_info = self.map_info[node_id_evict]
             old_info.is_tried = False
+            self.dirty_hosts.add(old_info.peer_info.host)
             self._set_tried_matrix(cur_bucket, cur_bucket_pos, -1)
             self.tried_count -= 1
             # Find its position into new table.
@@ -286,6 +327,7 @@ class AddressManager:
         self._set_tried_matrix(cur_bucket, cur_bucket_pos, node_id)
         self.tried_count += 1
         info.is_tried = True
+        self.dirty_hosts.add(info.peer_info.host)
 
     def clear_new_(self, bucket: int, pos: int) -> None:
         if self.new_matrix[bucket][pos] != -1:
@@ -299,6 +341,7 @@ class AddressManager:
 
     def mark_good_(self, addr: PeerInfo, test_before_evict: bool, timestamp: int) -> None:
         self.last_good = timestamp
+        self.group_backoff.pop(addr.get_group(), None)
         (info, node_id) = self.find_(addr)
         if addr.ip.is_private and not self.allow_private_subnets:
             return None
@@ -357,6 +400,7 @@ class AddressManager:
         self.random_pos = self.random_pos[:-1]
         del self.map_addr[info.peer_info.host]
         del self.map_info[node_id]
+        self.dirty_hosts.add(info.peer_info.host)
         self.new_count -= 1
 
     def add_to_new_table_(self, addr: TimestampedPeerInfo, source: Optional[PeerInfo], penalty: int) -> bool:
@@ -379,6 +423,7 @@ class AddressManager:
                 info.timestamp > 0 or info.timestamp < addr.timestamp - update_interval - penalty
             ):
                 info.timestamp = max(0, addr.timestamp - penalty)
+                self.dirty_hosts.add(peer_info.host)
 
             # do not update if no new information is present
             if addr.timestamp == 0 or (info.timestamp > 0 and addr.timestamp <= info.timestamp):
@@ -422,6 +467,12 @@ class AddressManager:
         return is_unique
 
     def attempt_(self, addr: PeerInfo, count_failures: bool, timestamp: int) -> None:
+        if count_failures:
+            group = addr.get_group()
+            failures = self.group_backoff.get(group, (0, 0))[0] + 1
+            delay = min(GROUP_BACKOFF_MAX, GROUP_BACKOFF_BASE * 2 ** min(failures - 1, 16))
+            self.group_backoff[group] = (failures, timestamp + delay)
+
         info, _ = self.find_(addr)
         if info is None:
             return None
@@ -434,6 +485,10 @@ class AddressManager:
             info.last_count_attempt = timestamp
             info.num_attempts += 1
 
+    def is_backing_off_(self, addr: PeerInfo, timestamp: int) -> bool:
+        backoff = self.group_backoff.get(addr.get_group())
+        return backoff is not None and timestamp < backoff[1]
+
     def select_peer_(self, new_only: bool) -> Optional[ExtendedPeerInfo]:
         if len(self.random_pos) == 0:
             return None
@@ -591,6 +646,7 @@ class AddressManager:
         update_interval = 20 * 60
         if timestamp - info.timestamp > update_interval:
             info.timestamp = timestamp
+            self.dirty_hosts.add(addr.host)
 
     async def size(self) -> int:
         async with self.lock:
@@ -633,6 +689,11 @@ class AddressManager:
         async with self.lock:
             self.attempt_(addr, count_failures, timestamp)
 
+    # Check if the network group of the address failed recently and shouldn't be dialed yet.
+    async def is_backing_off(self, addr: PeerInfo) -> bool:
+        async with self.lock:
+            return self.is_backing_off_(addr, math.floor(time.time()))
+
     # See if any to-be-evicted tried table entries have been tested and if so resolve the collisions.
     async def resolve_tried_collisions(self) -> None:
         async with self.lock:
@@ -31,7 +31,11 @@ async def create_address_manager_from_db(db_path: Path) -> Optional[AddressManag
 
 
 async def get_metadata(connection: aiosqlite.Connection) -> Dict[str, str]:
-    cursor = await connection.execute("SELECT key, value from peer_metadata")
+    return await get_metadata_table(connection, "peer_metadata")
+
+
+async def get_metadata_table(connection: aiosqlite.Connection, table_name: str) -> Dict[str, str]:
+    cursor = await connection.execute(f"SELECT key, value from {table_name}")
     metadata = await cursor.fetchall()
     await cursor.close()
     return {key: value for key, value in metadata}
@@ -116,3 +120,138 @@ def create_address_manager(
     address_manager.load_used_table_positions()
 
     return address_manager
+
+
+class AddressManagerSQLiteStore:
+    """
+    Persists the address manager incrementally. Instead of rewriting all peer data, `flush` only writes the nodes
+    and new table positions which changed since the previous flush.
+    address_metadata table:
+    - key
+    address_nodes table:
+    * One row per known address, the IP is unique in the address manager.
+    - host, serialized ExtendedPeerInfo, whether it's in the tried table
+    address_new_table table:
+    * Host of each used position of the new table.
+    The tried table positions and everything else are recalculated on load.
+    """
+
+    connection: aiosqlite.Connection
+
+    def __init__(self, connection: aiosqlite.Connection) -> None:
+        self.connection = connection
+
+    @classmethod
+    async def create(cls, db_path: Path) -> AddressManagerSQLiteStore:
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        connection = await aiosqlite.connect(db_path)
+        await connection.execute("pragma journal_mode=wal")
+        await connection.execute("pragma synchronous=NORMAL")
+        await connection.execute("CREATE TABLE IF NOT EXISTS address_metadata(key text PRIMARY KEY, value text)")
+        await connection.execute(
+            "CREATE TABLE IF NOT EXISTS address_nodes(host text PRIMARY KEY, value text, is_tried tinyint)"
+        )
+        await connection.execute(
+            "CREATE TABLE IF NOT EXISTS address_new_table(bucket int, pos int, host text, PRIMARY KEY(bucket, pos))"
+        )
+        await connection.commit()
+        return cls(connection)
+
+    async def close(self) -> None:
+        await self.connection.close()
+
+    async def load(self) -> Optional[AddressManager]:
+        """
+        Returns None if nothing was stored yet.
+        """
+        metadata = await get_metadata_table(self.connection, "address_metadata")
+        if "key" not in metadata:
+            return None
+
+        address_manager = AddressManager()
+        address_manager.key = int(metadata["key"])
+        cursor = await self.connection.execute("SELECT host, value, is_tried from address_nodes")
+        node_rows = await cursor.fetchall()
+        await cursor.close()
+        cursor = await self.connection.execute("SELECT bucket, pos, host from address_new_table")
+        new_table_rows = await cursor.fetchall()
+        await cursor.close()
+
+        for host, value, is_tried in node_rows:
+            info = ExtendedPeerInfo.from_string(value)
+            if is_tried:
+                tried_bucket = info.get_tried_bucket(address_manager.key)
+                tried_bucket_pos = info.get_bucket_position(address_manager.key, False, tried_bucket)
+                if address_manager.tried_matrix[tried_bucket][tried_bucket_pos] != -1:
+                    address_manager.dirty_hosts.add(host)
+                    continue
+                info.is_tried = True
+            node_id = address_manager.id_count
+            address_manager.id_count += 1
+            address_manager.map_addr[host] = node_id
+            address_manager.map_info[node_id] = info
+            info.random_pos = len(address_manager.random_pos)
+            address_manager.random_pos.append(node_id)
+            if is_tried:
+                address_manager.tried_matrix[tried_bucket][tried_bucket_pos] = node_id
+                address_manager.tried_count += 1
+            else:
+                address_manager.new_count += 1
+
+        for bucket, pos, host in new_table_rows:
+            new_node_id = address_manager.map_addr.get(host)
+            if (
+                new_node_id is None
+                or address_manager.map_info[new_node_id].is_tried
+                or address_manager.map_info[new_node_id].ref_count >= NEW_BUCKETS_PER_ADDRESS
+                or address_manager.new_matrix[bucket][pos] != -1
+            ):
+                address_manager.dirty_new_positions.add((bucket, pos))
+                continue
+            address_manager.new_matrix[bucket][pos] = new_node_id
+            address_manager.map_info[new_node_id].ref_count += 1
+
+        for node_id, info in list(address_manager.map_info.items()):
+            if not info.is_tried and info.ref_count == 0:
+                address_manager.delete_new_entry_(node_id)
+        address_manager.load_used_table_positions()
+
+        return address_manager
+
+    async def flush(self, address_manager: AddressManager) -> int:
+        """
+        Writes the changes since the last flush, returns the number of changed entries. The address manager lock
+        is only held to collect the changes, not while writing them.
+        """
+        async with address_manager.lock:
+            key = address_manager.key
+            nodes, new_positions = address_manager.pop_dirty_()
+
+        try:
+            await self.connection.execute(
+                "INSERT OR REPLACE INTO address_metadata VALUES(?, ?)",
+                ("key", str(key)),
+            )
+            await self.connection.executemany(
+                "DELETE FROM address_nodes WHERE host=?",
+                [(host,) for host, value, _ in nodes if value is None],
+            )
+            await self.connection.executemany(
+                "INSERT OR REPLACE INTO address_nodes VALUES(?, ?, ?)",
+                [(host, value, int(is_tried)) for host, value, is_tried in nodes if value is not None],
+            )
+            await self.connection.executemany(
+                "DELETE FROM address_new_table WHERE bucket=? AND pos=?",
+                [(bucket, pos) for bucket, pos, host in new_positions if host is None],
+            )
+            await self.connection.executemany(
+                "INSERT OR REPLACE INTO address_new_table VALUES(?, ?, ?)",
+                [(bucket, pos, host) for bucket, pos, host in new_positions if host is not None],
+            )
+            await self.connection.commit()
+        except BaseException:
+            # Keep the changes for the next flush
+            address_manager.dirty_hosts.update(host for host, _, _ in nodes)
+            address_manager.dirty_new_positions.update((bucket, pos) for bucket, pos, _ in new_positions)
+            raise
+        return len(nodes) + len(new_positions)
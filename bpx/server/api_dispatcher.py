@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Optional
+
+from bpx.util.api_decorators import ApiPriority
+
+# Node wide number of api calls which may run concurrently per priority, None means unlimited
+DEFAULT_CONCURRENCY_LIMITS: Dict[ApiPriority, Optional[int]] = {
+    ApiPriority.CRITICAL: None,
+    ApiPriority.NORMAL: 128,
+    ApiPriority.BULK: 8,
+}
+# Longest time in seconds a bulk call is held back while critical calls are running
+MAX_BULK_DEFER = 1.0
+
+
+@dataclass
+class ApiDispatcher:
+    """
+    Schedules the inbound api calls of all connections of a server. Each priority class has its own concurrency
+    limit, so bulk traffic like serving blocks to syncing peers can't hold up farming critical messages, and
+    bulk calls are deferred (up to `MAX_BULK_DEFER`) while critical calls are being processed.
+    """
+
+    limits: Dict[ApiPriority, Optional[int]] = field(default_factory=lambda: dict(DEFAULT_CONCURRENCY_LIMITS))
+    _semaphores: Dict[ApiPriority, asyncio.Semaphore] = field(default_factory=dict, repr=False)
+    _running: Dict[ApiPriority, int] = field(default_factory=lambda: {priority: 0 for priority in ApiPriority})
+    _waiting: Dict[ApiPriority, int] = field(default_factory=lambda: {priority: 0 for priority in ApiPriority})
+    _no_critical_calls: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    def __post_init__(self) -> None:
+        for priority, limit in self.limits.items():
+            if limit is not None:
+                self._semaphores[priority] = asyncio.Semaphore(limit)
+        self._no_critical_calls.set()
+
+    @contextlib.asynccontextmanager
+    async def slot(self, priority: ApiPriority) -> AsyncIterator[None]:
+        semaphore = self._semaphores.get(priority)
+        self._waiting[priority] += 1
+        try:
+            if semaphore is not None:
+                await semaphore.acquire()
+            try:
+                if priority is ApiPriority.BULK:
+                    with contextlib.suppress(asyncio.TimeoutError):
+                        await asyncio.wait_for(self._no_critical_calls.wait(), timeout=MAX_BULK_DEFER)
+            except BaseException:
+                if semaphore is not None:
+                    semaphore.release()
+                raise
+        finally:
+            self._waiting[priority] -= 1
+
+        self._running[priority] += 1
+        if priority is ApiPriority.CRITICAL:
+            self._no_critical_calls.clear()
+        try:
+            yield
+        finally:
+            self._running[priority] -= 1
+            if priority is ApiPriority.CRITICAL and self._running[priority] == 0:
+                self._no_critical_calls.set()
+            if semaphore is not None:
+                semaphore.release()
+
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            priority.name.lower(): {"running": self._running[priority], "waiting": self._waiting[priority]}
+            for priority in ApiPriority
+        }
@@ -16,7 +16,7 @@ from bpx.protocols.beacon_protocol import RequestPeers, RespondPeers
 from bpx.protocols.introducer_protocol import RequestPeersIntroducer, RespondPeersIntroducer
 from bpx.protocols.protocol_message_types import ProtocolMessageTypes
 from bpx.server.address_manager import AddressManager, ExtendedPeerInfo
-from bpx.server.address_manager_sqlite_store import create_address_manager_from_db
+from bpx.server.address_manager_sqlite_store import AddressManagerSQLiteStore, create_address_manager_from_db
 from bpx.server.address_manager_store import AddressManagerStore
 from bpx.server.outbound_message import Message, NodeType, make_msg
 from bpx.server.peer_store_resolver import PeerStoreResolver
@@ -30,6 +30,8 @@ from bpx.util.network import IPAddress, get_host_addr
 MAX_PEERS_RECEIVED_PER_REQUEST = 1000
 MAX_TOTAL_PEERS_RECEIVED = 3000
 MAX_CONCURRENT_OUTBOUND_CONNECTIONS = 70
+# Seconds between writes of the address manager changes to the peer store
+PEER_STORE_FLUSH_INTERVAL = 60
 NETWORK_ID_DEFAULT_PORTS = {
     "mainnet": 6201,
     "testnet": 6201,
@@ -69,11 +71,12 @@ class BeaconDiscovery:
         self.log = log
         self.relay_queue: Optional[asyncio.Queue[Tuple[TimestampedPeerInfo, int]]] = None
         self.address_manager: Optional[AddressManager] = None
+        self.peer_store: Optional[AddressManagerSQLiteStore] = None
         self.connection_time_pretest: Dict[str, Any] = {}
         self.received_count_from_peers: Dict[str, Any] = {}
         self.lock = asyncio.Lock()
         self.connect_peers_task: Optional[asyncio.Task[None]] = None
-        self.serialize_task: Optional[asyncio.Task[None]] = None
+        self.flush_peer_store_task: Optional[asyncio.Task[None]] = None
         self.cleanup_task: Optional[asyncio.Task[None]] = None
         self.initial_wait: int = 0
         try:
@@ -88,24 +91,34 @@ class BeaconDiscovery:
             self.default_port = NETWORK_ID_DEFAULT_PORTS[selected_network]
 
     async def initialize_address_manager(self) -> None:
-        self.address_manager = await AddressManagerStore.create_address_manager(self.peers_file_path)
+        self.peer_store = await AddressManagerSQLiteStore.create(self.peers_file_path.with_suffix(".sqlite"))
+        self.address_manager = await self.peer_store.load()
+        if self.address_manager is None:
+            # Nothing stored incrementally yet, migrate the peers file if there is one
+            self.address_manager = await AddressManagerStore.create_address_manager(self.peers_file_path)
+            self.address_manager.mark_all_dirty_()
         self.server.set_received_message_callback(self.update_peer_timestamp_on_message)
 
     async def start_tasks(self) -> None:
         random = Random()
         self.connect_peers_task = asyncio.create_task(self._connect_to_peers(random))
-        self.serialize_task = asyncio.create_task(self._periodically_serialize(random))
+        self.flush_peer_store_task = asyncio.create_task(self._periodically_flush_peer_store())
         self.cleanup_task = asyncio.create_task(self._periodically_cleanup())
 
     async def _close_common(self) -> None:
         self.is_closed = True
         self.cancel_task_safe(self.connect_peers_task)
-        self.cancel_task_safe(self.serialize_task)
+        self.cancel_task_safe(self.flush_peer_store_task)
         self.cancel_task_safe(self.cleanup_task)
         for t in self.pending_tasks:
             self.cancel_task_safe(t)
         if len(self.pending_tasks) > 0:
             await asyncio.wait(self.pending_tasks)
+        if self.peer_store is not None:
+            if self.address_manager is not None:
+                await self._flush_peer_store()
+            await self.peer_store.close()
+            self.peer_store = None
 
     def cancel_task_safe(self, task: Optional[asyncio.Task[None]]) -> None:
         if task is not None:
@@ -257,6 +270,7 @@ class BeaconDiscovery:
             await asyncio.sleep(self.initial_wait)
 
         introducer_backoff = 1
+        prefer_v4: Optional[bool] = None
         while not self.is_closed:
             try:
                 assert self.address_manager is not None
@@ -307,6 +321,9 @@ class BeaconDiscovery:
                         continue
                     group = peer.get_group()
                     groups.add(group)
+                # Attempts still in flight count as connected groups as well.
+                for host in self.pending_outbound_connections:
+                    groups.add(PeerInfo(host, 0).get_group())
 
                 # Feeler Connections
                 #
@@ -338,6 +355,10 @@ class BeaconDiscovery:
                 elif len(groups) <= 5:
                     max_tries = 25
                 select_peer_interval = max(0.1, len(groups) * 0.25)
+                # While there are free outbound slots, keep dialing without pacing so the attempts run concurrently.
+                filling = not is_feeler and self._num_needed_peers() > len(self.pending_tasks)
+                if filling:
+                    select_peer_interval = 0
                 while not got_peer and not self.is_closed:
                     self.log.debug(f"Address manager query count: {tries}. Query limit: {max_tries}")
                     try:
@@ -370,6 +391,14 @@ class BeaconDiscovery:
                     if addr in connected:
                         addr = None
                         continue
+                    # Alternate between IPv4 and IPv6 candidates, so a family that can't be reached
+                    # doesn't hold up all the slots while the other one connects.
+                    if filling and prefer_v4 is not None and addr.ip.is_v4 != prefer_v4 and tries <= 2:
+                        addr = None
+                        continue
+                    if await self.address_manager.is_backing_off(addr):
+                        addr = None
+                        continue
                     # attempt a node once per 30 minutes.
                     if now - info.last_try < 1800:
                         continue
@@ -392,6 +421,7 @@ class BeaconDiscovery:
                 if not initiate_connection:
                     connect_peer_interval += 15
                 connect_peer_interval = min(connect_peer_interval, self.peer_connect_interval)
+                dialed = False
                 if addr is not None and initiate_connection and addr.host not in self.pending_outbound_connections:
                     if len(self.pending_outbound_connections) >= MAX_CONCURRENT_OUTBOUND_CONNECTIONS:
                         self.log.debug("Max concurrent outbound connections reached. waiting")
@@ -399,25 +429,41 @@ class BeaconDiscovery:
                     self.pending_tasks.add(
                         asyncio.create_task(self.start_client_async(addr, disconnect_after_handshake))
                     )
-
-                await asyncio.sleep(connect_peer_interval)
+                    prefer_v4 = not addr.ip.is_v4
+                    dialed = True
 
                 # prune completed connect tasks
-                self.pending_task = set(filter(lambda t: not t.done(), self.pending_tasks))
+                self.pending_tasks = set(filter(lambda t: not t.done(), self.pending_tasks))
+
+                if filling and dialed:
+                    # Go on with the next candidate right away if there are free slots, otherwise wait
+                    # for one of the attempts to finish.
+                    if len(self.pending_tasks) >= extra_peers_needed:
+                        await asyncio.wait(
+                            self.pending_tasks, timeout=connect_peer_interval, return_when=asyncio.FIRST_COMPLETED
+                        )
+                else:
+                    await asyncio.sleep(connect_peer_interval)
 
             except Exception as e:
                 self.log.error(f"Exception in create outbound connections: {e}")
                 self.log.error(f"Traceback: {traceback.format_exc()}")
 
-    async def _periodically_serialize(self, random: Random) -> None:
+    async def _flush_peer_store(self) -> None:
+        assert self.peer_store is not None and self.address_manager is not None
+        try:
+            changed = await self.peer_store.flush(self.address_manager)
+            self.log.debug(f"Wrote {changed} changed peer entries")
+        except Exception as e:
+            self.log.error(f"Failed to write peer data: {e}")
+
+    async def _periodically_flush_peer_store(self) -> None:
         while not self.is_closed:
-            if self.address_manager is None:
+            if self.address_manager is None or self.peer_store is None:
                 await asyncio.sleep(10)
                 continue
-            serialize_interval = random.randint(15 * 60, 30 * 60)
-            await asyncio.sleep(serialize_interval)
-            async with self.address_manager.lock:
-                await AddressManagerStore.serialize(self.address_manager, self.peers_file_path)
+            await asyncio.sleep(PEER_STORE_FLUSH_INTERVAL)
+            await self._flush_peer_store()
 
     async def _periodically_cleanup(self) -> None:
         while not self.is_closed:
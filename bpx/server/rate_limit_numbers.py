@@ -33,6 +33,8 @@ rate_limits = {
             ProtocolMessageTypes.new_proof_of_space: RLSettings(100, 2048),
             ProtocolMessageTypes.request_signatures: RLSettings(100, 2048),
             ProtocolMessageTypes.respond_signatures: RLSettings(100, 2048),
+            ProtocolMessageTypes.request_signatures_batch: RLSettings(100, 1024 * 1024),
+            ProtocolMessageTypes.respond_signatures_batch: RLSettings(100, 1024 * 1024),
             ProtocolMessageTypes.new_signage_point: RLSettings(200, 2048),
             ProtocolMessageTypes.declare_proof_of_space: RLSettings(100, 10 * 1024),
             ProtocolMessageTypes.request_signed_values: RLSettings(100, 512),
@@ -77,6 +79,8 @@ rate_limits = {
             ProtocolMessageTypes.plot_sync_keys_missing: RLSettings(1000, 100 * 1024 * 1024),
             ProtocolMessageTypes.plot_sync_duplicates: RLSettings(1000, 100 * 1024 * 1024),
             ProtocolMessageTypes.plot_sync_done: RLSettings(1000, 100 * 1024 * 1024),
+            ProtocolMessageTypes.plot_sync_resume: RLSettings(1000, 100 * 1024 * 1024),
+            ProtocolMessageTypes.plot_sync_compressed: RLSettings(1000, 100 * 1024 * 1024),
             ProtocolMessageTypes.plot_sync_response: RLSettings(3000, 100 * 1024 * 1024),
         },
     },
@@ -1,29 +1,45 @@
 from __future__ import annotations
 
-import dataclasses
 import logging
 import time
-from collections import Counter
-from typing import List
+from dataclasses import dataclass
+from typing import List, Optional
 
 from bpx.protocols.protocol_message_types import ProtocolMessageTypes
 from bpx.protocols.shared_protocol import Capability
 from bpx.server.outbound_message import Message
-from bpx.server.rate_limit_numbers import RLSettings, get_rate_limits_to_use
+from bpx.server.rate_limit_numbers import get_rate_limits_to_use
 
 log = logging.getLogger(__name__)
 
+# Message types are sent as uint8
+MESSAGE_TYPE_COUNT = 256
+
+
+@dataclass(frozen=True)
+class ResolvedLimits:
+    # Bucket capacities, already scaled by the percentage of the limit
+    count_capacity: float
+    size_capacity: float
+    max_size: int
+    # Whether the message also counts towards the shared non tx limits
+    non_tx: bool
+
 
 # TODO: only beacon client disconnects based on rate limits
 class RateLimiter:
     incoming: bool
     reset_seconds: int
-    current_minute: int
-    message_counts: Counter[ProtocolMessageTypes]
-    message_cumulative_sizes: Counter[ProtocolMessageTypes]
     percentage_of_limit: int
-    non_tx_message_counts: int = 0
-    non_tx_cumulative_size: int = 0
+    limits: List[Optional[ResolvedLimits]]
+    count_tokens: List[float]
+    size_tokens: List[float]
+    last_refill: List[float]
+    non_tx_count_capacity: float
+    non_tx_size_capacity: float
+    non_tx_count_tokens: float
+    non_tx_size_tokens: float
+    non_tx_last_refill: float
 
     def __init__(self, incoming: bool, reset_seconds: int = 60, percentage_of_limit: int = 100):
         """
@@ -32,80 +48,124 @@ class RateLimiter:
         incremented. For outgoing messages, the counters are only incremented
         if they are allowed to be sent by the rate limiter, since we won't send
         the messages otherwise.
+
+        Each message type has a token bucket for the number of messages and one for their cumulative size. The
+        buckets hold at most the limit of one period and refill continuously over `reset_seconds`.
         """
         self.incoming = incoming
         self.reset_seconds = reset_seconds
-        self.current_minute = int(time.time() // reset_seconds)
-        self.message_counts = Counter()
-        self.message_cumulative_sizes = Counter()
         self.percentage_of_limit = percentage_of_limit
-        self.non_tx_message_counts = 0
-        self.non_tx_cumulative_size = 0
+        self.set_capabilities([], [])
 
-    def process_msg_and_check(
-        self, message: Message, our_capabilities: List[Capability], peer_capabilities: List[Capability]
-    ) -> bool:
+    def set_capabilities(self, our_capabilities: List[Capability], peer_capabilities: List[Capability]) -> None:
         """
-        Returns True if message can be processed successfully, false if a rate limit is passed.
+        Resolves the limits for the capabilities of a connection once, and refills all buckets.
         """
-
-        current_minute = int(time.time() // self.reset_seconds)
-        if current_minute != self.current_minute:
-            self.current_minute = current_minute
-            self.message_counts = Counter()
-            self.message_cumulative_sizes = Counter()
-            self.non_tx_message_counts = 0
-            self.non_tx_cumulative_size = 0
-        try:
-            message_type = ProtocolMessageTypes(message.type)
-        except Exception as e:
-            log.warning(f"Invalid message: {message.type}, {e}")
-            return True
-
-        new_message_counts: int = self.message_counts[message_type] + 1
-        new_cumulative_size: int = self.message_cumulative_sizes[message_type] + len(message.data)
-        new_non_tx_count: int = self.non_tx_message_counts
-        new_non_tx_size: int = self.non_tx_cumulative_size
-        proportion_of_limit: float = self.percentage_of_limit / 100
-
-        ret: bool = False
         rate_limits = get_rate_limits_to_use(our_capabilities, peer_capabilities)
-
-        try:
-            limits: RLSettings = rate_limits["default_settings"]
-            if message_type in rate_limits["rate_limits_other"]:
-                limits = rate_limits["rate_limits_other"][message_type]
-                non_tx_freq = rate_limits["non_tx_freq"]
-                non_tx_max_total_size = rate_limits["non_tx_max_total_size"]
-                new_non_tx_count = self.non_tx_message_counts + 1
-                new_non_tx_size = self.non_tx_cumulative_size + len(message.data)
-                if new_non_tx_count > non_tx_freq * proportion_of_limit:
-                    return False
-                if new_non_tx_size > non_tx_max_total_size * proportion_of_limit:
-                    return False
+        proportion_of_limit: float = self.percentage_of_limit / 100
+        self.limits = [None] * MESSAGE_TYPE_COUNT
+        for message_type in ProtocolMessageTypes:
+            non_tx = message_type in rate_limits["rate_limits_other"]
+            if non_tx:
+                settings = rate_limits["rate_limits_other"][message_type]
             else:
-                log.warning(f"Message type {message_type} not found in rate limits")
+                settings = rate_limits["default_settings"]
+            max_total_size = settings.max_total_size
+            if max_total_size is None:
+                max_total_size = settings.frequency * settings.max_size
+            self.limits[message_type.value] = ResolvedLimits(
+                count_capacity=settings.frequency * proportion_of_limit,
+                size_capacity=max_total_size * proportion_of_limit,
+                max_size=settings.max_size,
+                non_tx=non_tx,
+            )
 
-            if limits.max_total_size is None:
-                limits = dataclasses.replace(limits, max_total_size=limits.frequency * limits.max_size)
-            assert limits.max_total_size is not None
+        now = time.monotonic()
+        self.count_tokens = [limits.count_capacity if limits is not None else 0.0 for limits in self.limits]
+        self.size_tokens = [limits.size_capacity if limits is not None else 0.0 for limits in self.limits]
+        self.last_refill = [now] * MESSAGE_TYPE_COUNT
+        self.non_tx_count_capacity = rate_limits["non_tx_freq"] * proportion_of_limit
+        self.non_tx_size_capacity = rate_limits["non_tx_max_total_size"] * proportion_of_limit
+        self.non_tx_count_tokens = self.non_tx_count_capacity
+        self.non_tx_size_tokens = self.non_tx_size_capacity
+        self.non_tx_last_refill = now
 
-            if new_message_counts > limits.frequency * proportion_of_limit:
-                return False
-            if len(message.data) > limits.max_size:
-                return False
-            if new_cumulative_size > limits.max_total_size * proportion_of_limit:
-                return False
+    def _refill(self, message_type: int, limits: ResolvedLimits, now: float) -> None:
+        elapsed = now - self.last_refill[message_type]
+        if elapsed > 0:
+            self.last_refill[message_type] = now
+            refill = elapsed / self.reset_seconds
+            self.count_tokens[message_type] = min(
+                limits.count_capacity, self.count_tokens[message_type] + refill * limits.count_capacity
+            )
+            self.size_tokens[message_type] = min(
+                limits.size_capacity, self.size_tokens[message_type] + refill * limits.size_capacity
+            )
+        if limits.non_tx:
+            elapsed = now - self.non_tx_last_refill
+            if elapsed > 0:
+                self.non_tx_last_refill = now
+                refill = elapsed / self.reset_seconds
+                self.non_tx_count_tokens = min(
+                    self.non_tx_count_capacity, self.non_tx_count_tokens + refill * self.non_tx_count_capacity
+                )
+                self.non_tx_size_tokens = min(
+                    self.non_tx_size_capacity, self.non_tx_size_tokens + refill * self.non_tx_size_capacity
+                )
 
-            ret = True
+    def process_msg_and_check(self, message: Message) -> bool:
+        """
+        Returns True if message can be processed successfully, false if a rate limit is passed.
+        """
+        message_type = message.type
+        limits = self.limits[message_type]
+        if limits is None:
+            log.warning(f"Invalid message: {message_type}")
             return True
-        finally:
-            if self.incoming or ret:
-                # now that we determined that it's OK to send the message, commit the
-                # updates to the counters. Alternatively, if this was an
-                # incoming message, we already received it and it should
-                # increment the counters unconditionally
-                self.message_counts[message_type] = new_message_counts
-                self.message_cumulative_sizes[message_type] = new_cumulative_size
-                self.non_tx_message_counts = new_non_tx_count
-                self.non_tx_cumulative_size = new_non_tx_size
+
+        self._refill(message_type, limits, time.monotonic())
+        size = len(message.data)
+        allowed = (
+            size <= limits.max_size
+            and self.count_tokens[message_type] >= 1
+            and self.size_tokens[message_type] >= size
+            and (not limits.non_tx or (self.non_tx_count_tokens >= 1 and self.non_tx_size_tokens >= size))
+        )
+        if self.incoming or allowed:
+            # now that we determined that it's OK to send the message, take the tokens. Alternatively, if this
+            # was an incoming message, we already received it and it should take them unconditionally. The
+            # buckets never go below one period's worth of debt, so a burst doesn't block a peer indefinitely.
+            self.count_tokens[message_type] = max(-limits.count_capacity, self.count_tokens[message_type] - 1)
+            self.size_tokens[message_type] = max(-limits.size_capacity, self.size_tokens[message_type] - size)
+            if limits.non_tx:
+                self.non_tx_count_tokens = max(-self.non_tx_count_capacity, self.non_tx_count_tokens - 1)
+                self.non_tx_size_tokens = max(-self.non_tx_size_capacity, self.non_tx_size_tokens - size)
+        return allowed
+
+    def seconds_until_allowed(self, message: Message) -> Optional[float]:
+        """
+        Returns how long to wait until the message passes the rate limits, or None if it never will.
+        """
+        message_type = message.type
+        limits = self.limits[message_type]
+        if limits is None:
+            return 0
+        size = len(message.data)
+        if size > limits.max_size or size > limits.size_capacity or limits.count_capacity < 1:
+            return None
+        if limits.non_tx and (size > self.non_tx_size_capacity or self.non_tx_count_capacity < 1):
+            return None
+
+        self._refill(message_type, limits, time.monotonic())
+        buckets = [
+            (self.count_tokens[message_type], 1, limits.count_capacity),
+            (self.size_tokens[message_type], size, limits.size_capacity),
+        ]
+        if limits.non_tx:
+            buckets.append((self.non_tx_count_tokens, 1, self.non_tx_count_capacity))
+            buckets.append((self.non_tx_size_tokens, size, self.non_tx_size_capacity))
+        wait = 0.0
+        for tokens, needed, capacity in buckets:
+            if tokens < needed:
+                wait = max(wait, (needed - tokens) / capacity * self.reset_seconds)
+        return wait
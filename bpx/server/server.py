@@ -28,6 +28,7 @@ from bpx.protocols.protocol_message_types import ProtocolMessageTypes
 from bpx.protocols.protocol_state_machine import message_requires_reply
 from bpx.protocols.protocol_timing import INVALID_PROTOCOL_BAN_SECONDS
 from bpx.protocols.shared_protocol import protocol_version
+from bpx.server.api_dispatcher import ApiDispatcher
 from bpx.server.introducer_peers import IntroducerPeers
 from bpx.server.outbound_message import Message, NodeType
 from bpx.server.ssl_context import private_ssl_paths, public_ssl_paths
@@ -140,6 +141,7 @@ class BpxServer:
     connection_close_task: Optional[asyncio.Task[None]] = None
     received_message_callback: Optional[ConnectionCallback] = None
     banned_peers: Dict[str, float] = field(default_factory=dict)
+    api_dispatcher: ApiDispatcher = field(default_factory=ApiDispatcher)
     invalid_protocol_ban_seconds = INVALID_PROTOCOL_BAN_SECONDS
 
     @classmethod
@@ -320,6 +322,7 @@ class BpxServer:
                 self._inbound_rate_limit_percent,
                 self._outbound_rate_limit_percent,
                 self._local_capabilities_for_handshake,
+                api_dispatcher=self.api_dispatcher,
             )
             await connection.perform_handshake(self._network_id, protocol_version, self._port, self._local_type)
             assert connection.connection_type is not None, "handshake failed to set connection type, still None"
@@ -465,6 +468,7 @@ class BpxServer:
                 self._outbound_rate_limit_percent,
                 self._local_capabilities_for_handshake,
                 session=session,
+                api_dispatcher=self.api_dispatcher,
             )
             await connection.perform_handshake(self._network_id, protocol_version, self._port, self._local_type)
             await self.connection_added(connection, on_connect)
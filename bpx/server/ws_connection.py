@@ -7,7 +7,6 @@ import math
 import time
 import traceback
 from dataclasses import dataclass, field
-from secrets import token_bytes
 from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
 
 from aiohttp import ClientSession, WSCloseCode, WSMessage, WSMsgType
@@ -20,6 +19,7 @@ from bpx.protocols.protocol_message_types import ProtocolMessageTypes
 from bpx.protocols.protocol_state_machine import message_response_ok
 from bpx.protocols.protocol_timing import API_EXCEPTION_BAN_SECONDS, INTERNAL_PROTOCOL_ERROR_BAN_SECONDS
 from bpx.protocols.shared_protocol import Capability, Handshake
+from bpx.server.api_dispatcher import ApiDispatcher
 from bpx.server.capabilities import known_active_capabilities
 from bpx.server.outbound_message import Message, NodeType, make_msg
 from bpx.server.rate_limits import RateLimiter
@@ -29,6 +29,7 @@ from bpx.util.api_decorators import get_metadata
 from bpx.util.errors import Err, ProtocolError
 from bpx.util.ints import uint8, uint16
 from bpx.util.log_exceptions import log_exceptions
+from bpx.util.metrics import registry as metrics_registry
 
 # Each message is prepended with LENGTH_BYTES bytes specifying the length
 from bpx.util.network import class_for_type, is_localhost
@@ -38,6 +39,19 @@ from bpx.util.streamable import Streamable
 LENGTH_BYTES: int = 4
 
 WebSocket = Union[WebSocketResponse, ClientWebSocketResponse]
+
+# The depth of the queues is observed when a message is put in them
+QUEUE_DEPTH_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+messages_sent = metrics_registry.counter("bpx_connection_messages_sent_total", "Messages sent to peers")
+bytes_sent = metrics_registry.counter("bpx_connection_bytes_sent_total", "Bytes sent to peers")
+messages_received = metrics_registry.counter("bpx_connection_messages_received_total", "Messages received from peers")
+bytes_received = metrics_registry.counter("bpx_connection_bytes_received_total", "Bytes received from peers")
+queue_depth = metrics_registry.histogram(
+    "bpx_connection_queue_depth",
+    "Messages already waiting in a connection queue when one is added",
+    ["queue"],
+    QUEUE_DEPTH_BUCKETS,
+)
 ConnectionCallback = Callable[["WSBpxConnection"], Awaitable[None]]
 
 
@@ -86,9 +100,12 @@ class WSBpxConnection:
     received_message_callback: Optional[ConnectionCallback] = field(repr=False)
     incoming_queue: asyncio.Queue[Message] = field(default_factory=asyncio.Queue, repr=False)
     outgoing_queue: asyncio.Queue[Message] = field(default_factory=asyncio.Queue, repr=False)
-    api_tasks: Dict[bytes32, asyncio.Task[None]] = field(default_factory=dict, repr=False)
+    api_tasks: Dict[int, asyncio.Task[None]] = field(default_factory=dict, repr=False)
     # Contains task ids of api tasks which should not be canceled
-    execute_tasks: Set[bytes32] = field(default_factory=set, repr=False)
+    execute_tasks: Set[int] = field(default_factory=set, repr=False)
+    next_task_id: int = field(default=0, repr=False)
+    # Shared by all connections of a server, schedules the api calls by their priority
+    api_dispatcher: ApiDispatcher = field(default_factory=ApiDispatcher, repr=False)
 
     # BpxConnection metrics
     creation_time: float = field(default_factory=time.time)
@@ -136,6 +153,7 @@ class WSBpxConnection:
         outbound_rate_limit_percent: int,
         local_capabilities_for_handshake: List[Tuple[uint16, str]],
         session: Optional[ClientSession] = None,
+        api_dispatcher: Optional[ApiDispatcher] = None,
     ) -> WSBpxConnection:
         assert ws._writer is not None
         peername = ws._writer.transport.get_extra_info("peername")
@@ -168,6 +186,7 @@ class WSBpxConnection:
             is_outbound=is_outbound,
             received_message_callback=received_message_callback,
             session=session,
+            api_dispatcher=api_dispatcher if api_dispatcher is not None else ApiDispatcher(),
         )
 
     def _get_extra_info(self, name: str) -> Optional[Any]:
@@ -254,6 +273,9 @@ class WSBpxConnection:
             # "1" means capability is enabled
             self.peer_capabilities = known_active_capabilities(inbound_handshake.capabilities)
 
+        self.outbound_rate_limiter.set_capabilities(self.local_capabilities, self.peer_capabilities)
+        self.inbound_rate_limiter.set_capabilities(self.local_capabilities, self.peer_capabilities)
+
         self.outbound_task = asyncio.create_task(self.outbound_handler())
         self.inbound_task = asyncio.create_task(self.inbound_handler())
         self.incoming_message_task = asyncio.create_task(self.incoming_message_handler())
@@ -351,7 +373,7 @@ class WSBpxConnection:
                 self.log.error(f"Exception: {e} with {self.peer_host}")
                 self.log.error(f"Exception Stack: {error_stack}")
 
-    async def _api_call(self, full_message: Message, task_id: bytes32) -> None:
+    async def _api_call(self, full_message: Message, task_id: int) -> None:
         start_time = time.time()
         message_type = ""
         try:
@@ -384,12 +406,11 @@ class WSBpxConnection:
                 self.execute_tasks.add(task_id)
                 timeout = None
 
-            if metadata.peer_required:
-                coroutine = f(full_message.data, self)
-            else:
-                coroutine = f(full_message.data)
-
             async def wrapped_coroutine() -> Optional[Message]:
+                if metadata.peer_required:
+                    coroutine = f(full_message.data, self)
+                else:
+                    coroutine = f(full_message.data)
                 try:
                     # hinting Message here is compensating for difficulty around hinting of the callbacks
                     result: Message = await coroutine
@@ -402,7 +423,8 @@ class WSBpxConnection:
                     raise
                 return None
 
-            response: Optional[Message] = await asyncio.wait_for(wrapped_coroutine(), timeout=timeout)
+            async with self.api_dispatcher.slot(metadata.priority):
+                response: Optional[Message] = await asyncio.wait_for(wrapped_coroutine(), timeout=timeout)
             self.log.debug(
                 f"Time taken to process {message_type} from {self.peer_node_id} is "
                 f"{time.time() - start_time} seconds"
@@ -438,7 +460,8 @@ class WSBpxConnection:
     async def incoming_message_handler(self) -> None:
         while True:
             message = await self.incoming_queue.get()
-            task_id: bytes32 = bytes32(token_bytes(32))
+            task_id = self.next_task_id
+            self.next_task_id += 1
             api_task = asyncio.create_task(self._api_call(message, task_id))
             self.api_tasks[task_id] = api_task
 
@@ -452,6 +475,7 @@ class WSBpxConnection:
                         event = self.pending_requests[message.id]
                         event.set()
                     else:
+                        queue_depth.observe(self.incoming_queue.qsize(), ("incoming",))
                         await self.incoming_queue.put(message)
                 else:
                     continue
@@ -466,6 +490,7 @@ class WSBpxConnection:
         """Send message sends a message with no tracking / callback."""
         if self.closed:
             return False
+        queue_depth.observe(self.outgoing_queue.qsize(), ("outgoing",))
         await self.outgoing_queue.put(message)
         return True
 
@@ -530,6 +555,7 @@ class WSBpxConnection:
         message = Message(message_no_id.type, request_id, message_no_id.data)
         assert message.id is not None
         self.pending_requests[message.id] = event
+        queue_depth.observe(self.outgoing_queue.qsize(), ("outgoing",))
         await self.outgoing_queue.put(message)
 
         # Either the result is available below or not, no need to detect the timeout error
@@ -550,23 +576,14 @@ class WSBpxConnection:
         if self.closed:
             return None
         for message in messages:
+            queue_depth.observe(self.outgoing_queue.qsize(), ("outgoing",))
             await self.outgoing_queue.put(message)
 
-    async def _wait_and_retry(self, msg: Message) -> None:
-        try:
-            await asyncio.sleep(1)
-            await self.outgoing_queue.put(msg)
-        except Exception as e:
-            self.log.debug(f"Exception {e} while waiting to retry sending rate limited message")
-            return None
-
     async def _send_message(self, message: Message) -> None:
         encoded: bytes = bytes(message)
         size = len(encoded)
         assert len(encoded) < (2 ** (LENGTH_BYTES * 8))
-        if not self.outbound_rate_limiter.process_msg_and_check(
-            message, self.local_capabilities, self.peer_capabilities
-        ):
+        while not self.outbound_rate_limiter.process_msg_and_check(message):
             if not is_localhost(self.peer_host):
                 message_type = ProtocolMessageTypes(message.type)
                 last_time = self.log_rate_limit_last_time[message_type]
@@ -577,19 +594,26 @@ class WSBpxConnection:
                     self.log.debug(msg)
 
                 # TODO: fix this special case. This function has rate limits which are too low.
-                if ProtocolMessageTypes(message.type) != ProtocolMessageTypes.respond_peers:
-                    asyncio.create_task(self._wait_and_retry(message))
+                delay = self.outbound_rate_limiter.seconds_until_allowed(message)
+                if delay is None or message_type == ProtocolMessageTypes.respond_peers:
+                    if delay is None:
+                        self.log.debug(f"Dropping {message_type.name} to {self.peer_host}, exceeds the rate limits")
+                    return None
 
-                return None
+                # Hold back this connection's outgoing queue until the message fits into the limits
+                await asyncio.sleep(delay)
             else:
                 self.log.debug(
                     f"Not rate limiting ourselves. message type: {ProtocolMessageTypes(message.type).name}, "
                     f"peer: {self.peer_host}"
                 )
+                break
 
         await self.ws.send_bytes(encoded)
         self.log.debug(f"-> {ProtocolMessageTypes(message.type).name} to peer {self.peer_host} {self.peer_node_id}")
         self.bytes_written += size
+        messages_sent.inc()
+        bytes_sent.inc(size)
 
     async def _read_one_message(self) -> Optional[Message]:
         try:
@@ -631,14 +655,14 @@ class WSBpxConnection:
             data = message.data
             full_message_loaded: Message = Message.from_bytes(data)
             self.bytes_read += len(data)
+            messages_received.inc()
+            bytes_received.inc(len(data))
             self.last_message_time = time.time()
             try:
                 message_type = ProtocolMessageTypes(full_message_loaded.type).name
             except Exception:
                 message_type = "Unknown"
-            if not self.inbound_rate_limiter.process_msg_and_check(
-                full_message_loaded, self.local_capabilities, self.peer_capabilities
-            ):
+            if not self.inbound_rate_limiter.process_msg_and_check(full_message_loaded):
                 if self.local_type == NodeType.BEACON and not is_localhost(self.peer_host):
                     self.log.error(
                         f"Peer has been rate limited and will be disconnected: {self.peer_host}, "
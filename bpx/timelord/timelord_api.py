@@ -7,7 +7,7 @@ from typing import Optional
 from bpx.protocols import timelord_protocol
 from bpx.rpc.rpc_server import StateChangedProtocol
 from bpx.timelord.timelord import Chain, IterationType, Timelord, iters_from_block
-from bpx.util.api_decorators import api_request
+from bpx.util.api_decorators import ApiPriority, api_request
 from bpx.util.ints import uint64
 
 log = logging.getLogger(__name__)
@@ -22,7 +22,7 @@ class TimelordAPI:
     def _set_state_changed_callback(self, callback: StateChangedProtocol) -> None:
         self.timelord.state_changed_callback = callback
 
-    @api_request()
+    @api_request(priority=ApiPriority.CRITICAL)
     async def new_peak_timelord(self, new_peak: timelord_protocol.NewPeakTimelord) -> None:
         if self.timelord.last_state is None:
             return None
@@ -50,7 +50,7 @@ class TimelordAPI:
                 self.timelord.state_changed("new_peak", {"height": new_peak.reward_chain_block.height})
                 self.timelord.new_subslot_end = None
 
-    @api_request()
+    @api_request(priority=ApiPriority.CRITICAL)
     async def new_unfinished_block_timelord(self, new_unfinished_block: timelord_protocol.NewUnfinishedBlockTimelord):
         if self.timelord.last_state is None:
             return None
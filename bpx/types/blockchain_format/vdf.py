@@ -12,7 +12,9 @@ from chiavdf import create_discriminant, verify_n_wesolowski
 from bpx.consensus.constants import ConsensusConstants
 from bpx.types.blockchain_format.classgroup import ClassgroupElement
 from bpx.types.blockchain_format.sized_bytes import bytes32, bytes100
+from bpx.util.hash import std_hash
 from bpx.util.ints import uint8, uint64
+from bpx.util.shared_verification_cache import add_verified, is_verified
 from bpx.util.streamable import Streamable, streamable
 
 log = logging.getLogger(__name__)
@@ -78,9 +80,15 @@ class VDFProof(Streamable):
         if self.witness_type + 1 > constants.MAX_VDF_WITNESS_SIZE:
             return False
         try:
+            # Proofs verified by another validation process are in the shared cache
+            cache_key = std_hash(
+                bytes(info) + input_el.data + bytes(self) + constants.DISCRIMINANT_SIZE_BITS.to_bytes(4, "big")
+            )
+            if is_verified(cache_key, "vdf"):
+                return True
             disc: int = get_discriminant(info.challenge, constants.DISCRIMINANT_SIZE_BITS)
             # TODO: parallelize somehow, this might included multiple mini proofs (n weso)
-            return verify_vdf(
+            valid = verify_vdf(
                 disc,
                 input_el.data,
                 info.output.data + bytes(self.witness),
@@ -88,6 +96,9 @@ class VDFProof(Streamable):
                 constants.DISCRIMINANT_SIZE_BITS,
                 self.witness_type,
             )
+            if valid:
+                add_verified(cache_key)
+            return valid
         except Exception:
             return False
 
@@ -3,6 +3,7 @@ from __future__ import annotations
 import functools
 import logging
 from dataclasses import dataclass, field
+from enum import IntEnum
 from typing import Callable, List, Optional, Type, TypeVar, Union, get_type_hints
 
 from typing_extensions import Concatenate, ParamSpec
@@ -21,6 +22,14 @@ Self = TypeVar("Self")
 metadata_attribute_name = "_bpx_api_metadata"
 
 
+class ApiPriority(IntEnum):
+    # Time critical farming and consensus messages, never wait for a slot
+    CRITICAL = 0
+    NORMAL = 1
+    # Serving data to syncing peers, runs with limited concurrency and yields to critical messages
+    BULK = 2
+
+
 @dataclass
 class ApiMetadata:
     request_type: ProtocolMessageTypes
@@ -29,6 +38,7 @@ class ApiMetadata:
     bytes_required: bool = False
     execute_task: bool = False
     reply_types: List[ProtocolMessageTypes] = field(default_factory=list)
+    priority: ApiPriority = ApiPriority.NORMAL
 
 
 def get_metadata(function: Callable[..., object]) -> Optional[ApiMetadata]:
@@ -46,6 +56,7 @@ def api_request(
     bytes_required: bool = False,
     execute_task: bool = False,
     reply_types: Optional[List[ProtocolMessageTypes]] = None,
+    priority: ApiPriority = ApiPriority.NORMAL,
 ) -> Callable[[Callable[Concatenate[Self, S, P], R]], Callable[Concatenate[Self, Union[bytes, S], P], R]]:
     non_optional_reply_types: List[ProtocolMessageTypes]
     if reply_types is None:
@@ -80,6 +91,7 @@ def api_request(
             execute_task=execute_task,
             reply_types=non_optional_reply_types,
             message_class=message_class,
+            priority=priority,
         )
 
         _set_metadata(function=wrapper, metadata=metadata)
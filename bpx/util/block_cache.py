@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
 
 from bpx.consensus.block_record import BlockRecord
 from bpx.consensus.blockchain_interface import BlockchainInterface
@@ -93,3 +93,6 @@ class BlockCache(BlockchainInterface):
         if segments is None:
             return None
         return segments.challenge_segments
+
+    async def get_sub_epoch_segments_hashes(self) -> Set[bytes32]:
+        return set(self._sub_epoch_segments.keys())
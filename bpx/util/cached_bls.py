@@ -8,6 +8,7 @@ from blspy import AugSchemeMPL, G1Element, G2Element, GTElement
 from bpx.types.blockchain_format.sized_bytes import bytes32, bytes48
 from bpx.util.hash import std_hash
 from bpx.util.lru_cache import LRUCache
+from bpx.util.shared_verification_cache import add_verified, is_verified
 
 
 def get_pairings(
@@ -71,3 +72,16 @@ def aggregate_verify(
     pairings_prod: GTElement = functools.reduce(GTElement.__mul__, pairings)
     res = pairings_prod == sig.pair(G1Element.generator())
     return res
+
+
+def verify(pk: G1Element, msg: bytes, sig: G2Element) -> bool:
+    """
+    AugSchemeMPL.verify, skipped if the same signature was already verified by this or another validation process.
+    """
+    cache_key = std_hash(bytes(pk) + bytes(sig) + msg)
+    if is_verified(cache_key, "bls"):
+        return True
+    valid: bool = AugSchemeMPL.verify(pk, msg, sig)
+    if valid:
+        add_verified(cache_key)
+    return valid
@@ -8,10 +8,11 @@ import os
 import shutil
 import sys
 import tempfile
+import threading
 import time
 import traceback
 from pathlib import Path
-from typing import Any, Callable, Dict, Iterator, Optional, Union
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple, Union
 
 import pkg_resources
 import yaml
@@ -21,6 +22,15 @@ from bpx.util.lock import Lockfile
 
 log = logging.getLogger(__name__)
 
+# The libyaml based loader and dumper are much faster, fall back to the pure python ones if it is not available
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+SafeDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+# Parsed config files by path, along with the (st_mtime_ns, st_size, st_ino) of the file they were parsed from.
+# Callers get their own copy of the requested section, so they are free to modify it.
+_config_cache: Dict[Path, Tuple[Tuple[int, int, int], Dict[str, Any]]] = {}
+_config_cache_lock = threading.Lock()
+
 
 def initial_config_file(filename: Union[str, Path]) -> str:
     return pkg_resources.resource_string(__name__, f"initial-{filename}").decode()
@@ -79,7 +89,7 @@ def save_config(root_path: Path, filename: Union[str, Path], config_data: Any):
     with tempfile.TemporaryDirectory(dir=path.parent) as tmp_dir:
         tmp_path: Path = Path(tmp_dir) / Path(filename)
         with open(tmp_path, "w") as f:
-            yaml.safe_dump(config_data, f)
+            yaml.dump(config_data, f, Dumper=SafeDumper)
         try:
             os.replace(str(tmp_path), path)
         except PermissionError:
@@ -122,6 +132,10 @@ def _load_config_maybe_locked(
         print("** please run `bpx init` to migrate or create new config files **")
         # TODO: fix this hack
         sys.exit(-1)
+    r = _get_cached_config(path, _file_key(os.stat(path)))
+    if r is not None:
+        return _copy_section(r, sub_config)
+
     # This loop should not be necessary due to the config lock, but it's kept here just in case
     for i in range(10):
         try:
@@ -129,14 +143,15 @@ def _load_config_maybe_locked(
                 if acquire_lock:
                     exit_stack.enter_context(lock_config(root_path, filename))
                 with open(path, "r") as opened_config_file:
-                    r = yaml.safe_load(opened_config_file)
+                    file_key = _file_key(os.fstat(opened_config_file.fileno()))
+                    r = yaml.load(opened_config_file, Loader=SafeLoader)
             if r is None:
-                log.error(f"yaml.safe_load returned None: {path}")
+                log.error(f"yaml.load returned None: {path}")
                 time.sleep(i * 0.1)
                 continue
-            if sub_config is not None:
-                r = r.get(sub_config)
-            return r
+            with _config_cache_lock:
+                _config_cache[path] = (file_key, r)
+            return _copy_section(r, sub_config)
         except Exception as e:
             tb = traceback.format_exc()
             log.error(f"Error loading file: {tb} {e} Retrying {i}")
@@ -144,6 +159,28 @@ def _load_config_maybe_locked(
     raise RuntimeError("Was not able to read config file successfully")
 
 
+def _file_key(stat_result: os.stat_result) -> Tuple[int, int, int]:
+    # save_config replaces the file, so the inode changes even if the mtime and size happen to be the same
+    return stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino
+
+
+def _get_cached_config(path: Path, file_key: Tuple[int, int, int]) -> Optional[Dict[str, Any]]:
+    with _config_cache_lock:
+        cached = _config_cache.get(path)
+    if cached is None or cached[0] != file_key:
+        return None
+    return cached[1]
+
+
+def _copy_section(config: Dict[str, Any], sub_config: Optional[str]) -> Any:
+    """
+    Only the requested section is copied, so loading the config of a single service doesn't pay for the rest.
+    """
+    if sub_config is not None:
+        return copy.deepcopy(config.get(sub_config))
+    return copy.deepcopy(config)
+
+
 def load_config_cli(
     root_path: Path,
     filename: str,
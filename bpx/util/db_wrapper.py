@@ -4,6 +4,7 @@ import asyncio
 import contextlib
 import functools
 import sqlite3
+import time
 from datetime import datetime
 from pathlib import Path
 from typing import Any, AsyncIterator, Dict, Iterable, Optional, TextIO, Type, Union
@@ -11,6 +12,8 @@ from typing import Any, AsyncIterator, Dict, Iterable, Optional, TextIO, Type, U
 import aiosqlite
 from typing_extensions import final
 
+from bpx.util.metrics import registry as metrics_registry
+
 if aiosqlite.sqlite_version_info < (3, 32, 0):
     SQLITE_MAX_VARIABLE_NUMBER = 900
 else:
@@ -19,6 +22,10 @@ else:
 # integers in sqlite are limited by int64
 SQLITE_INT_MAX = 2**63 - 1
 
+db_acquire_seconds = metrics_registry.histogram(
+    "bpx_db_connection_wait_seconds", "Time waited for a database connection", ["kind"]
+)
+
 
 async def execute_fetchone(
     c: aiosqlite.Connection, sql: str, parameters: Iterable[Any] = None
@@ -196,7 +203,9 @@ class DbWrapper:
                 yield self._write_connection
             return
 
+        start = time.perf_counter()
         async with self._lock:
+            db_acquire_seconds.observe(time.perf_counter() - start, ("writer",))
             async with self._savepoint_ctx():
                 self._current_writer = task
                 try:
@@ -220,7 +229,9 @@ class DbWrapper:
             yield self._write_connection
             return
 
+        start = time.perf_counter()
         async with self._lock:
+            db_acquire_seconds.observe(time.perf_counter() - start, ("writer",))
             async with self._savepoint_ctx():
                 self._current_writer = task
                 try:
@@ -265,7 +276,9 @@ class DbWrapper:
         if task in self._in_use:
             yield self._in_use[task]
         else:
+            start = time.perf_counter()
             c = await self._read_connections.get()
+            db_acquire_seconds.observe(time.perf_counter() - start, ("reader",))
             try:
                 # record our connection in this dict to allow nested calls in
                 # the same task to use the same connection
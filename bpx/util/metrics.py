@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from types import TracebackType
+from typing import Dict, List, Optional, Sequence, Tuple, Type, TypeVar
+
+# Upper bounds in seconds, from a fast database read to a slow Engine API call
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+Labels = Tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if len(names) == 0:
+        return ""
+    pairs = ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError()
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+            *self.samples(),
+        ]
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    _values: Dict[Labels, float]
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, label_names)
+        self._values = {}
+
+    def inc(self, amount: float = 1, labels: Labels = ()) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, labels: Labels = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}"
+            for labels, value in list(self._values.items())
+        ]
+
+
+class HistogramTimer:
+    """
+    Observes the time spent in a `with` block. Exceptions are timed too.
+    """
+
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: Labels) -> None:
+        self.histogram = histogram
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self) -> HistogramTimer:
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, self.labels)
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    buckets: Tuple[float, ...]
+    # Per labels, the number of observations in each bucket (not cumulative), the last one being +Inf
+    _counts: Dict[Labels, List[int]]
+    _sums: Dict[Labels, float]
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._counts = {}
+        self._sums = {}
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        counts = self._counts.get(labels)
+        if counts is None:
+            counts = [0] * (len(self.buckets) + 1)
+            self._counts[labels] = counts
+            self._sums[labels] = 0
+        counts[bisect_left(self.buckets, value)] += 1
+        self._sums[labels] += value
+
+    def time(self, labels: Labels = ()) -> HistogramTimer:
+        return HistogramTimer(self, labels)
+
+    def get_count(self, labels: Labels = ()) -> int:
+        return sum(self._counts.get(labels, ()))
+
+    def samples(self) -> List[str]:
+        lines: List[str] = []
+        bounds = [*self.buckets, float("inf")]
+        for labels, counts in list(self._counts.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                bucket_labels = _format_labels((*self.label_names, "le"), (*labels, _format_value(bound)))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            formatted_labels = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{formatted_labels} {_format_value(self._sums[labels])}")
+            lines.append(f"{self.name}_count{formatted_labels} {cumulative}")
+        return lines
+
+
+_T_Metric = TypeVar("_T_Metric", bound=Metric)
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms of the hot paths of a service, rendered in the Prometheus text format. Updating a
+    metric is a dict lookup and an addition, without locking, so they are meant to be updated from the event loop
+    thread (updates from other threads may rarely be lost, never corrupt the registry).
+    """
+
+    _metrics: Dict[str, Metric]
+
+    def __init__(self) -> None:
+        self._metrics = {}
+
+    def _get_or_create(self, metric_type: Type[_T_Metric], metric: _T_Metric) -> _T_Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is None:
+            self._metrics[metric.name] = metric
+            return metric
+        if not isinstance(existing, metric_type) or existing.label_names != metric.label_names:
+            raise ValueError(f"Metric {metric.name} is already registered with a different type or labels")
+        return existing
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, Counter(name, documentation, label_names))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._get_or_create(Histogram, Histogram(name, documentation, label_names, buckets))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# The registry of this process, served by the RPC server on /metrics
+registry = MetricsRegistry()
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import time
+from typing import Generic, Hashable, Optional, Set, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+
+
+class RecentHashFilter(Generic[K]):
+    """
+    Remembers the keys added in the last `bucket_seconds` to `2 * bucket_seconds`. Keys are kept in two sets, the
+    current and the previous bucket, and the older one is dropped as a whole when the buckets rotate, so there is
+    no per key expiry to track.
+    """
+
+    _current: Set[K]
+    _previous: Set[K]
+    _bucket_start: float
+
+    def __init__(self, bucket_seconds: float) -> None:
+        self.bucket_seconds = bucket_seconds
+        self._current = set()
+        self._previous = set()
+        self._bucket_start = time.monotonic()
+
+    def _rotate(self, now: float) -> None:
+        elapsed = now - self._bucket_start
+        if elapsed < self.bucket_seconds:
+            return
+        if elapsed < 2 * self.bucket_seconds:
+            self._previous = self._current
+        else:
+            self._previous = set()
+        self._current = set()
+        self._bucket_start = now
+
+    def add(self, key: K, now: Optional[float] = None) -> bool:
+        """
+        Returns False if the key was already added recently.
+        """
+        self._rotate(time.monotonic() if now is None else now)
+        if key in self._current or key in self._previous:
+            return False
+        self._current.add(key)
+        return True
+
+    def __contains__(self, key: object) -> bool:
+        self._rotate(time.monotonic())
+        return key in self._current or key in self._previous
+
+    def discard(self, key: K) -> None:
+        self._current.discard(key)
+        self._previous.discard(key)
+
+    def __len__(self) -> int:
+        return len(self._current) + len(self._previous)
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, Optional
+
+from bpx.types.blockchain_format.sized_bytes import bytes32
+
+log = logging.getLogger(__name__)
+
+KEY_SIZE = 32
+# Number of consecutive slots a key can be stored in, the oldest of them is overwritten when they are all taken
+PROBE_LENGTH = 8
+DEFAULT_SLOT_COUNT = 1 << 16  # 2 MiB
+
+_EMPTY_KEY = bytes(KEY_SIZE)
+
+
+@dataclass
+class SharedVerificationCacheStats:
+    hits: int = 0
+    misses: int = 0
+
+
+class SharedVerificationCache:
+    """
+    A fixed size hash set in shared memory, holding the hashes of the inputs of successful verifications (VDF proofs,
+    signatures). The main process creates it, and the block validation workers attach to it, so a proof which was
+    verified in one of them doesn't have to be verified again in another.
+
+    Only successful verifications are added, and the keys are hashes of all the inputs, so a hit can never make an
+    invalid proof pass. Reads and writes are not locked: a write racing another write to the same slot can only
+    leave a slot that matches no key, which is a miss.
+    """
+
+    _shm: SharedMemory
+    _slot_count: int
+    _owner: bool
+    _next_victim: int
+    stats: Dict[str, SharedVerificationCacheStats]
+
+    def __init__(self, shm: SharedMemory, owner: bool) -> None:
+        self._shm = shm
+        self._slot_count = shm.size // KEY_SIZE
+        self._owner = owner
+        self._next_victim = 0
+        self.stats = {}
+
+    @classmethod
+    def create(cls, slot_count: int = DEFAULT_SLOT_COUNT) -> SharedVerificationCache:
+        return cls(SharedMemory(create=True, size=slot_count * KEY_SIZE), True)
+
+    @classmethod
+    def attach(cls, name: str) -> SharedVerificationCache:
+        # The workers share the resource tracker of the process which created the memory, so it is only unlinked
+        # by `close` in that process (or by the tracker if that process dies)
+        return cls(SharedMemory(name=name), False)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def _first_slot(self, key: bytes32) -> int:
+        return int.from_bytes(key[:8], "big") % self._slot_count
+
+    def contains(self, key: bytes32, kind: str) -> bool:
+        buf = self._shm.buf
+        slot = self._first_slot(key)
+        found = False
+        for i in range(PROBE_LENGTH):
+            offset = ((slot + i) % self._slot_count) * KEY_SIZE
+            if bytes(buf[offset : offset + KEY_SIZE]) == key:
+                found = True
+                break
+        stats = self.stats.setdefault(kind, SharedVerificationCacheStats())
+        if found:
+            stats.hits += 1
+        else:
+            stats.misses += 1
+        return found
+
+    def add(self, key: bytes32) -> None:
+        buf = self._shm.buf
+        slot = self._first_slot(key)
+        target: Optional[int] = None
+        for i in range(PROBE_LENGTH):
+            offset = ((slot + i) % self._slot_count) * KEY_SIZE
+            existing = bytes(buf[offset : offset + KEY_SIZE])
+            if existing == key:
+                return
+            if target is None and existing == _EMPTY_KEY:
+                target = offset
+        if target is None:
+            # All slots are taken, overwrite them round robin
+            target = ((slot + self._next_victim) % self._slot_count) * KEY_SIZE
+            self._next_victim = (self._next_victim + 1) % PROBE_LENGTH
+        buf[target : target + KEY_SIZE] = key
+
+    def close(self) -> None:
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+# The cache of this process, if any. Set by the blockchain in the main process and by the worker initializer
+_cache: Optional[SharedVerificationCache] = None
+
+
+def get_shared_cache() -> Optional[SharedVerificationCache]:
+    return _cache
+
+
+def set_shared_cache(cache: Optional[SharedVerificationCache]) -> None:
+    global _cache
+    _cache = cache
+
+
+def attach_shared_cache(name: Optional[str]) -> None:
+    if name is None:
+        return None
+    try:
+        set_shared_cache(SharedVerificationCache.attach(name))
+    except Exception as e:
+        log.warning(f"Failed to attach to the shared verification cache {name}: {e}")
+
+
+def is_verified(key: bytes32, kind: str) -> bool:
+    cache = _cache
+    if cache is None:
+        return False
+    return cache.contains(key, kind)
+
+
+def add_verified(key: bytes32) -> None:
+    cache = _cache
+    if cache is not None:
+        cache.add(key)
@@ -39,6 +39,10 @@ upnp_dependencies = [
     "miniupnpc==2.2.2",  # Allows users to open ports on their router
 ]
 
+compression_dependencies = [
+    "zstandard==0.21.0",  # Trains and uses compression dictionaries for the blocks in the database
+]
+
 dev_dependencies = [
     "build",
     "coverage",
@@ -80,6 +84,7 @@ kwargs = dict(
     extras_require=dict(
         dev=dev_dependencies,
         upnp=upnp_dependencies,
+        compression=compression_dependencies,
     ),
     packages=[
         "build_scripts",